@@ -4,7 +4,9 @@ import tempfile
 import zipfile
 from io import BytesIO
 import logging
-from PyPDF2 import PdfWriter, PdfReader
+import result_cache
+import pikepdf
+from overlay_engine import stamp_text
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.colors import Color
@@ -18,6 +20,25 @@ def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
+def page_number_position(text_width, page_width, page_height, position="bottom-center"):
+    """Baseline origin (x, y) of the page number text for the selected position."""
+    margin = 36  # 0.5 inch margin
+    
+    if position == "bottom-center":
+        return (page_width - text_width) / 2, margin
+    elif position == "bottom-left":
+        return margin, margin
+    elif position == "bottom-right":
+        return page_width - text_width - margin, margin
+    elif position == "top-center":
+        return (page_width - text_width) / 2, page_height - margin
+    elif position == "top-left":
+        return margin, page_height - margin
+    elif position == "top-right":
+        return page_width - text_width - margin, page_height - margin
+    else:  # Default to bottom-center
+        return (page_width - text_width) / 2, margin
+
 def create_page_number_overlay(page_width, page_height, page_num, total_pages, 
                              position="bottom-center", font_size=12, color="#000000"):
     """Create a PDF overlay with page number."""
@@ -35,30 +56,7 @@ def create_page_number_overlay(page_width, page_height, page_num, total_pages,
     text = f"Page {page_num} of {total_pages}"
     text_width = c.stringWidth(text, "Helvetica", font_size)
     
-    # Position the text based on the selected position
-    margin = 36  # 0.5 inch margin
-    
-    if position == "bottom-center":
-        x = (page_width - text_width) / 2
-        y = margin
-    elif position == "bottom-left":
-        x = margin
-        y = margin
-    elif position == "bottom-right":
-        x = page_width - text_width - margin
-        y = margin
-    elif position == "top-center":
-        x = (page_width - text_width) / 2
-        y = page_height - margin
-    elif position == "top-left":
-        x = margin
-        y = page_height - margin
-    elif position == "top-right":
-        x = page_width - text_width - margin
-        y = page_height - margin
-    else:  # Default to bottom-center
-        x = (page_width - text_width) / 2
-        y = margin
+    x, y = page_number_position(text_width, page_width, page_height, position)
     
     c.drawString(x, y, text)
     c.save()
@@ -68,43 +66,29 @@ def create_page_number_overlay(page_width, page_height, page_num, total_pages,
 
 def add_page_numbers_to_pdf(input_pdf_path, position="bottom-center", 
                           start_number=1, font_size=12, color="#000000"):
-    """Add page numbers to a PDF file."""
+    """Add page numbers to a PDF file.
+
+    Every page shares one Helvetica font resource and gets a small text-only
+    content stream appended, instead of a rendered overlay page per page.
+    """
     try:
-        # Read the input PDF
-        with open(input_pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            writer = PdfWriter()
+        with pikepdf.open(input_pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+            r, g, b = hex_to_rgb(color)
             
-            total_pages = len(reader.pages)
-            
-            # Process each page
-            for page_idx, page in enumerate(reader.pages):
-                # Get page dimensions
-                page_rect = page.mediabox
-                page_width = float(page_rect[2] - page_rect[0])
-                page_height = float(page_rect[3] - page_rect[1])
-                
-                # Current page number (adjusted by start_number)
-                current_page_num = page_idx + start_number
-                
-                # Create page number overlay for this page
-                overlay_buffer = create_page_number_overlay(
-                    page_width, page_height, 
-                    current_page_num, total_pages,
-                    position, font_size, color
-                )
-                
-                # Read overlay PDF
-                overlay_reader = PdfReader(overlay_buffer)
-                overlay_page = overlay_reader.pages[0]
-                
-                # Merge overlay with original page
-                page.merge_page(overlay_page)
-                writer.add_page(page)
+            stamp_text(
+                pdf,
+                lambda page_idx: f"Page {page_idx + start_number} of {total_pages}",
+                lambda text_width, page_width, page_height: page_number_position(
+                    text_width, page_width, page_height, position
+                ),
+                font_size=font_size,
+                rgb=(r / 255, g / 255, b / 255)
+            )
             
             # Create output buffer
             output_buffer = BytesIO()
-            writer.write(output_buffer)
+            pdf.save(output_buffer)
             output_buffer.seek(0)
             
             return output_buffer
@@ -153,11 +137,21 @@ def add_page_numbers_route():
                 temp_input_path = temp_input.name
 
             try:
-                # Apply page numbers → get BytesIO
-                numbered_buffer = add_page_numbers_to_pdf(
-                    temp_input_path, position,
-                    start_number, font_size, color
-                )
+                cache_key = result_cache.make_key("add_page_numbers", [temp_input_path], {
+                    "position": position, "start_number": start_number,
+                    "font_size": font_size, "color": color
+                })
+                cached_path = result_cache.get(cache_key)
+                if cached_path is not None:
+                    with open(cached_path, 'rb') as cached:
+                        numbered_buffer = BytesIO(cached.read())
+                else:
+                    # Apply page numbers → get BytesIO
+                    numbered_buffer = add_page_numbers_to_pdf(
+                        temp_input_path, position,
+                        start_number, font_size, color
+                    )
+                    result_cache.put_bytes(cache_key, numbered_buffer.getvalue())
 
                 # Append result to list
                 processed_files.append((numbered_buffer, f"numbered_{file.filename}"))
@@ -4,18 +4,34 @@ import tempfile
 import zipfile
 from io import BytesIO
 import logging
+import result_cache
+from cache_utils import TTLCache
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.colors import Color
 from reportlab.lib.utils import ImageReader
 from restrictions import check_restrictions, check_add_watermark_restrictions
-from PyPDF2 import PdfWriter, PdfReader
+import pikepdf
+from overlay_engine import stamp_form_xobjects
 import colorsys
 from restrictions import check_add_watermark_restrictions
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Rendered overlay pages, shared by every request in the process. The same mark
+# ("CONFIDENTIAL" on A4/Letter) is stamped over and over, so entries are kept
+# for a day and evicted least-recently-used once they exceed the byte budget.
+WATERMARK_CACHE_MB = float(os.environ.get('WATERMARK_CACHE_MB', '32'))
+WATERMARK_CACHE_TTL = float(os.environ.get('WATERMARK_CACHE_TTL', '86400'))
+_overlay_cache = TTLCache(maxsize=100000, ttl=WATERMARK_CACHE_TTL,
+                          maxbytes=int(WATERMARK_CACHE_MB * 1024 * 1024))
+
+
+def watermark_cache_stats():
+    """Hit/miss/byte counters of the watermark overlay cache"""
+    return _overlay_cache.stats()
+
 def hex_to_rgb(hex_color):
     """Convert hex color to RGB tuple (0-1 range)."""
     hex_color = hex_color.lstrip('#')
@@ -23,7 +39,24 @@ def hex_to_rgb(hex_color):
 
 def create_watermark_pdf(text, width, height, opacity=0.3, rotation=45, 
                         color="#FF0000", font_size=48, position="center"):
-    """Create a watermark PDF overlay."""
+    """Create a watermark PDF overlay.
+
+    The overlay is a pure function of its arguments, so rendered pages are
+    memoized process-wide; each call gets its own buffer over the cached bytes.
+    """
+    # Missing colour falls back to the default, like an omitted form field
+    color = (color or "#FF0000").lower()
+    key = (text, round(float(width), 2), round(float(height), 2), float(opacity),
+           float(rotation), color, float(font_size), position)
+    overlay = _overlay_cache.get(key)
+    if overlay is None:
+        overlay = _render_watermark_pdf(text, width, height, opacity, rotation,
+                                        color, font_size, position).getvalue()
+        _overlay_cache.set(key, overlay)
+    return BytesIO(overlay)
+
+def _render_watermark_pdf(text, width, height, opacity, rotation, color, font_size, position):
+    """Render a watermark overlay page with reportlab."""
     # Create a temporary file for the watermark
     watermark_buffer = BytesIO()
     
@@ -90,39 +123,23 @@ def create_watermark_pdf(text, width, height, opacity=0.3, rotation=45,
 
 def add_watermark_to_pdf(input_pdf_path, watermark_text, opacity=0.3, 
                         rotation=45, color="#FF0000", font_size=48, position="center"):
-    """Add watermark to a PDF file."""
+    """Add watermark to a PDF file.
+
+    The watermark is rendered once per distinct page size and drawn on each
+    page as a shared Form XObject; page content is never re-parsed.
+    """
     try:
-        # Read the input PDF
-        with open(input_pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            writer = PdfWriter()
-            
-            # Process each page
-            for page_num, page in enumerate(reader.pages):
-                # Get page dimensions
-                page_rect = page.mediabox
-                page_width = float(page_rect[2] - page_rect[0])
-                page_height = float(page_rect[3] - page_rect[1])
-                
-                # Create watermark for this page
-                watermark_buffer = create_watermark_pdf(
-                    watermark_text, page_width, page_height, 
-                    opacity, rotation, color, font_size, position
-                )
-                
-                # Read watermark PDF
-                watermark_reader = PdfReader(watermark_buffer)
-                watermark_page = watermark_reader.pages[0]
-                
-                # Merge watermark with original page
-                page.merge_page(watermark_page)
-                writer.add_page(page)
-            
+        with pikepdf.open(input_pdf_path) as pdf:
+            stamp_form_xobjects(pdf, lambda width, height: create_watermark_pdf(
+                watermark_text, width, height,
+                opacity, rotation, color, font_size, position
+            ).getvalue())
+
             # Create output buffer
             output_buffer = BytesIO()
-            writer.write(output_buffer)
+            pdf.save(output_buffer)
             output_buffer.seek(0)
-            
+
             return output_buffer
             
     except Exception as e:
@@ -181,11 +198,21 @@ def add_watermark():
                 temp_input_path = temp_input.name
 
             try:
-                # Apply watermark → get BytesIO
-                watermarked_buffer = add_watermark_to_pdf(
-                    temp_input_path, watermark_text, opacity,
-                    rotation, color, font_size, position
-                )
+                cache_key = result_cache.make_key("add_watermark", [temp_input_path], {
+                    "text": watermark_text, "opacity": opacity, "rotation": rotation,
+                    "color": color, "font_size": font_size, "position": position
+                })
+                cached_path = result_cache.get(cache_key)
+                if cached_path is not None:
+                    with open(cached_path, 'rb') as cached:
+                        watermarked_buffer = BytesIO(cached.read())
+                else:
+                    # Apply watermark → get BytesIO
+                    watermarked_buffer = add_watermark_to_pdf(
+                        temp_input_path, watermark_text, opacity,
+                        rotation, color, font_size, position
+                    )
+                    result_cache.put_bytes(cache_key, watermarked_buffer.getvalue())
 
                 # Append result to list
                 processed_files.append((watermarked_buffer, f"watermarked_{file.filename}"))
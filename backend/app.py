@@ -40,7 +40,7 @@ from convert_pptx_to_pdf import convert_pptx_to_pdf
 from convert_html_to_pdf import convert_html_to_pdf
 from convert_to_pdfa import convert_pdf_to_pdfa
 from rotate_pdf import rotate_pdf_pages
-from add_watermark import add_watermark
+from add_watermark import add_watermark, watermark_cache_stats
 from add_page_numbers import add_page_numbers_route
 from remove_pages import remove_pages
 from unlock_pdf import unlock_pdf
@@ -58,8 +58,17 @@ from datetime import datetime
 import hmac
 import hashlib
 import base64
-from restrictions import check_restrictions, get_user
+from restrictions import check_restrictions, get_user, invalidate_user, premium_cache_stats, identity_lookup_count
 from cognito_utils import set_premium_cognito as set_pro_subscription # Add this line
+from cognito_jwt import JWKSCache, verify_access_token, TokenVerificationError, UnknownKeyError, JWT_VERIFY_MODE
+import result_cache
+import page_text_cache
+import jobs
+from upload_ingest import SpoolingRequest
+import workspace
+import office_pool
+import model_registry
+import model_server
     # ...
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
@@ -70,7 +79,6 @@ pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
 
 
 
-progress_store = {}  # Store progress of PDF operations
 
 # Load environment variables
 # First load the default environment file based on FLASK_ENV
@@ -86,6 +94,8 @@ load_dotenv('.env', override=True)
 
 # Initialize Flask app
 app = Flask(__name__)
+# Uploads are streamed to disk once (hashed on the way in) instead of buffered in memory
+app.request_class = SpoolingRequest
 
 # Increase server-side upload limit so Flask won’t reject larger files
 # Note: If a reverse proxy (e.g., Nginx) is in front, that proxy’s limit must also be raised.
@@ -103,6 +113,15 @@ def handle_request_entity_too_large(e):
         "limit_mb": max_upload_mb
     }), 413
 
+# Report how many DB/Cognito identity lookups the request needed (should stay <= 1)
+@app.after_request
+def add_identity_lookup_header(response):
+    response.headers['X-Identity-Lookups'] = str(identity_lookup_count())
+    return response
+
+# Per-request temp workspaces: removed after the response is streamed, quota-limited, swept for orphans
+workspace.init_app(app)
+
 # Configure CORS based on environment
 cors_origins = os.environ.get('CORS_ORIGINS', '*')
 if cors_origins == '*':
@@ -361,9 +380,7 @@ def verify_razorpay_payment():
             import uuid
             db = next(get_db())
             try:
-                                # Ensure a DB user record exists for this email before applying payment
-                try:
-                 # Ensure a DB user record exists for this email before applying payment
+                # Ensure a DB user record exists for this email before applying payment
                 try:
                     existing = db_utils.get_user_by_email(db, email)
                     if not existing:
@@ -397,6 +414,7 @@ def verify_razorpay_payment():
                 }
                 user = db_utils.update_user_payment_info(db, email, payment_data)
                 upgraded = bool(user)
+                invalidate_user(email)
                 # Reflect premium upgrade in Cognito for feature gating
                 if upgraded:
                     try:
@@ -425,6 +443,7 @@ APP_CLIENT_ID = os.environ.get('APP_CLIENT_ID', "1u8apgpumk8dbnkeaomu9alv67")  #
 APP_CLIENT_SECRET = os.environ.get('APP_CLIENT_SECRET', "1idscabr0beu9v3fqfffsm3mbggif1j9jjlnpnp3pk09mhphk96p")  # your client secret
 
 cognito = boto3.client("cognito-idp", region_name=REGION)
+cognito_jwks = JWKSCache(REGION, USER_POOL_ID)
 
 # ---- Helper function to generate SECRET_HASH ----
 def get_secret_hash(username):
@@ -450,6 +469,24 @@ def token_required(f):
         if token.startswith('Bearer '):
             token = token[7:]
         
+        if JWT_VERIFY_MODE == 'local':
+            # Verify signature and claims offline against the cached user pool JWKS
+            try:
+                claims = verify_access_token(token, cognito_jwks, APP_CLIENT_ID)
+            except UnknownKeyError:
+                # Key set could not be refreshed to include this kid; let Cognito decide
+                claims = None
+            except TokenVerificationError:
+                return jsonify({'error': 'Token is invalid'}), 401
+
+            if claims is not None:
+                request.current_user = {
+                    'username': claims.get('username', claims.get('sub')),
+                    'attributes': {'sub': claims.get('sub')},
+                    'claims': claims
+                }
+                return f(*args, **kwargs)
+
         try:
             # Verify token with Cognito
             response = cognito.get_user(AccessToken=token)
@@ -666,6 +703,13 @@ def get_profile():
     """Get user profile information"""
     try:
         user = request.current_user
+        if 'email' not in user['attributes']:
+            # Locally verified access tokens carry no profile attributes
+            token = request.headers.get('Authorization', '')
+            if token.startswith('Bearer '):
+                token = token[7:]
+            response = cognito.get_user(AccessToken=token)
+            user['attributes'] = {attr['Name']: attr['Value'] for attr in response['UserAttributes']}
         return jsonify({
             "username": user['username'],
             "email": user['attributes'].get('email', ''),
@@ -1047,6 +1091,8 @@ def downgrade_expired_subscriptions_route():
 
         if expired_users:
             db.commit()
+            for email in downgraded_emails:
+                invalidate_user(email)
 
         # Sync Cognito premium flag for downgraded users
         for email in downgraded_emails:
@@ -1108,6 +1154,7 @@ def sync_db_from_cognito_route():
             user.subscription_status = "pro" if is_premium_flag else "basic"
             db.commit()
             db.refresh(user)
+            invalidate_user(email)
 
             return jsonify({
                 "email": user.email,
@@ -1142,10 +1189,57 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "healthy", "message": "PDF Toolbox API is running"})
 
+@app.route(prefix_route("/metrics"), methods=["GET"])
+def metrics():
+    """In-process cache and resource counters for this worker"""
+    return jsonify({
+        "premium_cache": premium_cache_stats(),
+        "watermark_cache": watermark_cache_stats(),
+        "result_cache": result_cache.stats(),
+        "page_text_cache": page_text_cache.stats(),
+        "jobs": job_queue.stats(),
+        "temp_workspace": workspace.manager.stats(),
+        "office_pool": office_pool.pool.stats(),
+        "summary_models": model_registry.registry.stats(),
+        "model_server": model_server.stats(),
+    })
+
+# ---------- Background Jobs ----------
+
+# Send "Prefer: respond-async" (or async=true) to any of these endpoints to get a task id back
+job_store = jobs.create_progress_store()
+job_queue = jobs.JobQueue(job_store)
+jobs.init_app(
+    app, job_queue,
+    endpoints=[
+        "merge_route", "split_route", "compress_route",
+        "convert_jpg_route", "convert_png_route", "convert_pptx_route", "convert_excel_route",
+        "convert_to_html_route", "convert_to_word_route", "convert_to_pdf_route",
+        "convert_word_to_pdf_route", "convert_excel_to_pdf_route", "convert_pptx_to_pdf_route",
+        "convert_html_to_pdf_route", "convert_pdf_to_pdfa_route", "pdf_scan_route",
+        "pdf_summarize_route", "pdf_summarize_ai_route",
+    ],
+    url_for_task=lambda task_id: (
+        prefix_route(f"/progress/{task_id}"), prefix_route(f"/jobs/{task_id}/download")
+    ),
+)
+
 @app.route(prefix_route("/progress/<task_id>"), methods=["GET"])
 def get_progress(task_id):
-    progress = progress_store.get(task_id, {"progress": 0, "status": "not_found"})
-    return jsonify(progress)
+    return jobs.progress_response(job_store, task_id)
+
+@app.route(prefix_route("/jobs/<task_id>/download"), methods=["GET"])
+def download_job_result(task_id):
+    return jobs.download_response(job_store, task_id)
+
+# Start LibreOffice workers now so the first Office->PDF request skips their startup
+office_pool.prewarm()
+# With MODEL_SERVER, one sidecar holds the summarization models for every worker (and does the
+# SUMMARY_WARMUP loads); otherwise load them here so AI summaries start warm
+if model_server.MODEL_SERVER_ENABLED:
+    model_server.ensure_started()
+else:
+    model_registry.prewarm()
 
 
 # ---------- Application Startup ----------
@@ -1180,7 +1274,9 @@ if __name__ == "__main__":
     print("   POST /convert-pptx-to-pdf - Convert PowerPoint to PDF (protected)")
     print("   POST /convert-html-to-pdf - Convert HTML to PDF (protected)")
     print("   GET /health - Check server status")
+    print("   GET /metrics - Cache and resource counters")
     print("   GET /progress/<task_id> - Get operation progress")
+    print("   GET /jobs/<task_id>/download - Download a finished background job")
     print("\n✅ CORS enabled for all origins")
     print("🔐 Authentication required for PDF operations")
     app.run(debug=True,use_reloader=False, host='0.0.0.0', port=5000)
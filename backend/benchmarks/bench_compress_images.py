@@ -0,0 +1,69 @@
+"""
+Benchmark compress_pdf.pymupdf_optimize image recompression across worker counts.
+
+Builds a synthetic image-heavy PDF (one distinct image per page) and times the
+optimizer with 1..N worker processes.
+
+Usage (from backend/):
+    python benchmarks/bench_compress_images.py --pages 300 --workers 1,2,4,8
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from compress_pdf import pymupdf_optimize
+
+
+def build_image_pdf(path, pages, size):
+    doc = fitz.open()
+    for i in range(pages):
+        img = Image.effect_noise((size, size), 40 + i % 50).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=buf.getvalue())
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--image-size", type=int, default=600)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1})))
+    parser.add_argument("--quality", type=int, default=70)
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    with tempfile.TemporaryDirectory() as td:
+        src = os.path.join(td, "images.pdf")
+        print(f"Building {args.pages}-page synthetic PDF...")
+        build_image_pdf(src, args.pages, args.image_size)
+        print(f"Input size: {os.path.getsize(src) / (1024 * 1024):.1f} MB, cores: {os.cpu_count()}")
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'output MB':>10}")
+        for workers in worker_counts:
+            out = os.path.join(td, f"out_{workers}.pdf")
+            # A pool per worker count; the app's shared pool has one fixed size
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                start = time.perf_counter()
+                pymupdf_optimize(src, out, quality=args.quality, resolution=150, workers=workers,
+                                 executor=executor)
+                elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x "
+                  f"{os.path.getsize(out) / (1024 * 1024):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
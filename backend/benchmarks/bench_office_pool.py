@@ -0,0 +1,107 @@
+"""
+Benchmark Office->PDF conversion: cold soffice per document vs the warm pool.
+
+The previous handlers ran `soffice --headless --convert-to pdf` for every
+request with the default profile, paying LibreOffice startup (and profile
+initialisation) each time. This script converts the same generated .docx
+files that way, each with a fresh profile, and then through office_pool,
+printing per-document latency for both.
+
+Requires LibreOffice; the pool keeps instances running only when python3-uno
+is importable, otherwise it falls back to per-document soffice runs with a
+per-worker profile.
+
+Usage (from backend/):
+    python benchmarks/bench_office_pool.py --docs 10 --workers 2
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+import office_pool
+
+
+def build_docx(path, paragraphs):
+    document = Document()
+    document.add_heading("Quarterly report", level=1)
+    for i in range(paragraphs):
+        document.add_paragraph(f"Paragraph {i + 1}: lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+    document.save(path)
+
+
+def cold_convert(soffice, input_path, output_dir):
+    profile = tempfile.mkdtemp(dir=output_dir)
+    try:
+        subprocess.run(
+            [soffice, f"-env:UserInstallation={office_pool._file_url(profile)}",
+             '--headless', '--convert-to', 'pdf', '--outdir', output_dir, input_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+        )
+    finally:
+        shutil.rmtree(profile, ignore_errors=True)
+
+
+def report(label, latencies, wall):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    print(f"{label:>18} {wall:>8.2f} {len(latencies) / wall:>8.2f} {p50:>8.2f} {latencies[0]:>8.2f} {latencies[-1]:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    args = parser.parse_args()
+
+    soffice = office_pool.find_soffice()
+    if not soffice:
+        sys.exit("LibreOffice (soffice) not found; set SOFFICE_PATH")
+
+    with tempfile.TemporaryDirectory() as td:
+        inputs = []
+        for i in range(args.docs):
+            path = os.path.join(td, f"doc_{i}.docx")
+            build_docx(path, args.paragraphs)
+            inputs.append(path)
+        print(f"UNO available: {office_pool.uno is not None}")
+        print(f"{'run':>18} {'wall s':>8} {'docs/s':>8} {'p50 s':>8} {'min s':>8} {'max s':>8}")
+
+        cold_dir = os.path.join(td, "cold")
+        os.makedirs(cold_dir)
+        latencies = []
+        start = time.perf_counter()
+        for path in inputs:
+            t = time.perf_counter()
+            cold_convert(soffice, path, cold_dir)
+            latencies.append(time.perf_counter() - t)
+        report("cold soffice", latencies, time.perf_counter() - start)
+
+        pool = office_pool.OfficePool(size=args.workers)
+        pool.start()
+
+        def pooled(path):
+            t = time.perf_counter()
+            pool.convert(path, path[:-5] + ".pdf")
+            return time.perf_counter() - t
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                latencies = list(executor.map(pooled, inputs))
+            report("warm pool", latencies, time.perf_counter() - start)
+        finally:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark the overlay engine against the previous per-page overlay approach.
+
+The previous watermark/page-number code rendered a reportlab page, serialized
+it and re-parsed it with PdfReader for every page before merge_page. This
+script times that against add_watermark_to_pdf / add_page_numbers_to_pdf and
+against a plain pikepdf open+save of the same file (the I/O floor).
+
+Usage (from backend/):
+    python benchmarks/bench_overlay.py --pages 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+import pikepdf
+from PyPDF2 import PdfReader, PdfWriter
+
+from add_page_numbers import add_page_numbers_to_pdf, create_page_number_overlay
+from add_watermark import add_watermark_to_pdf, create_watermark_pdf
+
+
+def build_text_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((72, 72 + line * 16), f"Page {i + 1}, line {line + 1}: lorem ipsum dolor sit amet")
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+
+
+def legacy_overlay(path, make_overlay):
+    """The previous implementation: one rendered and re-parsed overlay per page"""
+    reader = PdfReader(path)
+    writer = PdfWriter()
+    total = len(reader.pages)
+    for index, page in enumerate(reader.pages):
+        width = float(page.mediabox[2] - page.mediabox[0])
+        height = float(page.mediabox[3] - page.mediabox[1])
+        page.merge_page(PdfReader(make_overlay(width, height, index, total)).pages[0])
+        writer.add_page(page)
+    output = BytesIO()
+    writer.write(output)
+    return output
+
+
+def io_floor(path):
+    with pikepdf.open(path) as pdf:
+        output = BytesIO()
+        pdf.save(output)
+    return output
+
+
+def timed(label, pages, func):
+    start = time.perf_counter()
+    output = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>28} {elapsed:>9.2f} {pages / elapsed:>9.1f} {len(output.getvalue()) / (1024 * 1024):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        src = os.path.join(td, "doc.pdf")
+        print(f"Building {args.pages}-page synthetic PDF...")
+        build_text_pdf(src, args.pages)
+        print(f"Input size: {os.path.getsize(src) / (1024 * 1024):.1f} MB")
+        print(f"{'run':>28} {'seconds':>9} {'pages/s':>9} {'output MB':>10}")
+
+        timed("pikepdf open+save (floor)", args.pages, lambda: io_floor(src))
+        timed("watermark, per-page (old)", args.pages, lambda: legacy_overlay(
+            src, lambda w, h, i, n: create_watermark_pdf("CONFIDENTIAL", w, h)))
+        timed("watermark, overlay engine", args.pages, lambda: add_watermark_to_pdf(src, "CONFIDENTIAL"))
+        timed("page numbers, per-page (old)", args.pages, lambda: legacy_overlay(
+            src, lambda w, h, i, n: create_page_number_overlay(w, h, i + 1, n)))
+        timed("page numbers, overlay engine", args.pages, lambda: add_page_numbers_to_pdf(src))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark split_engine against the previous PyPDF2 page-per-writer split.
+
+Builds a synthetic PDF in which every page draws the same embedded image (and,
+with --font, the same embedded TrueType font), splits it into single pages and
+into parts of --every pages, and reports time, pages/s and total output size.
+
+Usage (from backend/):
+    python benchmarks/bench_split.py --pages 500 --every 10 --workers 1,2,4
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
+
+from split_engine import iter_split_parts, plan_every, plan_pages
+
+
+def build_shared_resource_pdf(path, pages, font_file=None):
+    buf = io.BytesIO()
+    Image.effect_noise((800, 800), 60).convert("RGB").save(buf, format="PNG")
+    doc = fitz.open()
+    xref = 0
+    for i in range(pages):
+        page = doc.new_page()
+        if font_file:
+            page.insert_font(fontname="shared", fontfile=font_file)
+            page.insert_text((72, 72), f"Page {i + 1} of the quarterly report", fontname="shared")
+        else:
+            page.insert_text((72, 72), f"Page {i + 1} of the quarterly report")
+        xref = page.insert_image(fitz.Rect(72, 100, 500, 528), stream=buf.getvalue(), xref=xref)
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+
+
+def legacy_split(src, parts, output_dir):
+    """The previous implementation: a fresh PdfWriter per part"""
+    reader = PdfReader(src)
+    total = 0
+    for index, part in enumerate(parts):
+        writer = PdfWriter()
+        for i in range(part.first, part.last + 1):
+            writer.add_page(reader.pages[i])
+        path = os.path.join(output_dir, f"{index}.pdf")
+        with open(path, "wb") as f:
+            writer.write(f)
+        total += os.path.getsize(path)
+    return total
+
+
+def engine_split(src, parts, workers):
+    total = 0
+    # A pool per worker count; the app's shared pool has one fixed size
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _name, path in iter_split_parts(src, parts, workers=workers, executor=executor):
+            total += os.path.getsize(path)
+    return total
+
+
+def report(label, pages, elapsed, total_bytes):
+    print(f"{label:>22} {elapsed:>9.2f} {pages / elapsed:>9.1f} {total_bytes / (1024 * 1024):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--every", type=int, default=10)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})))
+    parser.add_argument("--font", help="TrueType font embedded once and used on every page")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    with tempfile.TemporaryDirectory() as td:
+        src = os.path.join(td, "report.pdf")
+        print(f"Building {args.pages}-page synthetic PDF...")
+        build_shared_resource_pdf(src, args.pages, args.font)
+        print(f"Input size: {os.path.getsize(src) / (1024 * 1024):.1f} MB, cores: {os.cpu_count()}")
+
+        plans = [
+            ("single pages", plan_pages(0, args.pages - 1)),
+            (f"every {args.every} pages", plan_every(args.every, args.pages)),
+        ]
+        for plan_name, parts in plans:
+            print(f"\n{plan_name}: {len(parts)} parts")
+            print(f"{'implementation':>22} {'seconds':>9} {'pages/s':>9} {'output MB':>10}")
+
+            legacy_dir = os.path.join(td, "legacy")
+            os.makedirs(legacy_dir)
+            start = time.perf_counter()
+            total = legacy_split(src, parts, legacy_dir)
+            report("PyPDF2 (previous)", args.pages, time.perf_counter() - start, total)
+            shutil.rmtree(legacy_dir)
+
+            for workers in worker_counts:
+                start = time.perf_counter()
+                total = engine_split(src, parts, workers)
+                report(f"split_engine x{workers}", args.pages, time.perf_counter() - start, total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark AI summarization of a long document.
+
+Compares the previous approach (character-count chunks fed to the pipeline
+one at a time) with map_reduce_summarize (token-packed chunks in batches,
+then hierarchical reduce) on the same synthetic text, after loading the
+model once. The previous approach is timed over the whole document, not
+just the first 8 chunks it used to keep, so the throughput numbers compare
+like with like.
+
+Requires transformers and torch.
+
+Usage (from backend/):
+    python benchmarks/bench_summarize.py --pages 200 --batch-size 8 --threads 4
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("invoice payment contract supplier delivery quarter revenue customer schedule report "
+         "agreement shipment warehouse budget forecast margin review approval policy audit").split()
+
+
+def build_text(pages, sentences_per_page=25, seed=7):
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(pages * sentences_per_page):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def legacy_chunks(text):
+    """The previous 1500-character chunking"""
+    sentences = [s.strip() for s in re.split(r'[\.!?]\s+', text) if s.strip()]
+    chunks, buf, cur_len = [], [], 0
+    for s in sentences:
+        buf.append(s)
+        cur_len += len(s)
+        if cur_len > 1500:
+            chunks.append(" ".join(buf))
+            buf, cur_len = [], 0
+    if buf:
+        chunks.append(" ".join(buf))
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = torch default)")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the map-reduce summarizer")
+    args = parser.parse_args()
+
+    try:
+        import torch
+    except ImportError:
+        sys.exit("torch and transformers are required for this benchmark")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    from model_registry import ModelRegistry, DEFAULT_SUMMARY_MODEL
+    from summary_engine import map_reduce_summarize
+
+    name = args.model or DEFAULT_SUMMARY_MODEL
+    registry = ModelRegistry([name])
+    loaded, load_seconds = registry.get(name)
+    print(f"Model {name} loaded in {load_seconds:.1f}s ({loaded.nbytes / (1024 * 1024):.0f} MB), "
+          f"torch threads: {torch.get_num_threads()}")
+
+    text = build_text(args.pages)
+    print(f"Document: {args.pages} pages, {len(text.split())} words")
+    print(f"{'run':>28} {'chunks':>7} {'seconds':>9} {'chunks/s':>9} {'pages/s':>8}")
+
+    if not args.skip_legacy:
+        chunks = legacy_chunks(text)
+        start = time.perf_counter()
+        for chunk in chunks:
+            loaded.summarizer(chunk, min_length=64, max_length=256)
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential, char chunks':>28} {len(chunks):>7} {elapsed:>9.1f} "
+              f"{len(chunks) / elapsed:>9.2f} {args.pages / elapsed:>8.2f}")
+
+    start = time.perf_counter()
+    summaries, stats = map_reduce_summarize(
+        text, loaded.summarizer, loaded.tokenizer, loaded.model, batch_size=args.batch_size
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{'map-reduce, batched':>28} {stats['chunks']:>7} {elapsed:>9.1f} "
+          f"{stats['chunks'] / elapsed:>9.2f} {args.pages / elapsed:>8.2f}")
+    print(f"Reduce rounds: {stats['rounds']}, final bullets: {len(summaries)}")
+
+
+if __name__ == "__main__":
+    main()
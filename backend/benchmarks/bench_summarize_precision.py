@@ -0,0 +1,141 @@
+"""
+Benchmark quantized summarization against the fp32 model.
+
+Loads the model once per precision (fp32, int8 dynamic quantization, and
+int8 ONNX if optimum[onnxruntime] is installed), summarizes the same fixed
+corpus with each, and reports load time, weight size, per-document latency,
+throughput, and ROUGE-1 / ROUGE-L F1 agreement of each summary with the
+fp32 summary of the same document.
+
+The default corpus is one document per page of the site's terms and
+conditions PDF; pass --corpus with .pdf/.txt files to use your own (each
+file is one document).
+
+Requires transformers and torch.
+
+Usage (from backend/):
+    python benchmarks/bench_summarize_precision.py --precisions fp32,int8,onnx --threads 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'frontend', 'public',
+                              'terms-conditions.pdf')
+
+
+def load_corpus(paths):
+    import fitz
+
+    documents = []
+    for path in paths:
+        if path.lower().endswith('.txt'):
+            with open(path, encoding='utf-8', errors='ignore') as f:
+                documents.append(f.read())
+            continue
+        with fitz.open(path) as doc:
+            pages = [page.get_text() for page in doc]
+        # The default corpus is one long PDF; treat its pages as separate documents
+        documents.extend(pages if paths == [DEFAULT_CORPUS] else ["\n".join(pages)])
+    return [d for d in documents if len(d.split()) >= 40]
+
+
+def _lcs_length(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def _f1(overlap, candidate_len, reference_len):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate_len, overlap / reference_len
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge(candidate, reference):
+    """(ROUGE-1 F1, ROUGE-L F1) on lowercased word tokens"""
+    c, r = candidate.lower().split(), reference.lower().split()
+    if not c or not r:
+        return 0.0, 0.0
+    counts = {}
+    for word in r:
+        counts[word] = counts.get(word, 0) + 1
+    unigram_overlap = 0
+    for word in c:
+        if counts.get(word):
+            counts[word] -= 1
+            unigram_overlap += 1
+    return _f1(unigram_overlap, len(c), len(r)), _f1(_lcs_length(c, r), len(c), len(r))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--precisions", default="fp32,int8,onnx")
+    parser.add_argument("--corpus", nargs="*", default=[DEFAULT_CORPUS])
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = torch default)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    try:
+        import torch
+    except ImportError:
+        sys.exit("torch and transformers are required for this benchmark")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    from model_registry import DEFAULT_SUMMARY_MODEL, load_transformers_model
+    from summary_engine import map_reduce_summarize
+
+    name = args.model or DEFAULT_SUMMARY_MODEL
+    documents = load_corpus(args.corpus)
+    if not documents:
+        sys.exit("Corpus has no documents with text")
+    precisions = [p.strip() for p in args.precisions.split(",") if p.strip()]
+    if "fp32" not in precisions:
+        precisions.insert(0, "fp32")
+    print(f"Model {name}, {len(documents)} documents, {sum(len(d.split()) for d in documents)} words, "
+          f"torch threads: {torch.get_num_threads()}")
+    print(f"{'precision':>10} {'load s':>7} {'MB':>6} {'p50 s/doc':>10} {'p95 s/doc':>10} "
+          f"{'chunks/s':>9} {'rouge1':>7} {'rougeL':>7}")
+
+    reference = None
+    for precision in precisions:
+        started = time.perf_counter()
+        loaded = load_transformers_model(name, precision)
+        load_seconds = time.perf_counter() - started
+        if loaded.precision != precision:
+            print(f"{precision:>10} unavailable, loaded as {loaded.precision}; skipped")
+            continue
+        loaded.summarizer("Warm-up sentence for the summarization model.", min_length=1, max_length=8)
+
+        summaries, latencies, chunks = [], [], 0
+        for document in documents:
+            started = time.perf_counter()
+            outputs, stats = map_reduce_summarize(document, loaded.summarizer, loaded.tokenizer, loaded.model,
+                                                  batch_size=args.batch_size)
+            latencies.append(time.perf_counter() - started)
+            summaries.append(" ".join(outputs))
+            chunks += stats["chunks"]
+        if reference is None:
+            reference = summaries
+        scores = [rouge(s, r) for s, r in zip(summaries, reference)]
+        latencies.sort()
+        print(f"{precision:>10} {load_seconds:>7.1f} {loaded.nbytes / (1024 * 1024):>6.0f} "
+              f"{statistics.median(latencies):>10.2f} {latencies[int(0.95 * (len(latencies) - 1))]:>10.2f} "
+              f"{chunks / sum(latencies):>9.2f} {statistics.mean(s[0] for s in scores):>7.3f} "
+              f"{statistics.mean(s[1] for s in scores):>7.3f}")
+        del loaded
+
+
+if __name__ == "__main__":
+    main()
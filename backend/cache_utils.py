@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time-to-live.
+
+    Shared by the whole worker process, so every method takes the internal lock.
+    Hit/miss/eviction counters are kept for the /metrics endpoint. With maxbytes
+    set, least recently used entries are also evicted to keep the summed entry
+    size under the budget.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, maxbytes=None, sizeof=len):
+        """
+        Args:
+            maxsize: Maximum number of entries kept before the least recently used is evicted
+            ttl: Default lifetime of an entry in seconds
+            maxbytes: Optional budget for the summed size of all entries
+            sizeof: Size of a value in bytes, used when maxbytes is set
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (expires_at, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value under key; ttl overrides the default lifetime for this entry"""
+        lifetime = self.ttl if ttl is None else ttl
+        if lifetime <= 0:
+            return
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            # Would evict everything else and still not fit
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._data[key] = (time.monotonic() + lifetime, value, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self._bytes > self.maxbytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single entry. Returns True if it was present."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return False
+            self._bytes -= entry[2]
+            return True
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        """Return a JSON-serialisable snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+            if self.maxbytes is not None:
+                stats["bytes"] = self._bytes
+                stats["maxbytes"] = self.maxbytes
+            return stats
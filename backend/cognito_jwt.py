@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from jose import jwt
+from jose.exceptions import JWTError
+
+# "local" verifies access tokens against the user pool JWKS, "remote" calls cognito.get_user
+JWT_VERIFY_MODE = os.environ.get('COGNITO_JWT_VERIFY', 'local').lower()
+
+
+class TokenVerificationError(Exception):
+    """The token is malformed, expired, or its signature/claims do not check out"""
+
+
+class UnknownKeyError(TokenVerificationError):
+    """The token was signed with a key id that is not in the (refreshed) JWKS"""
+
+
+class JWKSCache:
+    """
+    Cognito user pool signing keys, cached in memory and on disk.
+
+    Keys are refreshed when the cached set is older than refresh_interval, or when a
+    token arrives with an unknown kid (key rotation) - but at most once every
+    min_refresh_interval so a flood of forged kids cannot hammer the JWKS endpoint.
+    """
+
+    def __init__(self, region, user_pool_id, cache_path=None, refresh_interval=24 * 3600,
+                 min_refresh_interval=60, fetcher=None):
+        self.region = region
+        self.user_pool_id = user_pool_id
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        self.jwks_url = f"{self.issuer}/.well-known/jwks.json"
+        self.cache_path = cache_path or os.environ.get('COGNITO_JWKS_CACHE') or os.path.join(
+            tempfile.gettempdir(), f"pdfville_jwks_{user_pool_id}.json"
+        )
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._fetcher = fetcher or self._fetch_remote
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._load_disk()
+
+    def _fetch_remote(self):
+        response = requests.get(self.jwks_url, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def _load_disk(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._keys = {k['kid']: k for k in data.get('keys', []) if 'kid' in k}
+            self._fetched_at = float(data.get('fetched_at', 0))
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _store_disk(self, jwks):
+        try:
+            directory = os.path.dirname(self.cache_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'keys': jwks.get('keys', []), 'fetched_at': self._fetched_at}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: could not persist JWKS cache: {e}")
+
+    def refresh(self, force=False):
+        """Fetch the key set again. Returns True if the in-memory keys were replaced."""
+        with self._lock:
+            now = time.time()
+            if not force and now - self._last_attempt < self.min_refresh_interval:
+                return False
+            self._last_attempt = now
+            try:
+                jwks = self._fetcher()
+            except Exception as e:
+                # Keep serving the keys we already have
+                print(f"Error fetching Cognito JWKS: {e}")
+                return False
+            self._keys = {k['kid']: k for k in jwks.get('keys', []) if 'kid' in k}
+            self._fetched_at = now
+            self._store_disk(jwks)
+            return True
+
+    def get_key(self, kid):
+        """Return the JWK for kid, refreshing the key set if it is stale or kid is unknown"""
+        if not self._keys or time.time() - self._fetched_at > self.refresh_interval:
+            self.refresh()
+        key = self._keys.get(kid)
+        if key is None and self.refresh():
+            key = self._keys.get(kid)
+        return key
+
+
+def verify_access_token(token, jwks_cache, app_client_id=None):
+    """
+    Verify a Cognito access token locally.
+
+    Args:
+        token: Raw JWT (without the "Bearer " prefix)
+        jwks_cache: JWKSCache for the user pool that issued the token
+        app_client_id: If given, the token's client_id claim must match it
+
+    Returns:
+        The verified claims dict
+
+    Raises:
+        UnknownKeyError: kid not found even after a JWKS refresh
+        TokenVerificationError: any other verification failure
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError as e:
+        raise TokenVerificationError(f"Malformed token: {e}")
+
+    key = jwks_cache.get_key(header.get('kid'))
+    if key is None:
+        raise UnknownKeyError(f"Unknown signing key: {header.get('kid')}")
+
+    try:
+        # Access tokens carry client_id instead of aud
+        claims = jwt.decode(
+            token, key, algorithms=['RS256'], issuer=jwks_cache.issuer,
+            options={'verify_aud': False}
+        )
+    except JWTError as e:
+        raise TokenVerificationError(str(e))
+
+    if claims.get('token_use') != 'access':
+        raise TokenVerificationError("Not an access token")
+    if app_client_id and claims.get('client_id') != app_client_id:
+        raise TokenVerificationError("Token was issued for a different client")
+    return claims
@@ -40,6 +40,10 @@ def set_premium_cognito(email, is_premium_=True):
             ]
         )
         print(f"Successfully set custom:is_premium_ to '{attribute_value}' for user {email} ({cognito_username}).")
+
+        # The premium flag just changed; drop any cached lookup for this user
+        from restrictions import invalidate_user
+        invalidate_user(email)
         return True
 
     except Exception as e:
@@ -1,8 +1,10 @@
-from restrictions import check_compress_pdf_restrictions, get_user
+from restrictions import check_compress_pdf_restrictions, get_request_user
 from flask import jsonify, send_file, request
 import pikepdf
 import traceback
 from utils import create_temp_file
+import result_cache
+from jobs import report_progress
 import os
 from PIL import Image
 import io
@@ -11,6 +13,8 @@ import time
 import fitz  # PyMuPDF
 import subprocess
 import shutil
+from collections import deque
+from process_pools import SharedProcessPool
 
 
 def format_file_size(size_in_bytes):
@@ -63,105 +67,33 @@ def compress_pdf():
                 return jsonify({"error": restriction}), 403
         
         # Get user status for premium features
-        user = get_user(email)
+        user = get_request_user(email)
         is_premium = user["is_premium_"]
         # --------------------------
 
+        if compression_level not in ("lossless", "medium", "high"):
+            return jsonify({"error": "Invalid compression level"}), 400
+
         # Process each file (single file for free users, multiple for premium)
         results = []
         
         for file_index, file in enumerate(temp_files):
-            # Temp output path for this file
-            output_path = create_temp_file(".pdf")
-            temp_path = create_temp_file(".pdf")  # For intermediate processing
-            
             # File size before compression
             original_size = os.path.getsize(file)
-            input_path = file
-
-        # -------------------------------
-        # MODE: LOSSLESS (metadata cleanup + stream compression)
-        # -------------------------------
-        if compression_level == "lossless":
-            # First pass with pikepdf for metadata cleanup and basic compression
-            with pikepdf.open(input_path) as pdf:
-                # Clear metadata safely
-                for key in list(pdf.docinfo.keys()):
-                    del pdf.docinfo[key]
-
-                if "/Metadata" in pdf.Root:
-                    del pdf.Root.Metadata
-                if pdf.Root.get("/Metadata") is not None:
-                    del pdf.Root.Metadata
-                pdf.remove_unreferenced_resources()
-                pdf.save(temp_path, compress_streams=True, linearize=True)
-            
-            # Second pass with qpdf for additional lossless optimization
-            qpdf_optimize(temp_path, output_path, compression_level="lossless")
 
-        # -------------------------------
-        # MODE: MEDIUM (image optimization + structure optimization)
-        # -------------------------------
-        elif compression_level == "medium":
-            # First pass with PyMuPDF for image optimization
-            pymupdf_optimize(input_path, temp_path, quality=90, resolution=170)
-            
-            # Copy the temp file to output path since we're missing this step
-            shutil.copy2(temp_path, output_path)
-            
-        # -------------------------------
-        # MODE: HIGH (premium only - maximum compression)
-        # -------------------------------
-        elif compression_level == "high" and is_premium:
-            # High compression is premium only - uses more aggressive settings
-            pymupdf_optimize(input_path, temp_path, quality=70, resolution=150, grayscale=False)
-            
-            # Second pass with pikepdf for additional optimization
-            with pikepdf.open(temp_path) as pdf:
-                # Clear metadata safely
-                for key in list(pdf.docinfo.keys()):
-                    del pdf.docinfo[key]
-
-                if "/Metadata" in pdf.Root:
-                    del pdf.Root.Metadata
-                pdf.remove_unreferenced_resources()
-                pdf.save(output_path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
-
-        # -------------------------------
-        # MODE: HIGH (aggressive hybrid approach)
-        # -------------------------------
-        elif compression_level == "high":
-            # First pass with PyMuPDF for aggressive image optimization
-            pymupdf_optimize(input_path, temp_path, quality=20, resolution=90, grayscale=True)
-            
-            # Second pass with pikepdf for structure optimization
-            with pikepdf.open(temp_path) as pdf:
-                # Clear metadata safely
-                for key in list(pdf.docinfo.keys()):
-                    del pdf.docinfo[key]
-
-                if "/Metadata" in pdf.Root:
-                    del pdf.Root.Metadata
-                if pdf.Root.get("/Metadata") is not None:
-                    del pdf.Root.Metadata
-                pdf.remove_unreferenced_resources()
-                pdf.save(temp_path + ".opt", compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
-            
-            # Final pass with qpdf for maximum compression
-            qpdf_optimize(temp_path + ".opt", output_path, compression_level="high")
-            
-            # Clean up intermediate file
-            if os.path.exists(temp_path + ".opt"):
-                os.remove(temp_path + ".opt")
-
-        else:
-            return jsonify({"error": "Invalid compression level"}), 400
-
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+            # Identical input + options (premium only changes the "high" pipeline) -> reuse the result
+            cache_key = result_cache.make_key("compress_pdf", [file], {
+                "compression_level": compression_level,
+                "premium": is_premium if compression_level == "high" else None
+            })
+            output_path = result_cache.get(cache_key)
+            if output_path is None:
+                # Temp output path for this file
+                output_path = create_temp_file(".pdf")
+                _compress_file(file, output_path, compression_level, is_premium)
+                result_cache.put(cache_key, output_path)
 
-        # File size after compression
+            # File size after compression
             compressed_size = os.path.getsize(output_path)
             compression_ratio = (original_size - compressed_size) / original_size * 100
             
@@ -185,6 +117,7 @@ def compress_pdf():
             print(f"Compression results for file {file_index+1}/{len(temp_files)}: Original {original_size/1024:.2f}KB → "
                   f"Compressed {compressed_size/1024:.2f}KB "
                   f"({compression_ratio:.2f}% saved)")
+            report_progress(file_index + 1, len(temp_files), f"Compressed {file_index+1}/{len(temp_files)} files")
         
         # Clean up temp input files
         for temp_file in temp_files:
@@ -223,93 +156,225 @@ def compress_pdf():
         return jsonify({"error": f"Failed to compress PDF: {str(e)}"}), 500
 
 
+def _compress_file(input_path, output_path, compression_level, is_premium):
+    """
+    Run the compression pipeline for one file.
+
+    Args:
+        input_path: Path to the uploaded PDF
+        output_path: Where the compressed PDF is written
+        compression_level: lossless, medium or high
+        is_premium: Premium users get the quality-preserving "high" pipeline
+    """
+    temp_path = create_temp_file(".pdf")  # For intermediate processing
+
+    # -------------------------------
+    # MODE: LOSSLESS (metadata cleanup + stream compression)
+    # -------------------------------
+    if compression_level == "lossless":
+        # First pass with pikepdf for metadata cleanup and basic compression
+        with pikepdf.open(input_path) as pdf:
+            # Clear metadata safely
+            for key in list(pdf.docinfo.keys()):
+                del pdf.docinfo[key]
+
+            if "/Metadata" in pdf.Root:
+                del pdf.Root.Metadata
+            if pdf.Root.get("/Metadata") is not None:
+                del pdf.Root.Metadata
+            pdf.remove_unreferenced_resources()
+            pdf.save(temp_path, compress_streams=True, linearize=True)
+        
+        # Second pass with qpdf for additional lossless optimization
+        qpdf_optimize(temp_path, output_path, compression_level="lossless")
+
+    # -------------------------------
+    # MODE: MEDIUM (image optimization + structure optimization)
+    # -------------------------------
+    elif compression_level == "medium":
+        # First pass with PyMuPDF for image optimization
+        pymupdf_optimize(input_path, temp_path, quality=90, resolution=170)
+        
+        # Copy the temp file to output path since we're missing this step
+        shutil.copy2(temp_path, output_path)
+        
+    # -------------------------------
+    # MODE: HIGH (premium only - maximum compression)
+    # -------------------------------
+    elif compression_level == "high" and is_premium:
+        # High compression is premium only - uses more aggressive settings
+        pymupdf_optimize(input_path, temp_path, quality=70, resolution=150, grayscale=False)
+        
+        # Second pass with pikepdf for additional optimization
+        with pikepdf.open(temp_path) as pdf:
+            # Clear metadata safely
+            for key in list(pdf.docinfo.keys()):
+                del pdf.docinfo[key]
+
+            if "/Metadata" in pdf.Root:
+                del pdf.Root.Metadata
+            pdf.remove_unreferenced_resources()
+            pdf.save(output_path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+
+    # -------------------------------
+    # MODE: HIGH (aggressive hybrid approach)
+    # -------------------------------
+    elif compression_level == "high":
+        # First pass with PyMuPDF for aggressive image optimization
+        pymupdf_optimize(input_path, temp_path, quality=20, resolution=90, grayscale=True)
+        
+        # Second pass with pikepdf for structure optimization
+        with pikepdf.open(temp_path) as pdf:
+            # Clear metadata safely
+            for key in list(pdf.docinfo.keys()):
+                del pdf.docinfo[key]
+
+            if "/Metadata" in pdf.Root:
+                del pdf.Root.Metadata
+            if pdf.Root.get("/Metadata") is not None:
+                del pdf.Root.Metadata
+            pdf.remove_unreferenced_resources()
+            pdf.save(temp_path + ".opt", compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        
+        # Final pass with qpdf for maximum compression
+        qpdf_optimize(temp_path + ".opt", output_path, compression_level="high")
+        
+        # Clean up intermediate file
+        if os.path.exists(temp_path + ".opt"):
+            os.remove(temp_path + ".opt")
+
+    # Clean up temp file
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+# Worker pool for image recompression. Decode/resample/encode is pure CPU work in
+# Pillow, so it runs in separate processes; the pool is shared by all requests.
+COMPRESS_WORKERS = int(os.environ.get("COMPRESS_WORKERS", os.cpu_count() or 1))
+_image_pool = SharedProcessPool(COMPRESS_WORKERS)
+
+
+def _recompress_image(image_bytes, dpi, quality, resolution, grayscale):
+    """
+    Decode, downsample and re-encode one image with Pillow.
+
+    Runs inside a pool worker, so it only takes and returns plain bytes.
+
+    Returns:
+        Re-encoded image bytes (JPEG for L/RGB, PNG otherwise)
+    """
+    with io.BytesIO(image_bytes) as stream:
+        img = Image.open(stream)
+        img.load()
+
+    # Get original size
+    original_width, original_height = img.size
+
+    # Calculate new dimensions based on resolution
+    if dpi and max(dpi) > resolution:
+        scale_factor = resolution / max(dpi)
+        new_width = max(1, math.floor(original_width * scale_factor))
+        new_height = max(1, math.floor(original_height * scale_factor))
+        img = img.resize((new_width, new_height), Image.LANCZOS)
+
+    # Convert to grayscale if requested
+    if grayscale and img.mode in ["RGB", "RGBA"]:
+        img = img.convert("L")
+    # Handle transparency
+    elif img.mode == "RGBA":
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])
+        img = background
+
+    # Compress the image
+    with io.BytesIO() as output:
+        if img.mode in ["L", "RGB"]:
+            img.save(output, format="JPEG", quality=quality, optimize=True)
+        else:
+            img.save(output, format="PNG", optimize=True, compress_level=9)
+        return output.getvalue()
+
+
+def _iter_unique_images(doc):
+    """Yield (page_num, xref) for every image, each shared xref only on its first page"""
+    seen = set()
+    for page_num in range(len(doc)):
+        for img_info in doc[page_num].get_images(full=True):
+            xref = img_info[0]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            yield page_num, xref
+
+
 # PyMuPDF-based optimization (replaces Ghostscript)
-def pymupdf_optimize(input_path, output_path, quality=70, resolution=150, grayscale=False):
+def pymupdf_optimize(input_path, output_path, quality=70, resolution=150, grayscale=False, workers=None,
+                     executor=None):
     """
     Optimize PDF using PyMuPDF (fitz)
     
+    Images are deduplicated by xref (an image shared by many pages is recompressed
+    once) and recompressed across a process pool. Results are written back in page
+    order, with at most a small window of images in flight to bound memory.
+
     Args:
         input_path: Path to input PDF
         output_path: Path to save optimized PDF
         quality: JPEG quality for image compression (1-100)
         resolution: Target DPI for images
         grayscale: Whether to convert images to grayscale
+        workers: Images recompressed in parallel (default COMPRESS_WORKERS); 1 runs inline
+        executor: Process pool to use instead of the shared one
     """
     try:
         # Open the PDF with PyMuPDF
         doc = fitz.open(input_path)
-        
+        workers = max(1, workers or COMPRESS_WORKERS)
+        pool = (executor or _image_pool.get()) if workers > 1 else None
+        in_flight = deque()
+
+        def write_back(page_num, xref, original_size, opt_bytes):
+            # Only keep the recompressed version if it actually saves space
+            if opt_bytes and len(opt_bytes) < original_size:
+                doc[page_num].replace_image(xref, stream=opt_bytes)
+
+        def drain(limit):
+            while len(in_flight) > limit:
+                page_num, xref, original_size, result = in_flight.popleft()
+                try:
+                    opt_bytes = result.result() if pool else result()
+                except Exception as img_error:
+                    # Skip problematic images
+                    print(f"Error recompressing image xref {xref}: {str(img_error)}")
+                    continue
+                write_back(page_num, xref, original_size, opt_bytes)
+
+        for page_num, xref in _iter_unique_images(doc):
+            base_image = doc.extract_image(xref)
+            # Images with a soft mask would lose their transparency link; leave them alone
+            if not base_image or base_image.get("smask"):
+                continue
+            args = (
+                base_image["image"],
+                (base_image.get("xres"), base_image.get("yres")) if base_image.get("xres") else None,
+                quality, resolution, grayscale
+            )
+            if pool:
+                result = pool.submit(_recompress_image, *args)
+            else:
+                result = lambda args=args: _recompress_image(*args)
+            in_flight.append((page_num, xref, len(base_image["image"]), result))
+            drain(workers * 2)
+        drain(0)
+
         # Create a new PDF for the optimized version
         new_doc = fitz.open()
         
-        # Process each page
+        # Copy each page, which now references the optimized images
         for page_num in range(len(doc)):
-            # Get the page
             page = doc[page_num]
-            
-            # Create a new page in the output document
             new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
-            
-            # Extract images from the page
-            image_list = page.get_images(full=True)
-            
-            # If no images, just copy the page content
-            if not image_list:
-                new_page.show_pdf_page(new_page.rect, doc, page_num)
-                continue
-            
-            # Create a list to store optimized images
-            optimized_images = []
-            
-            # Process each image
-            for img_index, img_info in enumerate(image_list):
-                xref = img_info[0]
-                
-                # Extract image
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                
-                # Process with Pillow
-                with io.BytesIO(image_bytes) as stream:
-                    img = Image.open(stream)
-                    img.load()
-                    
-                    # Get original size
-                    original_width, original_height = img.size
-                    
-                    # Calculate new dimensions based on resolution
-                    if base_image.get("dpi") and max(base_image["dpi"]) > resolution:
-                        scale_factor = resolution / max(base_image["dpi"])
-                        new_width = max(1, math.floor(original_width * scale_factor))
-                        new_height = max(1, math.floor(original_height * scale_factor))
-                        img = img.resize((new_width, new_height), Image.LANCZOS)
-                    
-                    # Convert to grayscale if requested
-                    if grayscale and img.mode in ["RGB", "RGBA"]:
-                        img = img.convert("L")
-                    # Handle transparency
-                    elif img.mode == "RGBA":
-                        background = Image.new("RGB", img.size, (255, 255, 255))
-                        background.paste(img, mask=img.split()[3])
-                        img = background
-                    
-                    # Compress the image
-                    with io.BytesIO() as output:
-                        if img.mode in ["L", "RGB"]:
-                            img.save(output, format="JPEG", quality=quality, optimize=True)
-                        else:
-                            img.save(output, format="PNG", optimize=True, compress_level=9)
-                        
-                        output.seek(0)
-                        optimized_images.append((img_info, output.getvalue()))
-            
-            # Draw the page content without images
             new_page.show_pdf_page(new_page.rect, doc, page_num)
-            
-            # Replace images with optimized versions
-            for img_info, opt_bytes in optimized_images:
-                xref = img_info[0]
-                doc.update_stream(xref, opt_bytes)
         
         # Save the optimized PDF
         new_doc.save(output_path, garbage=4, deflate=True, clean=True)
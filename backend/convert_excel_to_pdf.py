@@ -1,10 +1,11 @@
 from flask import request, jsonify, send_file
-import io, os, tempfile, traceback
-import subprocess
+import io, os, traceback
 import platform
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+import office_pool
 from restrictions import check_convert_pdf_restrictions
+from utils import create_temp_dir
  
 # Only import comtypes on Windows
 if platform.system() == 'Windows':
@@ -43,7 +44,7 @@ def convert_excel_to_pdf():
             return jsonify({"error": f"File {filename} is not an Excel spreadsheet"}), 400
         
         # Create a temporary directory to work with
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         input_path = os.path.join(temp_dir, filename)
         output_path = os.path.join(temp_dir, "output.pdf")
         
@@ -87,47 +88,16 @@ def convert_excel_to_pdf():
 
 def _convert_with_libreoffice(input_path, output_path):
     """
-    Convert Excel to PDF using LibreOffice/OpenOffice
+    Convert Excel to PDF on the shared LibreOffice worker pool
     """
     try:
-        # Try to find LibreOffice or OpenOffice executable
-        soffice_path = None
-        if platform.system() == 'Windows':
-            possible_paths = [
-                r'C:\Program Files\LibreOffice\program\soffice.exe',
-                r'C:\Program Files (x86)\LibreOffice\program\soffice.exe',
-                r'C:\Program Files\OpenOffice\program\soffice.exe',
-                r'C:\Program Files (x86)\OpenOffice\program\soffice.exe'
-            ]
-            for path in possible_paths:
-                if os.path.exists(path):
-                    soffice_path = path
-                    break
-        else:
-            # For Linux/Mac, try to find in PATH
-            soffice_path = 'soffice'
-        
-        if not soffice_path:
-            return jsonify({"error": "LibreOffice/OpenOffice not found"}), 500
-        
-        # Convert using LibreOffice/OpenOffice
-        output_dir = os.path.dirname(output_path)
-        cmd = [soffice_path, '--headless', '--convert-to', 'pdf', '--outdir', output_dir, input_path]
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
-        
-        # Check if conversion was successful
-        base_name = os.path.splitext(os.path.basename(input_path))[0]
-        generated_pdf = os.path.join(output_dir, f"{base_name}.pdf")
-        
-        if os.path.exists(generated_pdf):
-            # Rename to expected output path if needed
-            if generated_pdf != output_path:
-                os.rename(generated_pdf, output_path)
-            return send_file(output_path, as_attachment=True, download_name="converted.pdf")
-        else:
-            return jsonify({"error": "Conversion failed"}), 500
-    
-    except Exception as e:
+        office_pool.convert_to_pdf(input_path, output_path)
+        return send_file(output_path, as_attachment=True, download_name="converted.pdf")
+    except office_pool.OfficeBusyError as e:
+        return jsonify({"error": str(e)}), 503
+    except office_pool.OfficeTimeoutError as e:
+        # Not the document's fault, so not a 500
+        return jsonify({"error": str(e)}), 504
+    except office_pool.OfficeConversionError as e:
         print(f"LibreOffice conversion failed: {str(e)}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -1,5 +1,5 @@
 from flask import request, jsonify, send_file
-import io, os, tempfile, traceback
+import io, os, traceback
 import base64
 import re
 import fitz  # PyMuPDF
@@ -10,6 +10,7 @@ from reportlab.lib.units import inch
 from bs4 import BeautifulSoup
 from PIL import Image as PILImage
 from restrictions import check_convert_pdf_restrictions
+from utils import create_temp_dir
 
 
 def convert_html_to_pdf():
@@ -44,7 +45,7 @@ def convert_html_to_pdf():
             return jsonify({"error": "No HTML content or file provided"}), 400
         
         # Create a temporary directory to work with
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         output_path = os.path.join(temp_dir, "output.pdf")
         
         # Check restrictions for PDF conversion (create a temporary file for size check)
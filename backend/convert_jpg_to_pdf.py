@@ -1,10 +1,11 @@
 from flask import request, jsonify, send_file
-import io, os, tempfile, traceback
+import io, os, traceback
 from PIL import Image
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-import zipfile
+from zip_stream import zip_response
 from restrictions import check_convert_pdf_restrictions
+from utils import create_temp_dir
 
 def convert_jpg_to_pdf():
     """
@@ -38,7 +39,7 @@ def convert_jpg_to_pdf():
                 return jsonify({"error": f"File {filename} is not a JPG/JPEG image"}), 400
         
         # Create a temporary directory to work with
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         
         # Save files temporarily for restriction check
         temp_file_paths = []
@@ -70,10 +71,8 @@ def convert_jpg_to_pdf():
             
             return send_file(output_path, as_attachment=True, download_name="converted.pdf")
         else:
-            # Multiple files - create individual PDFs and zip them
-            zip_path = os.path.join(temp_dir, "converted_pdfs.zip")
-            
-            with zipfile.ZipFile(zip_path, 'w') as zipf:
+            # Multiple files - create individual PDFs and stream them in a zip as they are made
+            def pdfs():
                 for i, temp_path in enumerate(temp_file_paths):
                     # Create PDF for each image
                     pdf_filename = f"image_{i+1}.pdf"
@@ -84,9 +83,9 @@ def convert_jpg_to_pdf():
                         image = image.convert('RGB')
                     
                     image.save(pdf_path, "PDF")
-                    zipf.write(pdf_path, pdf_filename)
+                    yield pdf_filename, pdf_path
             
-            return send_file(zip_path, as_attachment=True, download_name="converted_pdfs.zip")
+            return zip_response(pdfs(), "converted_pdfs.zip")
     
     except Exception as e:
         print("🔥 ERROR in convert_jpg_to_pdf function:")
@@ -1,10 +1,11 @@
 from flask import request, jsonify, send_file
-import io, os, tempfile, traceback
+import io, os, traceback
 from PIL import Image
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 import zipfile
 from restrictions import check_convert_pdf_restrictions
+from utils import create_temp_dir
 
 def convert_png_to_pdf():
     """
@@ -38,7 +39,7 @@ def convert_png_to_pdf():
                 return jsonify({"error": f"File {filename} is not a PNG image"}), 400
         
         # Create a temporary directory to work with
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         
         # Save files temporarily for restriction check
         temp_file_paths = []
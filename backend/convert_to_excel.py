@@ -1,17 +1,18 @@
-from restrictions import check_restrictions, get_user
-from flask import jsonify, send_file, request
+from restrictions import check_restrictions, get_request_user
+from flask import jsonify, request
 import camelot
-import zipfile
+import io
 import os
 import traceback
-from utils import create_temp_file, create_temp_dir
+from utils import create_temp_file
+from zip_stream import zip_response
 
 
 def convert_pdf_to_excel():
 
     ## PREMIUM CHECK INSERTED (expects function signature (..., file_paths, email) or similar)
     try:
-        user = get_user(locals().get("email"))
+        user = get_request_user(locals().get("email"))
         paths = locals().get("file_paths") or locals().get("files") or locals().get("pdf_paths")
         if isinstance(paths, (list, tuple)):
             restriction = check_restrictions(paths, user)
@@ -75,24 +76,16 @@ def convert_pdf_to_excel():
                 "error": "No tables found in PDF. The PDF might not contain recognizable table structures, or the tables might be images/scanned content."
             }), 400
         
-        temp_dir = create_temp_dir()
-        excel_paths = []
+        def workbooks():
+            # Each table is written to its own workbook just before it is streamed
+            for i, table in enumerate(tables):
+                buf = io.BytesIO()
+                # Use pandas DataFrame directly instead of camelot's to_excel method
+                table.df.to_excel(buf, index=False)
+                print(f"Saved table {i+1} with shape: {table.df.shape}")
+                yield f"table_{i+1}.xlsx", buf.getvalue()
 
-        # Save each table as Excel file
-        for i, table in enumerate(tables):
-            excel_path = os.path.join(temp_dir, f"table_{i+1}.xlsx")
-            # Use pandas DataFrame directly instead of camelot's to_excel method
-            table.df.to_excel(excel_path, index=False)
-            excel_paths.append(excel_path)
-            print(f"Saved table {i+1} with shape: {table.df.shape}")
-
-        # Create zip file containing all Excel files
-        zip_path = create_temp_file(".zip")
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for p in excel_paths:
-                zipf.write(p, os.path.basename(p))
-
-        return send_file(zip_path, as_attachment=True, download_name="tables_excel.zip")
+        return zip_response(workbooks(), "tables_excel.zip")
     
     except Exception as e:
         print(f"Error in convert_pdf_to_excel: {str(e)}")
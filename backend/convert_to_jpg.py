@@ -1,10 +1,12 @@
-from restrictions import check_convert_pdf_restrictions, get_user
-from flask import jsonify, send_file, request
-from pdf2image import convert_from_bytes
-import zipfile
+from restrictions import check_convert_pdf_restrictions, get_request_user
+from flask import jsonify, request
+from rasterize import iter_rendered_pages
+from jobs import report_progress
+from zip_stream import zip_response
 import os
 import traceback
-from utils import create_temp_file, create_temp_dir
+from upload_ingest import upload_path
+from pdf_inspect import inspect_pdf
 
 
 def convert_pdf_to_jpg():
@@ -21,14 +23,12 @@ def convert_pdf_to_jpg():
         # Get user email from form (default = free user)
         email = request.form.get("email") or request.form.get("user_email") or "free@example.com"
         print(f"[DEBUG] /convert-jpg email={email}")
-        user_info = get_user(email)
+        user_info = get_request_user(email)
         print(f"[DEBUG] /convert-jpg user_info={user_info}")
         print(f"[DEBUG] /convert-jpg premium={user_info.get('is_premium_')} for {email}")
 
-        # Save file temporarily for restriction check
-        temp_dir = create_temp_dir()
-        file_path = os.path.join(temp_dir, uploaded_file.filename)
-        uploaded_file.save(file_path)
+        # The upload is already spooled to disk; check and convert it in place
+        file_path = upload_path(uploaded_file)
         size_mb = os.path.getsize(file_path) / (1024 * 1024)
         print(f"[DEBUG] /convert-jpg uploaded file size: {size_mb:.2f} MB")
 
@@ -38,23 +38,15 @@ def convert_pdf_to_jpg():
             print(f"[DEBUG] /convert-jpg restriction triggered: {restriction}")
             return jsonify(restriction), 403
 
-        # Convert PDF to images
-        with open(file_path, "rb") as f:
-            images = convert_from_bytes(f.read())
+        # Render a few pages at a time and stream each JPG to the client as it is produced
+        total_pages = inspect_pdf(file_path)["page_count"]
 
-        img_paths = []
-        for i, img in enumerate(images):
-            img_path = os.path.join(temp_dir, f"page_{i+1}.jpg")
-            img.save(img_path, "JPEG")
-            img_paths.append(img_path)
+        def pages():
+            for page_number, img_path in iter_rendered_pages(file_path, "jpeg", page_count=total_pages):
+                yield f"page_{page_number}.jpg", img_path
+                report_progress(page_number, total_pages, f"Rendered page {page_number}/{total_pages}")
 
-        # Zip images
-        zip_path = create_temp_file(".zip")
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for p in img_paths:
-                zipf.write(p, os.path.basename(p))
-
-        return send_file(zip_path, as_attachment=True, download_name="pages_jpg.zip")
+        return zip_response(pages(), "pages_jpg.zip")
 
     except Exception as e:
         print(f"Error in convert_pdf_to_jpg: {str(e)}")
@@ -1,11 +1,12 @@
 from flask import request, jsonify, send_file
-import io, os, tempfile, traceback
+import io, os, traceback
 import shutil
 from PIL import Image
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 import fitz  # PyMuPDF
 from restrictions import check_convert_pdf_restrictions
+from utils import create_temp_dir
 
 def convert_to_pdf():
     """
@@ -22,7 +23,7 @@ def convert_to_pdf():
         file_ext = os.path.splitext(filename)[1].lower()
         
         # Create a temporary directory to work with
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         temp_input_path = os.path.join(temp_dir, "input" + file_ext)
         output_path = os.path.join(temp_dir, "output.pdf")
         
@@ -7,6 +7,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import subprocess
 from werkzeug.utils import secure_filename
+import result_cache
 
 def convert_pdf_to_pdfa():
     """Convert PDF to PDF/A format"""
@@ -31,6 +32,17 @@ def convert_pdf_to_pdfa():
             input_path = os.path.join(temp_dir, secure_filename(file.filename))
             file.save(input_path)
             
+            # Ghostscript is the slowest tool we run; reuse the output for identical uploads
+            cache_key = result_cache.make_key("convert_pdf_to_pdfa", [input_path], {"pdfa": 2})
+            cached_path = result_cache.get(cache_key)
+            if cached_path is not None:
+                return send_file(
+                    cached_path,
+                    as_attachment=True,
+                    download_name=f"pdfa_{secure_filename(file.filename)}",
+                    mimetype='application/pdf'
+                )
+            
             # Generate output filename
             output_filename = f"pdfa_{uuid.uuid4().hex}.pdf"
             output_path = os.path.join(temp_dir, output_filename)
@@ -55,6 +67,8 @@ def convert_pdf_to_pdfa():
             if process.returncode != 0:
                 return jsonify({"error": f"Conversion failed: {process.stderr}"}), 500
             
+            result_cache.put(cache_key, output_path)
+            
             # Return the converted file
             return send_file(
                 output_path,
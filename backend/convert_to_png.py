@@ -1,31 +1,24 @@
-from flask import request, send_file
-from pdf2image import convert_from_path
-import zipfile, os, tempfile
+from flask import request
+import os
+from utils import create_temp_dir
+from rasterize import iter_rendered_pages
+from zip_stream import zip_response
 
 def convert_pdf_to_png():
     try:
         file = request.files['file']
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
 
         # Save uploaded PDF
         pdf_path = os.path.join(temp_dir, file.filename)
         file.save(pdf_path)
 
-        # Convert PDF to PNG images
-        images = convert_from_path(pdf_path, dpi=200)
-        png_files = []
-        for i, image in enumerate(images):
-            output_path = os.path.join(temp_dir, f"page_{i+1}.png")
-            image.save(output_path, "PNG")
-            png_files.append(output_path)
-
-        # Create ZIP of all PNGs
-        zip_path = os.path.join(temp_dir, "converted.zip")
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for png_file in png_files:
-                zipf.write(png_file, os.path.basename(png_file))
-
-        return send_file(zip_path, as_attachment=True, download_name="converted.zip")
+        # Render a few pages at a time and stream each PNG to the client as it is produced
+        pages = (
+            (f"page_{page_number}.png", png_file)
+            for page_number, png_file in iter_rendered_pages(pdf_path, "png", dpi=200)
+        )
+        return zip_response(pages, "converted.zip")
 
     except Exception as e:
         return {"error": str(e)}, 500
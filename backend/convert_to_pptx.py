@@ -1,10 +1,10 @@
 from restrictions import check_restrictions
 from flask import jsonify, send_file, request
-from pdf2image import convert_from_bytes
+from rasterize import iter_rendered_pages
 from pptx import Presentation
 import traceback
-import os
-from utils import cleanup_file, create_temp_file, create_temp_dir
+from utils import create_temp_file
+from upload_ingest import upload_path
 from PyPDF2 import PdfReader
 
 
@@ -21,38 +21,25 @@ def convert_pdf_to_pptx():
         # Get email (default = free user for demo)
         email = request.form.get("email", "free@example.com")
 
-        # Save the uploaded file temporarily
-        temp_dir = create_temp_dir()
-        file_path = os.path.join(temp_dir, uploaded_file.filename)
-        uploaded_file.save(file_path)
+        # The upload is already spooled to disk; check and convert it in place
+        file_path = upload_path(uploaded_file)
 
         # Restriction check
         restriction = check_restrictions(email, [file_path])
         if restriction:
             return jsonify({"error": restriction}), 403
 
-        # Convert PDF pages to images
-        with open(file_path, "rb") as f:
-            images = convert_from_bytes(f.read())
-
         prs = Presentation()
         blank_slide_layout = prs.slide_layouts[6]
 
-        temp_img_paths = []
-        for img in images:
+        # Render a few pages at a time; python-pptx copies each JPG into the package when added
+        for _, img_path in iter_rendered_pages(file_path, "jpeg"):
             slide = prs.slides.add_slide(blank_slide_layout)
-            img_path = create_temp_file(".jpg")
-            img.save(img_path, "JPEG")
-            temp_img_paths.append(img_path)
             slide.shapes.add_picture(img_path, 0, 0, width=prs.slide_width, height=prs.slide_height)
 
         output_path = create_temp_file(".pptx")
         prs.save(output_path)
 
-        # Cleanup temp images
-        for img_path in temp_img_paths:
-            cleanup_file(img_path)
-
         return send_file(output_path, as_attachment=True, download_name="converted.pptx")
 
     except Exception as e:
@@ -1,11 +1,15 @@
-from pdf2image import convert_from_bytes 
 import pytesseract 
 from docx import Document 
 from flask import request, jsonify, send_file 
-import io, os, tempfile, traceback 
+import io, os, traceback 
+import re
 import shutil  # ✅ added for auto-detect
 from restrictions import check_convert_pdf_restrictions
-from utils import create_temp_file, cleanup_file
+from utils import create_temp_dir
+import result_cache
+from jobs import report_progress
+from upload_ingest import upload_path
+from ocr_engine import iter_hybrid_pages, page_method_headers
 
 # ✅ Auto-detect tesseract.exe from PATH
 tesseract_path = shutil.which("tesseract")
@@ -16,42 +20,50 @@ else:
         "Tesseract not found. Please install it and add to PATH: https://github.com/UB-Mannheim/tesseract/wiki"
     )
 
+# Text layers can carry control characters that are not allowed in .docx XML
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
 def handle_convert_pdf_to_word(): 
     try: 
         uploaded_file = request.files.get("file") 
         if not uploaded_file: 
             return jsonify({"error": "No file provided"}), 400 
  
-        # Save uploaded file temporarily for restriction check
-        temp_input_path = create_temp_file(uploaded_file.filename)
-        uploaded_file.save(temp_input_path)
+        # The upload is already spooled to disk; check and convert it in place
+        input_path = upload_path(uploaded_file)
         
         # Check restrictions for PDF files
         email = request.form.get("email", "anonymous@example.com")
-        restriction_error = check_convert_pdf_restrictions(email, [temp_input_path])
+        restriction_error = check_convert_pdf_restrictions(email, [input_path])
         if restriction_error:
-            cleanup_file(temp_input_path)
             return jsonify(restriction_error), 403
 
-        pdf_bytes = uploaded_file.read() 
-        images = convert_from_bytes(pdf_bytes)  # convert pdf → images 
- 
-        # Clean up temp input file
-        cleanup_file(temp_input_path) 
- 
+        # text_layer: pages with a usable text layer are no longer OCR'd
+        cache_key = result_cache.make_key("convert_pdf_to_word", [input_path], {"text_layer": True})
+        cached_path = result_cache.get(cache_key)
+        if cached_path is not None:
+            return send_file(cached_path, as_attachment=True, download_name="converted.docx")
+
         doc = Document() 
  
-        for i, image in enumerate(images, start=1): 
-            text = pytesseract.image_to_string(image) 
+        # Born-digital pages use their text layer; only scanned pages are
+        # rendered and OCR'd (in parallel), streaming back in page order
+        methods = []
+        for i, total, text, method in iter_hybrid_pages(input_path, dpi=200): 
+            methods.append(method)
             doc.add_paragraph(f"--- Page {i} ---") 
-            doc.add_paragraph(text) 
+            doc.add_paragraph(_XML_INVALID.sub("", text)) 
             doc.add_page_break() 
+            report_progress(i, total, f"Page {i}/{total} ({method})")
  
-        temp_dir = tempfile.mkdtemp() 
+        temp_dir = create_temp_dir() 
         output_path = os.path.join(temp_dir, "output.docx") 
         doc.save(output_path) 
+        result_cache.put(cache_key, output_path)
  
-        return send_file(output_path, as_attachment=True, download_name="converted.docx") 
+        response = send_file(output_path, as_attachment=True, download_name="converted.docx") 
+        response.headers.update(page_method_headers(methods))
+        return response
  
     except Exception as e: 
         print("🔥 ERROR in /convert-word route:") 
@@ -22,6 +22,7 @@ from werkzeug.utils import secure_filename
 from utils import get_upload_folder, get_temp_folder, allowed_file, get_file_extension
 import uuid
 from restrictions import check_edit_pdf_restrictions
+from page_structure import apply_page_operations
 
 edit_pdf_bp = Blueprint('edit_pdf', __name__)
 
@@ -85,9 +86,31 @@ def edit_pdf():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _structural_operations(operations):
+    """
+    Operations as page_structure tuples if they only rotate/delete pages, else None.
+
+    Such edits never touch page content, so they skip the PyMuPDF round trip.
+    """
+    structural = []
+    for operation in operations:
+        op_type = operation.get('type')
+        if op_type == 'rotate_page':
+            structural.append(("rotate", operation.get('page', 0), int(operation.get('rotation', 90))))
+        elif op_type == 'delete_page':
+            structural.append(("delete", operation.get('page', 0)))
+        else:
+            return None
+    return structural
+
 def process_pdf_edits(input_path, output_path, operations):
     """Process PDF with edit operations"""
     try:
+        structural = _structural_operations(operations)
+        if structural:
+            apply_page_operations(input_path, output_path, structural)
+            return True
+        
         # Use PyMuPDF for better editing capabilities
         pdf_doc = fitz.open(input_path)
         
@@ -214,7 +237,7 @@ def delete_page_from_pdf(pdf_doc, operation):
         print(f"❌ Error deleting page: {str(e)}")
 
 def rotate_page_in_pdf(pdf_doc, operation):
-    """Rotate page in PDF"""
+    """Rotate page in PDF (rotation-only edit lists use page_structure instead)"""
     try:
         page_num = operation.get('page', 0)
         rotation = int(operation.get('rotation', 90))
@@ -0,0 +1,426 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, jsonify, request, send_file
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_options_header
+
+from upload_ingest import save_upload
+
+# Which progress store backs /progress/<task_id>: "memory" (single process) or "sqlite"
+JOB_STORE = os.environ.get('JOB_STORE', 'memory').lower()
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join(tempfile.gettempdir(), 'pdfville_jobs.sqlite3'))
+JOB_RESULTS_DIR = os.environ.get('JOB_RESULTS_DIR', os.path.join(tempfile.gettempdir(), 'pdfville_jobs'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', '32'))
+JOB_RETENTION = float(os.environ.get('JOB_RETENTION', str(6 * 3600)))
+
+# Marks the replayed request inside a worker so it is not queued a second time
+JOB_ENVIRON_KEY = 'pdfville.job_id'
+
+# Headers that are regenerated when the request is replayed
+_SKIP_HEADERS = {'content-type', 'content-length', 'host'}
+
+
+class QueueFullError(Exception):
+    """More jobs are queued or running than JOB_MAX_PENDING allows"""
+
+
+class ProgressStore(ABC):
+    """
+    Storage for job state, keyed by task id.
+
+    A job record is a plain dict: task_id, status (queued/running/done/failed),
+    progress (0-100), message, error, result (JSON payload), result_path,
+    download_name, mimetype, created_at and updated_at.
+    """
+
+    @abstractmethod
+    def create(self, task_id, **fields):
+        """Store a new record"""
+
+    @abstractmethod
+    def update(self, task_id, **fields):
+        """Merge fields into an existing record"""
+
+    @abstractmethod
+    def get(self, task_id):
+        """The record for task_id, or None"""
+
+    @abstractmethod
+    def expired(self, older_than):
+        """Remove and return records last updated before the given timestamp"""
+
+    @staticmethod
+    def _new_record(task_id, fields):
+        now = time.time()
+        record = {
+            "task_id": task_id,
+            "status": "queued",
+            "progress": 0,
+            "message": None,
+            "error": None,
+            "result": None,
+            "result_path": None,
+            "download_name": None,
+            "mimetype": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        record.update(fields)
+        return record
+
+
+class InMemoryProgressStore(ProgressStore):
+    """Thread-safe dict store; only visible to the process that created the job"""
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id, **fields):
+        with self._lock:
+            self._records[task_id] = self._new_record(task_id, fields)
+
+    def update(self, task_id, **fields):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None:
+                return
+            record.update(fields)
+            record["updated_at"] = time.time()
+
+    def get(self, task_id):
+        with self._lock:
+            record = self._records.get(task_id)
+            return dict(record) if record else None
+
+    def expired(self, older_than):
+        with self._lock:
+            stale = [r for r in self._records.values() if r["updated_at"] < older_than]
+            for record in stale:
+                del self._records[record["task_id"]]
+            return stale
+
+
+class SQLiteProgressStore(ProgressStore):
+    """
+    Store shared by every gunicorn worker on the host.
+
+    Records are JSON blobs in a single table; updates are read-modify-write inside
+    an IMMEDIATE transaction so concurrent progress reports cannot lose fields.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "task_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def create(self, task_id, **fields):
+        record = self._new_record(task_id, fields)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (task_id, data, updated_at) VALUES (?, ?, ?)",
+            (task_id, json.dumps(record), record["updated_at"])
+        )
+
+    def update(self, task_id, **fields):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+            if row is not None:
+                record = json.loads(row[0])
+                record.update(fields)
+                record["updated_at"] = time.time()
+                conn.execute(
+                    "UPDATE jobs SET data = ?, updated_at = ? WHERE task_id = ?",
+                    (json.dumps(record), record["updated_at"], task_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, task_id):
+        row = self._conn().execute("SELECT data FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def expired(self, older_than):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT data FROM jobs WHERE updated_at < ?", (older_than,)).fetchall()
+            conn.execute("DELETE FROM jobs WHERE updated_at < ?", (older_than,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [json.loads(r[0]) for r in rows]
+
+
+def create_progress_store(kind=None, path=None):
+    """Build the store selected by JOB_STORE"""
+    kind = (kind or JOB_STORE).lower()
+    if kind == 'sqlite':
+        return SQLiteProgressStore(path or JOB_STORE_PATH)
+    if kind == 'memory':
+        return InMemoryProgressStore()
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+_current = threading.local()
+
+
+def current_task_id():
+    """Task id of the job running on this thread, or None for a normal request"""
+    return getattr(_current, 'task_id', None)
+
+
+def report_progress(done, total, message=None):
+    """
+    Publish progress for the job running on this thread. No-op outside a job,
+    so tools can call it unconditionally from their per-page loops.
+
+    Args:
+        done: Units of work finished (e.g. pages)
+        total: Total units of work
+        message: Optional human readable status
+    """
+    task_id = current_task_id()
+    queue = getattr(_current, 'queue', None)
+    if task_id is None or queue is None:
+        return
+    progress = int(done * 100 / total) if total else 0
+    # Reserve 100 for the moment the result has actually been stored
+    queue.store.update(task_id, progress=min(progress, 99), message=message)
+
+
+class JobQueue:
+    """
+    Bounded worker pool that runs tool requests in the background.
+
+    Jobs are the original Flask request replayed inside a worker thread against
+    spooled copies of the uploads, so every tool (restriction checks included)
+    works unchanged; its response is captured into the job's result directory.
+    """
+
+    def __init__(self, store, results_dir=None, max_workers=None, max_pending=None, retention=None):
+        self.store = store
+        self.results_dir = results_dir or JOB_RESULTS_DIR
+        self.max_workers = max_workers or JOB_WORKERS
+        self.max_pending = max_pending or JOB_MAX_PENDING
+        self.retention = JOB_RETENTION if retention is None else retention
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pdf-job')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def job_dir(self, task_id):
+        return os.path.join(self.results_dir, task_id)
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def submit_request(self, app, req):
+        """
+        Spool the current request's uploads and queue it for replay.
+
+        Returns:
+            The new task id
+
+        Raises:
+            QueueFullError: if JOB_MAX_PENDING jobs are already queued or running
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Too many jobs in progress, please retry shortly")
+            self._pending += 1
+
+        try:
+            self._purge_expired()
+            task_id = uuid.uuid4().hex
+            job_dir = self.job_dir(task_id)
+            input_dir = os.path.join(job_dir, 'inputs')
+            os.makedirs(input_dir)
+
+            files = []
+            for index, (field, storage) in enumerate(req.files.items(multi=True)):
+                path = save_upload(storage, os.path.join(input_dir, str(index)))
+                files.append((field, path, storage.filename, storage.mimetype))
+
+            spec = {
+                "path": req.path,
+                "method": req.method,
+                "query_string": req.query_string,
+                "headers": [(k, v) for k, v in req.headers.items() if k.lower() not in _SKIP_HEADERS],
+                "form": list(req.form.items(multi=True)),
+                "files": files,
+            }
+            self.store.create(task_id, status="queued", endpoint=req.endpoint)
+            self._executor.submit(self._run, app, task_id, spec)
+            return task_id
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def _run(self, app, task_id, spec):
+        _current.task_id = task_id
+        _current.queue = self
+        handles = []
+        try:
+            self.store.update(task_id, status="running")
+            data = MultiDict(spec["form"])
+            for field, path, filename, mimetype in spec["files"]:
+                handle = open(path, 'rb')
+                handles.append(handle)
+                data.add(field, (handle, filename, mimetype))
+
+            with app.test_request_context(
+                spec["path"], method=spec["method"], query_string=spec["query_string"],
+                headers=spec["headers"], data=data, environ_overrides={JOB_ENVIRON_KEY: task_id}
+            ):
+                response = app.full_dispatch_request()
+                try:
+                    self._store_response(task_id, response)
+                finally:
+                    response.close()
+        except Exception as e:
+            print(f"Error in background job {task_id}: {str(e)}")
+            self.store.update(task_id, status="failed", error=str(e))
+        finally:
+            for handle in handles:
+                handle.close()
+            shutil.rmtree(os.path.join(self.job_dir(task_id), 'inputs'), ignore_errors=True)
+            _current.task_id = None
+            _current.queue = None
+            with self._lock:
+                self._pending -= 1
+
+    def _store_response(self, task_id, response):
+        if response.is_json:
+            payload = response.get_json(silent=True)
+            if response.status_code >= 400:
+                error = payload.get("error") if isinstance(payload, dict) else None
+                self.store.update(task_id, status="failed", error=error or response.status, result=payload)
+            else:
+                self.store.update(task_id, status="done", progress=100, result=payload)
+            return
+
+        if response.status_code >= 400:
+            self.store.update(task_id, status="failed", error=response.status)
+            return
+
+        _, options = parse_options_header(response.headers.get('Content-Disposition', ''))
+        download_name = options.get('filename') or 'result'
+        result_path = os.path.join(self.job_dir(task_id), 'result')
+        with open(result_path, 'wb') as out:
+            for chunk in response.response:
+                out.write(chunk)
+        self.store.update(
+            task_id, status="done", progress=100, result_path=result_path,
+            download_name=download_name, mimetype=response.mimetype
+        )
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        for record in self.store.expired(now - self.retention):
+            shutil.rmtree(self.job_dir(record["task_id"]), ignore_errors=True)
+
+    def stats(self):
+        """Counters for the /metrics endpoint"""
+        return {
+            "store": type(self.store).__name__,
+            "workers": self.max_workers,
+            "pending": self.pending(),
+            "max_pending": self.max_pending,
+        }
+
+
+def wants_async(req):
+    """Clients opt in with Prefer: respond-async or an async=true form/query field"""
+    if 'respond-async' in req.headers.get('Prefer', '').lower():
+        return True
+    return str(req.values.get('async', '')).lower() in ('1', 'true', 'yes')
+
+
+def init_app(app, job_queue, endpoints, url_for_task):
+    """
+    Queue requests to the given endpoints when the client asks for async mode.
+
+    Args:
+        app: Flask application
+        job_queue: JobQueue that runs the replayed requests
+        endpoints: Endpoint names (view function names) that may run asynchronously
+        url_for_task: Callable mapping a task id to (status_url, download_url)
+    """
+    endpoints = set(endpoints)
+
+    @app.before_request
+    def queue_async_job():
+        if request.endpoint not in endpoints or JOB_ENVIRON_KEY in request.environ:
+            return None
+        if not wants_async(request):
+            return None
+        try:
+            task_id = job_queue.submit_request(current_app._get_current_object(), request)
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 503
+        status_url, download_url = url_for_task(task_id)
+        return jsonify({
+            "task_id": task_id,
+            "status": "queued",
+            "status_url": status_url,
+            "download_url": download_url,
+        }), 202
+
+
+def progress_response(store, task_id):
+    """JSON view of a job record without server-side paths"""
+    record = store.get(task_id)
+    if record is None:
+        return jsonify({"progress": 0, "status": "not_found"})
+    record.pop("result_path", None)
+    return jsonify(record)
+
+
+def download_response(store, task_id):
+    """Send the finished job's output (file or JSON payload)"""
+    record = store.get(task_id)
+    if record is None:
+        return jsonify({"error": "Unknown task id"}), 404
+    if record["status"] == "failed":
+        return jsonify({"error": record.get("error") or "Job failed"}), 500
+    if record["status"] != "done":
+        return jsonify({"error": "Job not finished", "status": record["status"],
+                        "progress": record["progress"]}), 409
+    if record.get("result_path"):
+        return send_file(record["result_path"], as_attachment=True,
+                         download_name=record["download_name"], mimetype=record["mimetype"])
+    return jsonify(record.get("result"))
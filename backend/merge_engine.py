@@ -0,0 +1,194 @@
+import hashlib
+import re
+from contextlib import ExitStack
+
+import fitz  # PyMuPDF, only used to read outlines
+import pikepdf
+
+_LENGTH_ENTRY = re.compile(rb"/Length \d+(?: \d+ R)?")
+_REFERENCE = re.compile(rb"(\d+) (\d+) R")
+
+# Objects that belong to one place in the document and must never be shared
+_UNSHARED_TYPES = {"/Page", "/Pages", "/Catalog", "/Annot", "/Outlines", "/StructTreeRoot", "/StructElem", "/Sig"}
+
+
+def _read_outline(path):
+    """[(level, title, page_index)] with page_index -1 for entries that go nowhere"""
+    with fitz.open(path) as doc:
+        return [(level, title, page - 1) for level, title, page in doc.get_toc(simple=True)]
+
+
+def _write_outline(pdf, entries):
+    """Rebuild an outline tree from (level, title, page_index) rows"""
+    with pdf.open_outline() as outline:
+        stack = [(0, outline.root)]
+        for level, title, page_index in entries:
+            while len(stack) > 1 and stack[-1][0] >= level:
+                stack.pop()
+            item = pikepdf.OutlineItem(title, page_index if page_index >= 0 else None)
+            stack[-1][1].append(item)
+            stack.append((level, item.children))
+
+
+def _shareable(obj, annotations=()):
+    """Resources only: page tree nodes, annotations, form fields and the like stay distinct"""
+    if isinstance(obj, pikepdf.Array):
+        return True
+    if not isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)):
+        return False
+    if obj.objgen in annotations or obj.get("/Type") in _UNSHARED_TYPES:
+        return False
+    # /Type is optional on annotations; /Rect marks one (form XObjects use /BBox)
+    if not isinstance(obj, pikepdf.Stream) and "/Rect" in obj:
+        return False
+    return not any(key in obj for key in ("/Parent", "/P", "/FT", "/Kids"))
+
+
+def _relink(container, replacements):
+    """Point references to duplicate objects at their canonical copy, recursing into direct objects"""
+    if isinstance(container, pikepdf.Array):
+        entries = [(i, container[i]) for i in range(len(container))]
+    elif isinstance(container, (pikepdf.Dictionary, pikepdf.Stream)):
+        entries = [(key, container[key]) for key in container.keys()]
+    else:
+        return
+    for key, value in entries:
+        if not isinstance(value, pikepdf.Object):
+            continue
+        if value.is_indirect:
+            canonical = replacements.get(value.objgen)
+            if canonical is not None:
+                container[key] = canonical
+        else:
+            _relink(value, replacements)
+
+
+def dedupe_resources(pdf):
+    """
+    Collapse byte-identical streams (fonts, ICC profiles, images, forms) into one object.
+
+    Streams with the same raw bytes and dictionary are merged first; then
+    dictionaries and arrays that have become identical because they now point
+    at the same streams (color spaces, font descriptors, fonts) are merged too,
+    repeating until nothing changes. Streams are grouped by length before
+    hashing, so only same-sized candidates are read. References to duplicates
+    are rewritten to the surviving copy; the duplicates become unreachable and
+    qpdf leaves them out when saving.
+
+    Returns:
+        (objects_removed, stream_bytes_saved)
+    """
+    # Annotations listed by a page belong to that page, whatever their dictionary looks like
+    annotations = {annot.objgen for page in pdf.pages for annot in page.obj.get("/Annots", [])
+                   if isinstance(annot, pikepdf.Object) and annot.is_indirect}
+    # pdf.objects can list objects added since the file was opened more than
+    # once; a duplicate would be "merged" into itself
+    candidates = list({obj.objgen: obj for obj in pdf.objects
+                       if obj.is_indirect and _shareable(obj, annotations)}.values())
+
+    by_length = {}
+    for obj in candidates:
+        if isinstance(obj, pikepdf.Stream):
+            length = obj.stream_dict.get("/Length")
+            if not isinstance(length, int):
+                length = len(obj.read_raw_bytes())
+            by_length.setdefault(int(length), []).append(obj)
+    digests = {}
+    for length, streams in by_length.items():
+        for stream in streams:
+            if len(streams) > 1:
+                digests[stream.objgen] = (length, hashlib.sha256(stream.read_raw_bytes()).digest())
+            else:
+                # A unique length cannot match anything; key it by identity
+                digests[stream.objgen] = (length, repr(stream.objgen).encode())
+
+    replacements = {}
+
+    def canonical_ref(match):
+        objgen = (int(match.group(1)), int(match.group(2)))
+        while objgen in replacements:
+            objgen = replacements[objgen].objgen
+        return b"%d %d R" % objgen
+
+    while True:
+        seen = {}
+        merged = {}
+        for obj in candidates:
+            if obj.objgen in replacements:
+                continue
+            if isinstance(obj, pikepdf.Stream):
+                length, digest = digests[obj.objgen]
+                body = _LENGTH_ENTRY.sub(b"", obj.stream_dict.unparse())
+                key = (b"S", digest, _REFERENCE.sub(canonical_ref, body))
+            else:
+                key = (b"O", _REFERENCE.sub(canonical_ref, obj.unparse(resolved=True)))
+            if key in seen:
+                merged[obj.objgen] = seen[key]
+            else:
+                seen[key] = obj
+        if not merged:
+            break
+        replacements.update(merged)
+
+    if not replacements:
+        return 0, 0
+    for objgen in replacements:
+        target = replacements[objgen]
+        while target.objgen in replacements:
+            target = replacements[target.objgen]
+        replacements[objgen] = target
+
+    for obj in pdf.objects:
+        if obj.is_indirect and obj.objgen not in replacements:
+            _relink(obj, replacements)
+    _relink(pdf.trailer, replacements)
+    bytes_saved = sum(digests[objgen][0] for objgen in replacements if objgen in digests)
+    return len(replacements), bytes_saved
+
+
+def merge_pdf_files(paths, output_path, dedupe=True, keep_outlines=True):
+    """
+    Merge PDFs page by page into output_path.
+
+    Inputs are opened one after another and their pages copied into the output
+    with qpdf. Every input stays open until the output is saved, because qpdf
+    leaves copied stream data in the source files and reads it while writing.
+    Peak memory is therefore the object dictionaries of all inputs together
+    (plus one open file per input), not a single input: stream bytes are never
+    all held at once, but dedupe_resources visits every object, and hashing
+    reads one stream at a time. Each input's outline is carried over with its
+    page numbers shifted, identical resources repeated across inputs are
+    stored once, and the result is written with object streams.
+
+    Args:
+        paths: Input PDF paths, in output order
+        output_path: Where to write the merged PDF
+        dedupe: Collapse identical resources across inputs
+        keep_outlines: Carry over each input's bookmarks
+
+    Returns:
+        dict with page count and deduplication counters
+    """
+    outline = []
+    with ExitStack() as sources, pikepdf.new() as out:
+        for path in paths:
+            src = sources.enter_context(pikepdf.open(path))
+            offset = len(out.pages)
+            out.pages.extend(src.pages)
+            if keep_outlines:
+                outline.extend(
+                    (level, title, page_index + offset if page_index >= 0 else -1)
+                    for level, title, page_index in _read_outline(path)
+                )
+
+        objects_removed, bytes_saved = dedupe_resources(out) if dedupe else (0, 0)
+        if outline:
+            _write_outline(out, outline)
+        page_count = len(out.pages)
+        out.save(output_path, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+
+    return {
+        "pages": page_count,
+        "objects_deduplicated": objects_removed,
+        "bytes_saved": bytes_saved,
+    }
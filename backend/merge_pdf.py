@@ -1,9 +1,10 @@
 from restrictions import check_merge_pdf_restrictions
 from flask import jsonify, send_file, request
-from PyPDF2 import PdfMerger
 import traceback
 import os
 from utils import create_temp_file, create_temp_dir
+import result_cache
+from merge_engine import merge_pdf_files
 
 
 def merge_pdfs():
@@ -36,15 +37,17 @@ def merge_pdfs():
             else:
                 return jsonify({"error": restriction}), 403
 
-        # Merge PDFs
-        merger = PdfMerger()
-        for path in file_paths:
-            merger.append(path)
-
-        print("Restriction result:", restriction)
-        output_path = create_temp_file(".pdf")
-        merger.write(output_path)
-        merger.close()
+        # Same files in the same order -> same merged document
+        cache_key = result_cache.make_key("merge_pdfs", file_paths)
+        output_path = result_cache.get(cache_key)
+        if output_path is None:
+            # Merge PDFs; identical fonts/images across inputs are stored once
+            output_path = create_temp_file(".pdf")
+            merge_stats = merge_pdf_files(file_paths, output_path)
+            print(f"Merged {merge_stats['pages']} pages, "
+                  f"deduplicated {merge_stats['objects_deduplicated']} objects "
+                  f"({merge_stats['bytes_saved']} bytes)")
+            result_cache.put(cache_key, output_path)
 
         return send_file(output_path, as_attachment=True, download_name="merged.pdf")
 
@@ -0,0 +1,234 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+DEFAULT_SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL', 'sshleifer/distilbart-cnn-12-6')
+# Models a request may select; anything else would mean downloading arbitrary checkpoints
+SUMMARY_MODELS = [
+    name.strip() for name in os.environ.get('SUMMARY_MODELS', DEFAULT_SUMMARY_MODEL).split(',') if name.strip()
+]
+if DEFAULT_SUMMARY_MODEL not in SUMMARY_MODELS:
+    SUMMARY_MODELS.insert(0, DEFAULT_SUMMARY_MODEL)
+# Resident model weights allowed per process before least recently used models are dropped
+SUMMARY_MODEL_BUDGET_MB = int(os.environ.get('SUMMARY_MODEL_BUDGET_MB', '3072'))
+# torch intra-op threads for inference (0 keeps torch's default of one per core); set
+# it below the core count when summaries share the machine with OCR or conversions
+SUMMARY_THREADS = int(os.environ.get('SUMMARY_THREADS', '0'))
+# Comma-separated models to load (and run once) in the background at boot; "default" for SUMMARY_MODEL
+SUMMARY_WARMUP = os.environ.get('SUMMARY_WARMUP', '')
+# Inference precision: "fp32", "int8" (torch dynamic quantization of the linear layers, roughly
+# 2-3x faster on CPU and a quarter of the weight memory) or "onnx" (int8 via onnxruntime, if
+# optimum[onnxruntime] is installed; falls back to "int8" otherwise)
+SUMMARY_PRECISION = os.environ.get('SUMMARY_PRECISION', 'fp32').lower()
+SUMMARY_ONNX_DIR = os.environ.get('SUMMARY_ONNX_DIR', os.path.join(tempfile.gettempdir(), 'onnx_summary'))
+
+LoadedModel = namedtuple('LoadedModel', 'name summarizer tokenizer model nbytes load_seconds precision',
+                         defaults=('fp32',))
+
+
+class UnknownModelError(ValueError):
+    """The requested model is not in SUMMARY_MODELS"""
+
+
+def _model_nbytes(model):
+    """Bytes held by a torch model's weights, including the packed weights of quantized layers"""
+    import torch
+
+    def nbytes(value):
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(nbytes(v) for v in value)
+        return 0
+
+    return sum(nbytes(value) for value in model.state_dict().values())
+
+
+def _load_onnx_model(name):
+    """
+    int8-quantized ONNX export of the model, run with onnxruntime.
+
+    The export is kept under SUMMARY_ONNX_DIR, so only the first load on a machine pays for it.
+    """
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    export_dir = os.path.join(SUMMARY_ONNX_DIR, name.replace('/', '--'))
+    if not any(f.endswith('_quantized.onnx') for f in (os.listdir(export_dir) if os.path.isdir(export_dir) else [])):
+        ORTModelForSeq2SeqLM.from_pretrained(name, export=True).save_pretrained(export_dir)
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        for onnx_file in [f for f in os.listdir(export_dir) if f.endswith('.onnx')]:
+            ORTQuantizer.from_pretrained(export_dir, file_name=onnx_file).quantize(config, save_dir=export_dir)
+
+    quantized = [f for f in os.listdir(export_dir) if f.endswith('_quantized.onnx')]
+    files = {}
+    for part in ('encoder', 'decoder', 'decoder_with_past'):
+        if f'{part}_model_quantized.onnx' in quantized:
+            files[f'{part}_file_name'] = f'{part}_model_quantized.onnx'
+    options = onnxruntime.SessionOptions()
+    if SUMMARY_THREADS > 0:
+        options.intra_op_num_threads = SUMMARY_THREADS
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        export_dir, session_options=options, use_cache='decoder_with_past_file_name' in files, **files
+    )
+    nbytes = sum(os.path.getsize(os.path.join(export_dir, f)) for f in quantized)
+    return model, nbytes
+
+
+def load_transformers_model(name, precision=None):
+    """
+    Load a seq2seq summarization model on CPU.
+
+    Args:
+        name: Hugging Face model name
+        precision: "fp32", "int8" or "onnx" (default SUMMARY_PRECISION)
+
+    Returns:
+        LoadedModel (load_seconds filled in by the registry)
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+
+    precision = precision or SUMMARY_PRECISION
+    if SUMMARY_THREADS > 0:
+        torch.set_num_threads(SUMMARY_THREADS)
+    tokenizer = AutoTokenizer.from_pretrained(name)
+
+    if precision == 'onnx':
+        try:
+            model, nbytes = _load_onnx_model(name)
+            summarizer = pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)
+            return LoadedModel(name, summarizer, tokenizer, model, nbytes, 0.0, 'onnx')
+        except ImportError as e:
+            print(f"ONNX summarization unavailable ({str(e)}), using int8 torch model instead")
+            precision = 'int8'
+
+    # Explicitly disable meta-device init and force CPU to avoid meta tensor errors
+    model = AutoModelForSeq2SeqLM.from_pretrained(name, low_cpu_mem_usage=False)
+    model.eval()
+    if precision == 'int8':
+        # Weights of every nn.Linear stored as int8; activations are quantized on the fly per batch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif precision != 'fp32':
+        raise ValueError(f"Unknown SUMMARY_PRECISION: {precision}")
+    summarizer = pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)  # CPU
+    return LoadedModel(name, summarizer, tokenizer, model, _model_nbytes(model), 0.0, precision)
+
+
+class ModelRegistry:
+    """
+    Per-process cache of loaded summarization models.
+
+    Each model is loaded the first time it is asked for and then kept warm.
+    Concurrent requests for a model that is still loading wait for that one
+    load instead of starting their own. When the resident models exceed the
+    memory budget, the least recently used ones are dropped (requests still
+    using a dropped model keep their reference until they finish).
+    """
+
+    def __init__(self, allowed=None, budget_bytes=None, loader=load_transformers_model):
+        self.allowed = list(allowed or SUMMARY_MODELS)
+        self.budget_bytes = budget_bytes if budget_bytes is not None else SUMMARY_MODEL_BUDGET_MB * 1024 * 1024
+        self._loader = loader
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def resolve(self, name):
+        """Model name to use for a request; None selects the default"""
+        name = name or self.allowed[0]
+        if name not in self.allowed:
+            raise UnknownModelError(f"Unknown summarization model: {name}")
+        return name
+
+    def get(self, name=None):
+        """
+        Return the loaded model, loading it if needed.
+
+        Returns:
+            (LoadedModel, seconds this call spent loading; 0.0 when it was warm)
+
+        Raises:
+            UnknownModelError: If name is not an allowed model
+        """
+        name = self.resolve(name)
+        while True:
+            with self._lock:
+                loaded = self._models.get(name)
+                if loaded is not None:
+                    self._models.move_to_end(name)
+                    self.hits += 1
+                    return loaded, 0.0
+                pending = self._loading.get(name)
+                if pending is None:
+                    pending = self._loading[name] = threading.Event()
+                    break
+            # Someone else is loading it; wait and look again (their load may have failed)
+            pending.wait()
+
+        started = time.perf_counter()
+        try:
+            loaded = self._loader(name)
+            elapsed = time.perf_counter() - started
+            loaded = loaded._replace(load_seconds=elapsed)
+            with self._lock:
+                self._models[name] = loaded
+                self.loads += 1
+                self.load_seconds += elapsed
+                self._evict(keep=name)
+            return loaded, elapsed
+        finally:
+            with self._lock:
+                self._loading.pop(name).set()
+
+    def _evict(self, keep):
+        """Drop least recently used models until within budget; the one just loaded always stays"""
+        while sum(m.nbytes for m in self._models.values()) > self.budget_bytes and len(self._models) > 1:
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            del self._models[oldest]
+            self.evictions += 1
+
+    def warm_up(self, names=None):
+        """Load models and run them once, so the first request pays neither load nor first-call setup"""
+        for name in names or [self.allowed[0]]:
+            try:
+                loaded, _ = self.get(name)
+                loaded.summarizer("Warm-up sentence for the summarization model.", min_length=1, max_length=8)
+            except Exception as e:
+                print(f"Summarization model warm-up failed for {name}: {str(e)}")
+
+    def stats(self):
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            return {
+                "loaded": {name: m.nbytes for name, m in self._models.items()},
+                "precision": {name: m.precision for name, m in self._models.items()},
+                "bytes": sum(m.nbytes for m in self._models.values()),
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_seconds": round(self.load_seconds, 3),
+            }
+
+
+registry = ModelRegistry()
+
+
+def prewarm():
+    """Warm up the models listed in SUMMARY_WARMUP in the background"""
+    names = [
+        DEFAULT_SUMMARY_MODEL if name.strip() == 'default' else name.strip()
+        for name in SUMMARY_WARMUP.split(',') if name.strip()
+    ]
+    if names:
+        threading.Thread(target=registry.warm_up, args=(names,), name='model-warmup', daemon=True).start()
@@ -0,0 +1,420 @@
+"""
+Local model-serving sidecar for AI summarization.
+
+One process owns the summarization models and serves every web worker over
+a Unix socket, so N workers share one copy of the weights. Chunks from all
+concurrent requests are queued together and run through the model in shared
+batches. The app starts it on demand (ensure_started); run it by hand with:
+
+    python model_server.py --socket /tmp/pdfville_models.sock
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import model_registry
+from summary_engine import map_reduce_summarize
+
+MODEL_SERVER_ENABLED = os.environ.get('MODEL_SERVER', 'false').lower() == 'true' and hasattr(socket, 'AF_UNIX')
+MODEL_SERVER_SOCKET = os.environ.get('MODEL_SERVER_SOCKET', os.path.join(tempfile.gettempdir(), 'pdfville_models.sock'))
+# Largest shared batch, and how long the batcher waits for more chunks to join one
+MODEL_SERVER_MAX_BATCH = int(os.environ.get('MODEL_SERVER_MAX_BATCH', '8'))
+MODEL_SERVER_BATCH_WAIT_MS = float(os.environ.get('MODEL_SERVER_BATCH_WAIT_MS', '10'))
+MODEL_SERVER_TIMEOUT = float(os.environ.get('MODEL_SERVER_TIMEOUT', '600'))
+# How long a request waits for a just-started server before summarizing in-process
+MODEL_SERVER_CONNECT_WAIT = float(os.environ.get('MODEL_SERVER_CONNECT_WAIT', '30'))
+# The server exits after this long without requests (0 = never); the next request starts it again
+MODEL_SERVER_IDLE_SECONDS = float(os.environ.get('MODEL_SERVER_IDLE_SECONDS', '1800'))
+
+_HEADER = struct.Struct('>I')
+
+
+class ModelServerUnavailable(Exception):
+    """No model server is listening on the socket"""
+
+
+class ModelServerError(RuntimeError):
+    """The model server received the request but could not serve it"""
+
+
+def _send(sock, message):
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock):
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, size).decode('utf-8'))
+
+
+class _Item:
+    __slots__ = ("text", "min_length", "max_length", "future")
+
+    def __init__(self, text, min_length, max_length):
+        self.text = text
+        self.min_length = min_length
+        self.max_length = max_length
+        self.future = Future()
+
+
+class BatchingSummarizer:
+    """
+    Pipeline-compatible callable that merges calls from many threads into shared batches.
+
+    Each call enqueues its texts and blocks until they are summarized. One
+    batcher thread per model takes up to max_batch queued texts (waiting up
+    to batch_wait for more to arrive), groups them by max_length and runs
+    each group as a single pipeline call.
+    """
+
+    def __init__(self, get_summarizer, max_batch=None, batch_wait=None):
+        self._get_summarizer = get_summarizer
+        self.max_batch = max(1, max_batch or MODEL_SERVER_MAX_BATCH)
+        self.batch_wait = (MODEL_SERVER_BATCH_WAIT_MS if batch_wait is None else batch_wait * 1000) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        threading.Thread(target=self._run, name='model-batcher', daemon=True).start()
+
+    def __call__(self, texts, batch_size=None, min_length=64, max_length=256, truncation=True):
+        if isinstance(texts, str):
+            texts = [texts]
+        items = [_Item(text, min_length, max_length) for text in texts]
+        for item in items:
+            self._queue.put(item)
+        return [item.future.result() for item in items]
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Only max_length must match; min_length is a floor, so the lowest one in a group serves all
+            groups = {}
+            for item in self._collect():
+                groups.setdefault(item.max_length, []).append(item)
+            for max_length, items in groups.items():
+                try:
+                    outputs = self._get_summarizer()(
+                        [item.text for item in items], batch_size=len(items),
+                        min_length=min(item.min_length for item in items), max_length=max_length,
+                        truncation=True,
+                    )
+                    for item, output in zip(items, outputs):
+                        item.future.set_result(output[0] if isinstance(output, list) else output)
+                except Exception as e:
+                    for item in items:
+                        item.future.set_exception(e)
+                with self._lock:
+                    self.batches += 1
+                    self.items += len(items)
+                    self.largest_batch = max(self.largest_batch, len(items))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.pending(),
+                "batches": self.batches,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+            }
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves summarize/stats requests; one thread per connection, batching across them"""
+    daemon_threads = True
+
+    def __init__(self, socket_path, registry=None, max_batch=None, batch_wait=None):
+        self.registry = registry or model_registry.registry
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self._batchers = {}
+        self._state_lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.last_request = time.monotonic()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+
+    def batcher(self, name):
+        with self._state_lock:
+            batcher = self._batchers.get(name)
+            if batcher is None:
+                # Looked up per batch, so a model evicted and reloaded is picked up again
+                batcher = BatchingSummarizer(lambda: self.registry.get(name)[0].summarizer,
+                                             self.max_batch, self.batch_wait)
+                self._batchers[name] = batcher
+            return batcher
+
+    def summarize(self, message):
+        started = time.perf_counter()
+        loaded, load_seconds = self.registry.get(message.get("model"))
+        inference_started = time.perf_counter()
+        batcher = self.batcher(loaded.name)
+        summaries, stats = map_reduce_summarize(
+            message["text"], batcher, loaded.tokenizer, loaded.model,
+            min_length=message.get("min_length", 64), max_length=message.get("max_length", 256),
+            batch_size=batcher.max_batch,
+        )
+        return {
+            "summaries": summaries,
+            "model": loaded.name,
+            "load_seconds": load_seconds,
+            "inference_seconds": time.perf_counter() - inference_started,
+            "server_seconds": time.perf_counter() - started,
+            **stats,
+        }
+
+    def stats(self):
+        with self._state_lock:
+            batchers = {name: batcher.stats() for name, batcher in self._batchers.items()}
+            return {
+                "pid": os.getpid(),
+                "requests": self.requests,
+                "active": self.active,
+                "queue_depth": sum(b["queue_depth"] for b in batchers.values()),
+                "batchers": batchers,
+                "models": self.registry.stats(),
+            }
+
+    def dispatch(self, message):
+        op = message.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "stats":
+            return self.stats()
+        if op == "summarize":
+            with self._state_lock:
+                self.requests += 1
+                self.active += 1
+            try:
+                return self.summarize(message)
+            finally:
+                with self._state_lock:
+                    self.active -= 1
+                    self.last_request = time.monotonic()
+        raise ValueError(f"Unknown op: {op}")
+
+    def idle_for(self):
+        with self._state_lock:
+            return 0.0 if self.active else time.monotonic() - self.last_request
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            message = _recv(self.request)
+        except (ConnectionError, ValueError, struct.error):
+            return
+        try:
+            response = self.server.dispatch(message)
+        except Exception as e:
+            response = {"error": str(e)}
+        try:
+            _send(self.request, response)
+        except OSError:
+            pass
+
+
+# ---------- Client ----------
+
+def request(message, timeout=None, socket_path=None):
+    """
+    Send one message to the model server and return its reply.
+
+    Only a failed connect counts as unavailable: once the message is out the
+    server may be working on it, so a timeout or broken reply must not lead
+    callers to send the same work again.
+
+    Raises:
+        ModelServerUnavailable: Nothing is listening on the socket
+        ModelServerError: The server replied with an error, timed out or dropped the connection
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout or MODEL_SERVER_TIMEOUT)
+    try:
+        try:
+            sock.connect(socket_path or MODEL_SERVER_SOCKET)
+        except OSError as e:
+            raise ModelServerUnavailable(str(e))
+        try:
+            _send(sock, message)
+            reply = _recv(sock)
+        except (OSError, ValueError, struct.error) as e:
+            raise ModelServerError(f"No reply from model server: {str(e) or type(e).__name__}")
+    finally:
+        sock.close()
+    if "error" in reply:
+        raise ModelServerError(reply["error"])
+    return reply
+
+
+def ping(socket_path=None):
+    try:
+        return request({"op": "ping"}, timeout=2, socket_path=socket_path).get("ok", False)
+    except (ModelServerUnavailable, ModelServerError):
+        return False
+
+
+_spawn_lock = threading.Lock()
+_last_spawn = 0.0
+
+
+def ensure_started(wait=0.0):
+    """
+    Start the sidecar if it is enabled and not answering.
+
+    Every worker may call this; a duplicate server notices the lock held by
+    the running one and exits straight away.
+
+    Args:
+        wait: Seconds to wait for the server to answer after starting it
+
+    Returns:
+        True if a server is answering
+    """
+    global _last_spawn
+    if not MODEL_SERVER_ENABLED:
+        return False
+    if ping():
+        return True
+    with _spawn_lock:
+        # Loading the model takes a while; don't start another one on every request meanwhile
+        if time.monotonic() - _last_spawn > max(MODEL_SERVER_CONNECT_WAIT, 5):
+            _last_spawn = time.monotonic()
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--socket', MODEL_SERVER_SOCKET],
+                stdin=subprocess.DEVNULL, close_fds=True,
+            )
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if ping():
+            return True
+        time.sleep(0.25)
+    return False
+
+
+def summarize(text, model_name=None, min_length=64, max_length=256):
+    """
+    Summarize on the sidecar.
+
+    Returns:
+        The server's reply: summaries, model, load_seconds, inference_seconds, chunks, rounds
+
+    Raises:
+        ModelServerUnavailable: The server is not running and did not start in time
+        ModelServerError: The server failed to summarize, or did not answer within MODEL_SERVER_TIMEOUT
+    """
+    message = {"op": "summarize", "text": text, "model": model_name,
+               "min_length": min_length, "max_length": max_length}
+    try:
+        return request(message)
+    except ModelServerUnavailable:
+        # Nothing was sent, so starting the server and sending once more cannot duplicate work
+        if not ensure_started(wait=MODEL_SERVER_CONNECT_WAIT):
+            raise
+        return request(message)
+
+
+def stats():
+    """Sidecar counters for the /metrics endpoint (None fields when it is not running)"""
+    if not MODEL_SERVER_ENABLED:
+        return {"enabled": False}
+    try:
+        return {"enabled": True, "running": True, **request({"op": "stats"}, timeout=2)}
+    except (ModelServerUnavailable, ModelServerError):
+        return {"enabled": True, "running": False}
+
+
+# ---------- Server entry point ----------
+
+def _hold_lock(socket_path):
+    """Exclusive lock for the server's lifetime; None if another server holds it"""
+    handle = open(socket_path + '.lock', 'w')
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET)
+    args = parser.parse_args()
+
+    lock = _hold_lock(args.socket)
+    if lock is None:
+        print("Model server already running")
+        return
+    # Exit through the cleanup below when stopped by a service manager, not just on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = ModelServer(args.socket)
+    os.chmod(args.socket, 0o600)
+    threading.Thread(target=server.serve_forever, name='model-server', daemon=True).start()
+    print(f"Model server listening on {args.socket} (pid {os.getpid()})")
+
+    warmup = [name.strip() for name in model_registry.SUMMARY_WARMUP.split(',') if name.strip()]
+    server.registry.warm_up([model_registry.DEFAULT_SUMMARY_MODEL if n == 'default' else n for n in warmup] or None)
+    try:
+        while not MODEL_SERVER_IDLE_SECONDS or server.idle_for() < MODEL_SERVER_IDLE_SECONDS:
+            time.sleep(5)
+        print("Model server idle, exiting")
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        try:
+            os.unlink(args.socket)
+        except OSError:
+            pass
+        lock.close()
+
+
+if __name__ == "__main__":
+    main()
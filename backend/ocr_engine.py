@@ -0,0 +1,272 @@
+import os
+import shutil
+from collections import deque
+
+import fitz  # PyMuPDF
+import pikepdf
+import pytesseract
+
+from merge_engine import dedupe_resources
+from overlay_engine import stamp_page_overlays
+from pdf_inspect import inspect_pdf
+from process_pools import SharedProcessPool
+from rasterize import iter_rendered_pages
+from utils import create_temp_dir
+
+# Recognition processes; each runs tesseract with a single OpenMP thread
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+# Threads per tesseract process (OMP_THREAD_LIMIT); page-level parallelism scales better than 4 threads on one page
+OCR_TESSERACT_THREADS = os.environ.get('OCR_TESSERACT_THREADS', '1')
+# Rendered pages allowed to wait for recognition, per worker
+OCR_QUEUE_PER_WORKER = int(os.environ.get('OCR_QUEUE_PER_WORKER', '2'))
+# Files of one request OCR'd at the same time (their pages share the worker pool)
+OCR_FILE_WORKERS = int(os.environ.get('OCR_FILE_WORKERS', '2'))
+
+# A page is treated as scanned when images cover at least this much of it and
+# its text layer is missing, too sparse or unreadable
+OCR_IMAGE_COVERAGE = float(os.environ.get('OCR_IMAGE_COVERAGE', '0.5'))
+OCR_MIN_CHARS = int(os.environ.get('OCR_MIN_CHARS', '32'))
+# Fraction of the page covered by glyph boxes; OCR'd scans with an invisible
+# text layer pass this, a scan with only a stamped header or page number does not
+OCR_MIN_GLYPH_COVERAGE = float(os.environ.get('OCR_MIN_GLYPH_COVERAGE', '0.02'))
+# Share of characters without a Unicode mapping (fonts lacking /ToUnicode) that makes a layer unusable
+OCR_MAX_UNMAPPED = float(os.environ.get('OCR_MAX_UNMAPPED', '0.2'))
+
+PAGE_TEXT = "text"
+PAGE_OCR = "ocr"
+
+def _init_worker(tesseract_cmd, thread_limit):
+    # Only recognition processes get the limit, so it never throttles OpenMP
+    # users (e.g. summarization models) in the web process itself.
+    os.environ['OMP_THREAD_LIMIT'] = thread_limit
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+# tesseract_cmd is read when the pool starts, after modules that configure it have been imported
+_ocr_pool = SharedProcessPool(
+    OCR_WORKERS, _init_worker, lambda: (pytesseract.pytesseract.tesseract_cmd, OCR_TESSERACT_THREADS)
+)
+
+
+def _get_ocr_pool():
+    return _ocr_pool.get()
+
+
+def _recognize(image_path, language, output="text", dpi=None):
+    """
+    OCR one rendered page and delete its image.
+
+    Runs inside a pool worker. The path is handed to tesseract as-is, so the
+    PNG pdftoppm wrote is never decoded and re-encoded by PIL on the way.
+
+    Returns:
+        The page text, or for output="pdf" a one-page PDF holding only
+        tesseract's invisible text layer (no image)
+    """
+    try:
+        if output == "pdf":
+            config = "-c textonly_pdf=1" + (f" --dpi {dpi}" if dpi else "")
+            return pytesseract.image_to_pdf_or_hocr(image_path, lang=language, extension="pdf", config=config)
+        return pytesseract.image_to_string(image_path, lang=language)
+    finally:
+        try:
+            os.remove(image_path)
+        except OSError:
+            pass
+
+
+def iter_ocr_pages(pdf_path, dpi=300, language='eng', workers=None, page_count=None, pages=None, output="text"):
+    """
+    OCR a PDF with rasterization and recognition pipelined.
+
+    Pages are rendered a few at a time (pdftoppm first_page/last_page windows)
+    while earlier pages are being recognized on the shared process pool, and
+    only OCR_QUEUE_PER_WORKER pages per worker are rendered ahead of
+    recognition, so scratch disk and memory stay bounded for any page count.
+
+    Args:
+        pdf_path: Path to the PDF
+        dpi: Render resolution
+        language: Tesseract language(s), e.g. "eng" or "eng+deu"
+        workers: Recognition processes (default OCR_WORKERS)
+        page_count: Known page count; read from the page tree when omitted
+        pages: Only OCR these 1-based page numbers (default: all)
+        output: "text", or "pdf" for text-only PDF pages (see _recognize)
+
+    Yields:
+        (page_number, page_count, result) in page order, page_number 1-based
+    """
+    workers = max(1, workers or OCR_WORKERS)
+    if page_count is None:
+        page_count = inspect_pdf(pdf_path)["page_count"]
+    pool = _get_ocr_pool()
+    limit = workers * max(1, OCR_QUEUE_PER_WORKER)
+
+    # Rendered pages are moved here so the rasterizer can move on without
+    # deleting files the pool has not read yet
+    scratch = create_temp_dir()
+    in_flight = deque()
+    try:
+        for page_number, rendered in iter_rendered_pages(pdf_path, "png", dpi, page_count=page_count, pages=pages):
+            owned = os.path.join(scratch, os.path.basename(rendered))
+            os.replace(rendered, owned)
+            in_flight.append((page_number, pool.submit(_recognize, owned, language, output, dpi)))
+            while len(in_flight) >= limit:
+                number, future = in_flight.popleft()
+                yield number, page_count, future.result()
+        while in_flight:
+            number, future = in_flight.popleft()
+            yield number, page_count, future.result()
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def ocr_pages(pdf_path, dpi=300, language='eng', workers=None, on_page=None):
+    """
+    OCR every page of a PDF (see iter_ocr_pages).
+
+    Args:
+        on_page: Optional callback(done, total) after each page, e.g. for progress
+
+    Returns:
+        List of page texts in page order
+    """
+    texts = []
+    for page_number, page_count, text in iter_ocr_pages(pdf_path, dpi, language, workers):
+        texts.append(text)
+        if on_page:
+            on_page(page_number, page_count)
+    return texts
+
+
+def _covered_fraction(rects, page_rect):
+    area = abs(page_rect)
+    if not area:
+        return 0.0
+    return min(1.0, sum(abs(fitz.Rect(rect) & page_rect) for rect in rects) / area)
+
+
+def classify_page(page):
+    """
+    Decide whether a page's text layer can be used instead of OCR.
+
+    Args:
+        page: fitz.Page
+
+    Returns:
+        (method, text): PAGE_TEXT with the extracted text, or PAGE_OCR with ""
+    """
+    text = page.get_text("text") or ""
+    chars = sum(1 for c in text if not c.isspace())
+    unmapped = text.count("\ufffd")
+    page_rect = page.rect
+    image_coverage = _covered_fraction((info["bbox"] for info in page.get_image_info()), page_rect)
+    if image_coverage < OCR_IMAGE_COVERAGE:
+        # Born-digital (or blank) page: whatever the layer has is all there is
+        return PAGE_TEXT, text
+    if chars >= OCR_MIN_CHARS and unmapped <= chars * OCR_MAX_UNMAPPED:
+        glyph_coverage = _covered_fraction((word[:4] for word in page.get_text("words")), page_rect)
+        if glyph_coverage >= OCR_MIN_GLYPH_COVERAGE:
+            return PAGE_TEXT, text
+    return PAGE_OCR, ""
+
+
+def _classify_document(pdf_path, force_ocr=False):
+    """Returns (page_count, [classify_page result per page])"""
+    with fitz.open(pdf_path) as doc:
+        if force_ocr:
+            return doc.page_count, [(PAGE_OCR, "")] * doc.page_count
+        return doc.page_count, [classify_page(page) for page in doc]
+
+
+def iter_hybrid_pages(pdf_path, dpi=300, language='eng', workers=None, force_ocr=False):
+    """
+    Text of every page, taken from the text layer where it is usable and OCR'd otherwise.
+
+    Every page is classified first (classify_page, a few milliseconds each),
+    then only the scanned pages are rasterized and recognized through
+    iter_ocr_pages, so born-digital pages never reach pdftoppm or tesseract.
+
+    Args:
+        force_ocr: OCR every page regardless of its text layer
+
+    Yields:
+        (page_number, page_count, text, method) in page order, method PAGE_TEXT or PAGE_OCR
+    """
+    page_count, layers = _classify_document(pdf_path, force_ocr)
+    scanned = [number for number, (method, _) in enumerate(layers, start=1) if method == PAGE_OCR]
+    recognized = iter_ocr_pages(pdf_path, dpi, language, workers, page_count, pages=scanned)
+    try:
+        for number, (method, text) in enumerate(layers, start=1):
+            if method == PAGE_OCR:
+                _, _, text = next(recognized)
+            yield number, page_count, text, method
+    finally:
+        recognized.close()
+
+
+def extract_pages_text(pdf_path, dpi=300, language='eng', workers=None, force_ocr=False, on_page=None):
+    """
+    Text of every page via iter_hybrid_pages.
+
+    Args:
+        on_page: Optional callback(done, total) after each page, e.g. for progress
+
+    Returns:
+        (texts, methods): page texts and the PAGE_TEXT/PAGE_OCR path taken for each
+    """
+    texts, methods = [], []
+    for page_number, page_count, text, method in iter_hybrid_pages(pdf_path, dpi, language, workers, force_ocr):
+        texts.append(text)
+        methods.append(method)
+        if on_page:
+            on_page(page_number, page_count)
+    return texts, methods
+
+
+def make_searchable_pdf(pdf_path, output, dpi=300, language='eng', workers=None, force_ocr=False, on_page=None):
+    """
+    Add an invisible OCR text layer to the scanned pages of a PDF.
+
+    Scanned pages (see classify_page) go through the same parallel pipeline
+    as text extraction, but tesseract renders a text-only PDF page instead of
+    plain text. Each one is drawn over its original page as it arrives, so
+    the page images and other content are kept byte for byte rather than
+    re-rasterized. The glyphless font tesseract embeds in every layer is
+    deduplicated before saving, so the output stays close to the input size.
+
+    Args:
+        pdf_path: Source PDF
+        output: Destination path or writable binary stream
+        force_ocr: OCR every page; pages that already had text then carry it twice
+        on_page: Optional callback(done, total) after each OCR'd page
+
+    Returns:
+        PAGE_TEXT/PAGE_OCR per page
+    """
+    page_count, layers = _classify_document(pdf_path, force_ocr)
+    scanned = [number for number, (method, _) in enumerate(layers, start=1) if method == PAGE_OCR]
+
+    def overlays():
+        recognized = iter_ocr_pages(pdf_path, dpi, language, workers, page_count, pages=scanned, output="pdf")
+        for done, (page_number, _, layer) in enumerate(recognized, start=1):
+            yield page_number - 1, layer
+            if on_page:
+                on_page(done, len(scanned))
+
+    with pikepdf.open(pdf_path) as pdf:
+        if scanned:
+            stamp_page_overlays(pdf, overlays())
+            dedupe_resources(pdf)
+        pdf.save(output)
+    return [method for method, _ in layers]
+
+
+def page_method_headers(methods):
+    """Response headers reporting which path each page took, e.g. for the frontend or for debugging"""
+    return {
+        "X-Page-Methods": ",".join(methods),
+        "X-OCR-Pages": f"{methods.count(PAGE_OCR)}/{len(methods)}",
+    }
@@ -0,0 +1,392 @@
+import os
+import platform
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+
+# UNO ships with LibreOffice (python3-uno), not on PyPI. Without it each worker
+# still owns a private profile, but converts by running soffice per document.
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    uno = None
+    PropertyValue = None
+
+OFFICE_POOL_SIZE = int(os.environ.get('OFFICE_POOL_SIZE', '2'))
+OFFICE_JOB_TIMEOUT = float(os.environ.get('OFFICE_JOB_TIMEOUT', '120'))
+# Conversions allowed to wait for a free worker before new ones get a 503
+OFFICE_MAX_PENDING = int(os.environ.get('OFFICE_MAX_PENDING', '16'))
+OFFICE_STARTUP_TIMEOUT = float(os.environ.get('OFFICE_STARTUP_TIMEOUT', '60'))
+# Recycle an instance after this many documents to shed leaked memory
+OFFICE_MAX_JOBS_PER_WORKER = int(os.environ.get('OFFICE_MAX_JOBS_PER_WORKER', '200'))
+# Profiles live under <root>/<pid>/worker_<n>, so gunicorn processes never share one
+OFFICE_PROFILE_ROOT = os.environ.get('OFFICE_PROFILE_ROOT', os.path.join(tempfile.gettempdir(), 'pdfville_office'))
+OFFICE_PREWARM = os.environ.get('OFFICE_PREWARM', 'true').lower() == 'true'
+
+# LibreOffice export filter per document service
+_PDF_FILTERS = [
+    ("com.sun.star.text.TextDocument", "writer_pdf_Export"),
+    ("com.sun.star.sheet.SpreadsheetDocument", "calc_pdf_Export"),
+    ("com.sun.star.presentation.PresentationDocument", "impress_pdf_Export"),
+    ("com.sun.star.drawing.DrawingDocument", "draw_pdf_Export"),
+]
+
+
+class OfficeConversionError(Exception):
+    """LibreOffice could not convert the document"""
+
+
+class OfficeBusyError(OfficeConversionError):
+    """More conversions are waiting than OFFICE_MAX_PENDING allows"""
+
+
+class OfficeTimeoutError(OfficeConversionError):
+    """A conversion ran longer than the job timeout; its worker was restarted"""
+
+
+def find_soffice():
+    """Path of the LibreOffice/OpenOffice executable, or None"""
+    configured = os.environ.get('SOFFICE_PATH')
+    if configured:
+        return configured
+    if platform.system() == 'Windows':
+        possible_paths = [
+            r'C:\Program Files\LibreOffice\program\soffice.exe',
+            r'C:\Program Files (x86)\LibreOffice\program\soffice.exe',
+            r'C:\Program Files\OpenOffice\program\soffice.exe',
+            r'C:\Program Files (x86)\OpenOffice\program\soffice.exe'
+        ]
+        for path in possible_paths:
+            if os.path.exists(path):
+                return path
+        return None
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+
+def _file_url(path):
+    return 'file:///' + os.path.abspath(path).replace('\\', '/').lstrip('/')
+
+
+def _property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class OfficeWorker:
+    """
+    One headless LibreOffice instance with its own user profile.
+
+    With UNO available the instance is started once, listens on a private
+    named pipe and converts documents over the UNO bridge, so only the first
+    document pays for startup. Otherwise each conversion runs soffice against
+    this worker's profile, which at least keeps concurrent conversions from
+    fighting over a shared profile.
+
+    Profile and pipe are named after the owning process as well as the index:
+    every gunicorn process builds its own pool, and worker 0 of one process
+    must not reuse the profile or reach the instance of worker 0 of another.
+    The pid is read when it is needed, so a pool created before a fork
+    (preload_app) still gets per-process names in each child.
+    """
+
+    def __init__(self, index, soffice_path=None, profile_root=None, owner_pid=None):
+        self.index = index
+        self.soffice_path = soffice_path or find_soffice()
+        self.profile_root = profile_root or OFFICE_PROFILE_ROOT
+        self._owner_pid = owner_pid
+        self.jobs_done = 0
+        self._process = None
+        self._desktop = None
+
+    @property
+    def owner_pid(self):
+        return self._owner_pid or os.getpid()
+
+    @property
+    def profile_dir(self):
+        return os.path.join(self.profile_root, str(self.owner_pid), f"worker_{self.index}")
+
+    @property
+    def pipe_name(self):
+        return f"pdfville_{self.owner_pid}_{self.index}"
+
+    @property
+    def persistent(self):
+        return uno is not None
+
+    def _spawn(self, args):
+        kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.PIPE}
+        if os.name != 'nt':
+            # soffice forks soffice.bin; a process group lets kill() reach both
+            kwargs["start_new_session"] = True
+        return subprocess.Popen([self.soffice_path, f"-env:UserInstallation={_file_url(self.profile_dir)}", *args],
+                                **kwargs)
+
+    def start(self):
+        """Launch the instance and connect to it (no-op without UNO or if already up)"""
+        if self.soffice_path is None:
+            raise OfficeConversionError("LibreOffice/OpenOffice not found")
+        if not self.persistent or self.alive():
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        # No --nolockcheck: if a profile is ever shared after all, LibreOffice should refuse it loudly
+        self._process = self._spawn([
+            '--headless', '--invisible', '--nologo', '--nodefault', '--norestore',
+            f'--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext',
+        ])
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + OFFICE_STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    self.kill()
+                    raise OfficeConversionError(f"LibreOffice worker {self.index} failed to start")
+                time.sleep(0.25)
+        self._desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        self.jobs_done = 0
+
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def kill(self):
+        """Hard-stop the instance; a conversion blocked on it fails immediately"""
+        process, self._process, self._desktop = self._process, None, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            if os.name != 'nt':
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except OSError:
+            pass
+        process.wait()
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+    def convert(self, input_path, output_path):
+        """Convert one document to PDF at output_path"""
+        if self.persistent:
+            if self.jobs_done >= OFFICE_MAX_JOBS_PER_WORKER:
+                self.restart()
+            self.start()
+            self._convert_uno(input_path, output_path)
+        else:
+            self._convert_cli(input_path, output_path)
+        self.jobs_done += 1
+
+    def _convert_uno(self, input_path, output_path):
+        document = self._desktop.loadComponentFromURL(
+            _file_url(input_path), "_blank", 0, (_property("Hidden", True),)
+        )
+        if document is None:
+            raise OfficeConversionError("LibreOffice could not open the document")
+        try:
+            export_filter = next(
+                (name for service, name in _PDF_FILTERS if document.supportsService(service)), "writer_pdf_Export"
+            )
+            document.storeToURL(_file_url(output_path), (_property("FilterName", export_filter),))
+        finally:
+            document.close(True)
+
+    def _convert_cli(self, input_path, output_path):
+        if self.soffice_path is None:
+            raise OfficeConversionError("LibreOffice/OpenOffice not found")
+        output_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+        process = self._spawn(['--headless', '--convert-to', 'pdf', '--outdir', output_dir, input_path])
+        self._process = process
+        try:
+            _, stderr = process.communicate()
+            base_name = os.path.splitext(os.path.basename(input_path))[0]
+            generated_pdf = os.path.join(output_dir, f"{base_name}.pdf")
+            if not os.path.exists(generated_pdf):
+                raise OfficeConversionError(
+                    f"Conversion failed: {stderr.decode(errors='replace').strip()}" if stderr else "Conversion failed"
+                )
+            os.replace(generated_pdf, output_path)
+        finally:
+            # A timed-out call finishing late must not forget a newer job's process
+            if self._process is process:
+                self._process = None
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
+class OfficePool:
+    """
+    Fixed set of OfficeWorkers behind a bounded wait queue.
+
+    At most `size` conversions run at once, one per worker. A conversion that
+    exceeds its timeout gets its worker killed and restarted in the
+    background; a worker whose instance died during a job is restarted the
+    same way before it is reused.
+    """
+
+    def __init__(self, size=None, timeout=None, max_pending=None, worker_factory=OfficeWorker, pid=None):
+        """
+        Args:
+            pid: Process the workers' profiles and pipes are named after (default: the
+                current process whenever a worker starts)
+        """
+        self.size = size or OFFICE_POOL_SIZE
+        self.timeout = timeout or OFFICE_JOB_TIMEOUT
+        self.max_pending = max_pending or OFFICE_MAX_PENDING
+        if pid is not None:
+            worker_factory = partial(worker_factory, owner_pid=pid)
+        self.workers = [worker_factory(i) for i in range(self.size)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        # Spare threads so a call stuck in a killed worker never blocks new jobs
+        self._executor = ThreadPoolExecutor(max_workers=self.size * 2, thread_name_prefix='office')
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.conversions = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.convert_seconds = 0.0
+
+    def start(self):
+        """Start every worker's instance (used to warm the pool at boot)"""
+        for worker in self.workers:
+            try:
+                worker.start()
+            except Exception as e:
+                print(f"Office worker {worker.index} did not start: {str(e)}")
+
+    def _recycle(self, worker):
+        """
+        Kill the worker's instance now and start a fresh one in the background.
+
+        The worker goes back to the idle queue only once the new instance is
+        up, so the request that hit the problem doesn't wait for LibreOffice
+        to start and no other request picks up a half-started worker.
+        """
+        with self._lock:
+            self.restarts += 1
+        worker.kill()
+
+        def restart():
+            try:
+                worker.start()
+            except Exception as e:
+                # Leave it stopped; the next conversion starts it again
+                print(f"Office worker {worker.index} restart failed: {str(e)}")
+            finally:
+                self._idle.put(worker)
+
+        threading.Thread(target=restart, name=f'office-restart-{worker.index}', daemon=True).start()
+
+    def convert(self, input_path, output_path, timeout=None):
+        """
+        Convert an Office document to PDF on the next free worker.
+
+        Raises:
+            OfficeBusyError: Too many conversions are already waiting
+            OfficeTimeoutError: The conversion (including the wait) took too long
+            OfficeConversionError: LibreOffice failed to convert the document
+        """
+        timeout = timeout or self.timeout
+        with self._lock:
+            if self._waiting >= self.max_pending:
+                self.rejected += 1
+                raise OfficeBusyError("Too many document conversions in progress, please retry shortly")
+            self._waiting += 1
+        queued_at = time.monotonic()
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise OfficeTimeoutError("Timed out waiting for a free document converter")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        started = time.monotonic()
+        with self._lock:
+            self.wait_seconds += started - queued_at
+        recycle = False
+        try:
+            future = self._executor.submit(worker.convert, input_path, output_path)
+            try:
+                future.result(timeout=max(1.0, timeout - (started - queued_at)))
+            except FutureTimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                recycle = True
+                raise OfficeTimeoutError("Document conversion timed out")
+            except OfficeConversionError:
+                with self._lock:
+                    self.failures += 1
+                raise
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                recycle = worker.persistent and not worker.alive()
+                raise OfficeConversionError(f"Document conversion failed: {str(e)}")
+            with self._lock:
+                self.conversions += 1
+                self.convert_seconds += time.monotonic() - started
+        finally:
+            if recycle:
+                self._recycle(worker)
+            else:
+                self._idle.put(worker)
+
+    def stats(self):
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            return {
+                "workers": self.size,
+                "persistent": uno is not None,
+                "busy": self.size - self._idle.qsize(),
+                "waiting": self._waiting,
+                "conversions": self.conversions,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "rejected": self.rejected,
+                "avg_wait_seconds": round(self.wait_seconds / self.conversions, 3) if self.conversions else 0.0,
+                "avg_convert_seconds": round(self.convert_seconds / self.conversions, 3) if self.conversions else 0.0,
+            }
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.kill()
+            # Profiles are per process, so nothing else will ever use this one again
+            if isinstance(worker, OfficeWorker):
+                shutil.rmtree(worker.profile_dir, ignore_errors=True)
+        self._executor.shutdown(wait=False)
+
+
+pool = OfficePool()
+
+
+def convert_to_pdf(input_path, output_path, timeout=None):
+    """Convert an Office document with the shared pool (see OfficePool.convert)"""
+    return pool.convert(input_path, output_path, timeout=timeout)
+
+
+def prewarm():
+    """Start the pool's LibreOffice instances in the background when UNO is available"""
+    if OFFICE_PREWARM and uno is not None and find_soffice():
+        threading.Thread(target=pool.start, name='office-prewarm', daemon=True).start()
@@ -0,0 +1,118 @@
+from io import BytesIO
+
+import pikepdf
+from pikepdf import Name
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+
+def _page_size(page):
+    box = page.mediabox
+    return float(box[2]) - float(box[0]), float(box[3]) - float(box[1])
+
+
+def _isolate_page_content(pdf):
+    """
+    Returns (prefix, suffix) streams that wrap a page's existing content in q/Q.
+
+    Original content may leave the graphics state (CTM, colors) changed, so the
+    stamp is drawn after a Q that restores it. Both streams are shared by every
+    page; existing content streams are never decoded or rewritten.
+    """
+    return pdf.make_indirect(pikepdf.Stream(pdf, b"q\n")), pdf.make_indirect(pikepdf.Stream(pdf, b"Q\n"))
+
+
+def stamp_form_xobjects(pdf, overlay_for_size):
+    """
+    Draw a Form XObject over every page, building it once per distinct page size.
+
+    Args:
+        pdf: Open pikepdf.Pdf, modified in place
+        overlay_for_size: Callable (width, height) -> single-page overlay PDF bytes,
+            called once for each page size in the document
+    """
+    save_stream, restore_stream = _isolate_page_content(pdf)
+    forms = {}
+    for page in pdf.pages:
+        size = _page_size(page)
+        formx = forms.get(size)
+        if formx is None:
+            with pikepdf.open(BytesIO(overlay_for_size(*size))) as overlay:
+                formx = pdf.copy_foreign(overlay.pages[0].as_form_xobject())
+            forms[size] = formx
+
+        name = page.add_resource(formx, Name.XObject, prefix="Wm")
+        placement = page.calc_form_xobject_placement(formx, name, pikepdf.Rectangle(page.mediabox))
+        page.contents_add(save_stream, prepend=True)
+        page.contents_add(restore_stream)
+        page.contents_add(pdf.make_stream(placement))
+    return len(forms)
+
+
+def stamp_text(pdf, text_for_page, layout_for_page, font_size=12, rgb=(0, 0, 0)):
+    """
+    Write one line of Helvetica text on every page.
+
+    All pages share a single font dictionary; each page only gets a tiny
+    content stream with its own BT/Tf/Td/Tj operators.
+
+    Args:
+        pdf: Open pikepdf.Pdf, modified in place
+        text_for_page: Callable (page_index) -> text
+        layout_for_page: Callable (text_width, page_width, page_height) -> (x, y)
+        font_size: Font size in points
+        rgb: Fill color as 0-1 floats
+    """
+    font = pdf.make_indirect(pikepdf.Dictionary(
+        Type=Name.Font, Subtype=Name.Type1, BaseFont=Name.Helvetica, Encoding=Name.WinAnsiEncoding
+    ))
+    save_stream, restore_stream = _isolate_page_content(pdf)
+    for index, page in enumerate(pdf.pages):
+        width, height = _page_size(page)
+        box = page.mediabox
+        text = text_for_page(index)
+        x, y = layout_for_page(stringWidth(text, "Helvetica", font_size), width, height)
+        font_name = page.add_resource(font, Name.Font, prefix="PgNo")
+        content = pikepdf.unparse_content_stream([
+            ([], pikepdf.Operator("q")),
+            ([*rgb], pikepdf.Operator("rg")),
+            ([], pikepdf.Operator("BT")),
+            ([font_name, font_size], pikepdf.Operator("Tf")),
+            ([float(box[0]) + x, float(box[1]) + y], pikepdf.Operator("Td")),
+            ([pikepdf.String(text)], pikepdf.Operator("Tj")),
+            ([], pikepdf.Operator("ET")),
+            ([], pikepdf.Operator("Q")),
+        ])
+        page.contents_add(save_stream, prepend=True)
+        page.contents_add(restore_stream)
+        page.contents_add(pdf.make_stream(content))
+
+
+def stamp_page_overlays(pdf, overlays):
+    """
+    Draw a different single-page PDF over each of some pages.
+
+    Each overlay is scaled to its page's media box, upright as the page is
+    displayed (page rotation is counteracted). Existing page content is left
+    untouched.
+
+    Args:
+        pdf: Open pikepdf.Pdf, modified in place
+        overlays: Iterable of (page_index, overlay PDF bytes); consumed lazily,
+            so overlays can still be produced while earlier ones are placed
+
+    Returns:
+        Number of pages stamped
+    """
+    save_stream, restore_stream = _isolate_page_content(pdf)
+    stamped = 0
+    for index, data in overlays:
+        page = pdf.pages[index]
+        with pikepdf.open(BytesIO(data)) as overlay:
+            formx = pdf.copy_foreign(overlay.pages[0].as_form_xobject())
+        name = page.add_resource(formx, Name.XObject, prefix="Ov")
+        placement = page.calc_form_xobject_placement(formx, name, pikepdf.Rectangle(page.mediabox))
+        page.contents_add(save_stream, prepend=True)
+        page.contents_add(restore_stream)
+        page.contents_add(pdf.make_stream(placement))
+        stamped += 1
+    return stamped
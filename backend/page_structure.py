@@ -0,0 +1,201 @@
+import os
+import re
+import shutil
+
+import pikepdf
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF", re.S)
+_OBJECT_HEADER = re.compile(rb"\d+\s+\d+\s+obj")
+
+
+def _previous_xref(input_path):
+    """
+    Offset of the last cross-reference section and whether it is an xref stream.
+
+    Returns (None, None) if the trailer cannot be trusted as-is.
+    """
+    size = os.path.getsize(input_path)
+    with open(input_path, 'rb') as f:
+        f.seek(max(0, size - 2048))
+        tail = f.read()
+        matches = list(_STARTXREF.finditer(tail))
+        if not matches:
+            return None, None
+        offset = int(matches[-1].group(1))
+        if offset >= size:
+            return None, None
+        f.seek(offset)
+        head = f.read(32).lstrip()
+    if head.startswith(b"xref"):
+        return offset, False
+    if _OBJECT_HEADER.match(head):
+        return offset, True
+    return None, None
+
+
+def _trailer_entries(pdf):
+    entries = b"/Root " + pdf.trailer.Root.unparse()
+    if "/Info" in pdf.trailer and pdf.trailer.Info.is_indirect:
+        entries += b" /Info " + pdf.trailer.Info.unparse()
+    if "/ID" in pdf.trailer:
+        entries += b" /ID " + pdf.trailer.ID.unparse(resolved=True)
+    return entries
+
+
+def _append_update(input_path, output_path, pdf, objects):
+    """
+    Write input_path plus an incremental update that redefines `objects`.
+
+    The original bytes are copied unchanged and followed by the new object
+    bodies, a cross-reference section for just those objects and a trailer
+    whose /Prev points at the previous section. An xref stream is written when
+    the original uses one, a classic table otherwise.
+
+    Returns False (writing nothing) if the file is not safe to append to.
+    """
+    prev_offset, uses_xref_stream = _previous_xref(input_path)
+    if prev_offset is None:
+        return False
+
+    shutil.copyfile(input_path, output_path)
+    with open(output_path, 'r+b') as out:
+        out.seek(0, os.SEEK_END)
+        if out.tell() and not _ends_with_newline(out):
+            out.write(b"\n")
+        offsets = {}
+        for obj in objects:
+            number, generation = obj.objgen
+            offsets[number] = (out.tell(), generation)
+            out.write(b"%d %d obj\n" % (number, generation) + obj.unparse(resolved=True) + b"\nendobj\n")
+
+        size = int(pdf.trailer.Size)
+        if uses_xref_stream:
+            xref_number = size
+            xref_offset = out.tell()
+            offsets[xref_number] = (xref_offset, 0)
+            numbers = sorted(offsets)
+            rows = b"".join(
+                b"\x01" + offsets[n][0].to_bytes(4, "big") + offsets[n][1].to_bytes(2, "big") for n in numbers
+            )
+            index = b" ".join(b"%d 1" % n for n in numbers)
+            out.write(
+                b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Index [%s] /Prev %d %s /Length %d >>\nstream\n"
+                % (xref_number, size + 1, index, prev_offset, _trailer_entries(pdf), len(rows))
+                + rows + b"\nendstream\nendobj\n"
+            )
+        else:
+            xref_offset = out.tell()
+            out.write(b"xref\n")
+            for number in sorted(offsets):
+                offset, generation = offsets[number]
+                out.write(b"%d 1\n%010d %05d n \n" % (number, offset, generation))
+            out.write(b"trailer\n<< /Size %d /Prev %d %s >>\n" % (size, prev_offset, _trailer_entries(pdf)))
+        out.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+    return True
+
+
+def _ends_with_newline(f):
+    f.seek(-1, os.SEEK_END)
+    last = f.read(1)
+    f.seek(0, os.SEEK_END)
+    return last in (b"\n", b"\r")
+
+
+def _can_append(pdf):
+    # Encrypted objects would need re-encrypting; a repaired file has
+    # offsets qpdf reconstructed, so the original trailer chain is not usable.
+    return not pdf.is_encrypted and not pdf.get_warnings()
+
+
+def rotate_pages(input_path, output_path, rotations, relative=True):
+    """
+    Rotate pages by changing /Rotate only.
+
+    Only the targeted page dictionaries are rewritten, appended to a copy of
+    the original file as an incremental update, so the cost depends on the
+    number of rotated pages rather than on the size of the document. Files
+    that cannot be appended to (encrypted, repaired on open) are saved by qpdf,
+    which still copies page content through without re-encoding it.
+
+    Args:
+        input_path: Source PDF
+        output_path: Destination PDF
+        rotations: {page_index (0-based): angle in degrees, multiple of 90}
+        relative: Add the angle to the current rotation instead of replacing it
+
+    Returns:
+        "incremental" or "rewrite", whichever was used
+    """
+    with pikepdf.open(input_path) as pdf:
+        changed = []
+        for page_index, angle in sorted(rotations.items()):
+            page = pdf.pages[page_index]
+            page.rotate(int(angle), relative=relative)
+            changed.append(page.obj)
+
+        if _can_append(pdf) and _append_update(input_path, output_path, pdf, changed):
+            return "incremental"
+        pdf.save(output_path)
+        return "rewrite"
+
+
+def apply_page_operations(input_path, output_path, operations):
+    """
+    Apply a sequence of structural page edits: ("rotate", page_index, angle) with
+    an absolute angle, or ("delete", page_index). Indexes refer to the document
+    as it is when the operation runs, like applying them one by one.
+
+    Rotations alone go through the incremental path of rotate_pages. Deleted
+    pages are dropped with qpdf and the file rewritten, so their content does
+    not survive in the output; page content streams are copied as-is.
+    """
+    with pikepdf.open(input_path) as pdf:
+        changed = {}
+        deleted = False
+        for operation in operations:
+            page_index = operation[1]
+            if not 0 <= page_index < len(pdf.pages):
+                continue
+            if operation[0] == "rotate":
+                page = pdf.pages[page_index]
+                page.rotate(int(operation[2]), relative=False)
+                changed[page.obj.objgen] = page.obj
+            elif operation[0] == "delete":
+                del pdf.pages[page_index]
+                deleted = True
+
+        if not deleted and _can_append(pdf) and _append_update(input_path, output_path, pdf, list(changed.values())):
+            return "incremental"
+        pdf.save(output_path)
+        return "rewrite"
+
+
+def remove_pages(input_path, output, page_indexes):
+    """
+    Drop pages (0-based indexes) with qpdf.
+
+    Page content is copied through without being decoded or re-encoded, and
+    the removed pages' objects are left out of the output entirely. This is a
+    rewrite rather than an incremental update on purpose: appending would
+    leave the removed pages recoverable from the original bytes.
+
+    Args:
+        input_path: Source PDF
+        output: Destination path or writable binary stream
+        page_indexes: Pages to drop
+
+    Returns:
+        Number of pages left
+
+    Raises:
+        ValueError: If every page would be removed
+    """
+    with pikepdf.open(input_path) as pdf:
+        remove = {i for i in page_indexes if 0 <= i < len(pdf.pages)}
+        if len(remove) >= len(pdf.pages):
+            raise ValueError("Cannot remove all pages from PDF")
+        for page_index in sorted(remove, reverse=True):
+            del pdf.pages[page_index]
+        remaining = len(pdf.pages)
+        pdf.save(output)
+    return remaining
@@ -0,0 +1,206 @@
+"""
+Extracted page text, cached on disk by document content.
+
+Summarize (preview and download), search/extract, scan-to-text and
+translate all start by pulling text out of every page, and the UI often
+sends the same file to several of them in a row. Entries are keyed by the
+file's SHA-256 plus the extraction mode (and OCR language/DPI), so each
+page is read or OCR'd once and later requests decompress the stored text.
+
+Each entry is one file: a small JSON header (page methods and compressed
+sizes) followed by every page's text compressed on its own with zlib. The
+shared DiskCache evicts least recently used entries beyond the size budget.
+"""
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+import fitz  # PyMuPDF
+
+import result_cache
+from ocr_engine import PAGE_TEXT, extract_pages_text
+
+logger = logging.getLogger(__name__)
+
+PAGE_TEXT_CACHE_ENABLED = os.environ.get('PAGE_TEXT_CACHE_ENABLED', 'true').lower() == 'true'
+PAGE_TEXT_CACHE_DIR = os.environ.get('PAGE_TEXT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pdfville_page_text'))
+PAGE_TEXT_CACHE_MAX_MB = int(os.environ.get('PAGE_TEXT_CACHE_MAX_MB', '256'))
+PAGE_TEXT_CACHE_TTL = float(os.environ.get('PAGE_TEXT_CACHE_TTL', str(24 * 3600)))
+
+# Extraction modes
+MODE_TEXT = "text"      # text layer only
+MODE_HYBRID = "hybrid"  # text layer, OCR for pages without a usable one
+MODE_OCR = "ocr"        # OCR every page
+MODE_SPANS = "spans"    # text layer spans with positions and fonts (JSON per page)
+
+_MAGIC = b'PTC1'
+_HEADER = struct.Struct('>4sI')
+
+_cache = None
+_cache_lock = threading.Lock()
+_loading = {}
+_loading_lock = threading.Lock()
+
+
+def _get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = result_cache.DiskCache(PAGE_TEXT_CACHE_DIR, PAGE_TEXT_CACHE_MAX_MB * 1024 * 1024,
+                                            PAGE_TEXT_CACHE_TTL)
+        return _cache
+
+
+def encode(pages, methods):
+    """Serialize page texts and their methods, compressing each page separately"""
+    blobs = [zlib.compress(page.encode('utf-8'), 6) for page in pages]
+    header = json.dumps({"methods": methods, "sizes": [len(b) for b in blobs]}).encode('utf-8')
+    return _HEADER.pack(_MAGIC, len(header)) + header + b"".join(blobs)
+
+
+def decode(data, pages=None):
+    """
+    Inverse of encode.
+
+    Args:
+        pages: Optional 0-based page indexes to decompress; others come back as None
+
+    Returns:
+        (texts, methods)
+    """
+    magic, header_len = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("Not a page text cache entry")
+    offset = _HEADER.size + header_len
+    header = json.loads(data[_HEADER.size:offset].decode('utf-8'))
+    wanted = set(range(len(header["sizes"])) if pages is None else pages)
+    texts = []
+    for index, size in enumerate(header["sizes"]):
+        texts.append(zlib.decompress(data[offset:offset + size]).decode('utf-8') if index in wanted else None)
+        offset += size
+    return texts, header["methods"]
+
+
+def get_or_extract(pdf_path, mode, extract, params=None):
+    """
+    Cached page texts for pdf_path, running extract() on a miss.
+
+    Concurrent misses for the same entry in this process wait for one
+    extraction instead of each running their own.
+
+    Args:
+        pdf_path: The document; its content (not name) identifies the entry
+        mode: MODE_* constant
+        extract: Callable returning (texts, methods)
+        params: Further options the result depends on (OCR language, DPI)
+
+    Returns:
+        (texts, methods)
+    """
+    if not PAGE_TEXT_CACHE_ENABLED:
+        return extract()
+    key = result_cache.make_key("page_text", [pdf_path], dict(params or {}, mode=mode))
+    cache = _get_cache()
+    while True:
+        cached = _load(cache, key)
+        if cached is not None:
+            return cached
+        with _loading_lock:
+            pending = _loading.get(key)
+            if pending is None:
+                pending = _loading[key] = threading.Event()
+                break
+        # Another request is extracting this document; use its result (or retry if it failed)
+        pending.wait()
+
+    try:
+        texts, methods = extract()
+        try:
+            cache.put_bytes(key, encode(texts, methods))
+        except OSError as e:
+            logger.warning(f"Could not store page text in cache: {e}")
+        return texts, methods
+    finally:
+        with _loading_lock:
+            _loading.pop(key).set()
+
+
+def _load(cache, key):
+    path = cache.get(key)
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return decode(f.read())
+    except (OSError, ValueError, zlib.error, struct.error):
+        # Evicted meanwhile or unreadable; extract again
+        return None
+
+
+def _read_text_layer(pdf_path):
+    texts = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            try:
+                texts.append(page.get_text("text") or "")
+            except Exception as e:
+                logger.error(f"Failed to extract text from page {page.number + 1}: {e}")
+                texts.append("")
+    return texts, [PAGE_TEXT] * len(texts)
+
+
+def text_layer_pages(pdf_path):
+    """Text layer of every page (no OCR); "" for pages without one"""
+    return get_or_extract(pdf_path, MODE_TEXT, lambda: _read_text_layer(pdf_path))[0]
+
+
+def ocr_pages(pdf_path, dpi=300, language='eng', force_ocr=False, on_page=None):
+    """
+    Page texts with OCR where needed (see ocr_engine.extract_pages_text).
+
+    Args:
+        on_page: Optional progress callback(done, total); not called on a cache hit
+
+    Returns:
+        (texts, methods)
+    """
+    return get_or_extract(
+        pdf_path, MODE_OCR if force_ocr else MODE_HYBRID,
+        lambda: extract_pages_text(pdf_path, dpi, language, force_ocr=force_ocr, on_page=on_page),
+        {"dpi": dpi, "language": language},
+    )
+
+
+class _NoPages(Exception):
+    """extract() returned nothing, so there is nothing to cache"""
+
+
+def span_pages(pdf_path, extract):
+    """
+    Per-page span dicts (JSON-serializable) from extract(pdf_path), cached like page text.
+
+    Returns:
+        List of page dicts
+    """
+    def run():
+        pages = extract(pdf_path)
+        if not pages:
+            raise _NoPages()
+        return [json.dumps(page) for page in pages], [PAGE_TEXT] * len(pages)
+
+    try:
+        texts, _ = get_or_extract(pdf_path, MODE_SPANS, run)
+    except _NoPages:
+        return []
+    return [json.loads(text) for text in texts]
+
+
+def stats():
+    """Counters for the /metrics endpoint"""
+    data = _get_cache().stats()
+    data["enabled"] = PAGE_TEXT_CACHE_ENABLED
+    return data
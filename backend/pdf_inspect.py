@@ -0,0 +1,107 @@
+import hashlib
+import os
+
+import pikepdf
+from flask import g, has_request_context
+from PyPDF2 import PdfReader
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _file_digest(path):
+    """Hash the file in fixed-size chunks, returning (sha256 hex, size in bytes)"""
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+            size += len(chunk)
+    return sha.hexdigest(), size
+
+
+def remember_digest(path, sha256, size):
+    """Seed the per-request digest memo for a file whose hash is already known"""
+    if not has_request_context():
+        return
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    g.setdefault('file_digests', {})[memo_key] = (sha256, size)
+
+
+def file_sha256(path):
+    """SHA-256 of a file, memoized per request like inspect_pdf"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    memo = g.setdefault('file_digests', {}) if has_request_context() else {}
+    if memo_key not in memo:
+        memo[memo_key] = _file_digest(path)
+    return memo[memo_key][0]
+
+
+def _page_count_from_tree(path):
+    """
+    Count the pages by walking /Root -> /Pages with pikepdf.
+
+    The root /Count is written by whoever made the file, so it is not trusted:
+    qpdf follows the /Kids arrays down to the leaves instead. Objects are
+    resolved lazily, so this reads the page dictionaries but no content
+    streams, unlike a full PdfReader parse.
+
+    Returns:
+        (page_count, encrypted); page_count is None when the tree is unusable
+    """
+    try:
+        with pikepdf.open(path) as pdf:
+            return len(pdf.pages), pdf.is_encrypted
+    except pikepdf.PasswordError:
+        return None, True
+    except Exception:
+        return None, False
+
+
+def _page_count_full_parse(path):
+    """Fallback for broken page trees: walk every page with PyPDF2"""
+    reader = PdfReader(path, strict=False)
+    return len(reader.pages), reader.is_encrypted
+
+
+def inspect_pdf(path):
+    """
+    Inspect a PDF in a single pass: size, content hash, page count and encryption flag.
+
+    Results are memoized per request (keyed by path, size and mtime), so restriction
+    checks and the handler that follows them share one inspection.
+
+    Args:
+        path: Path to the PDF on disk
+
+    Returns:
+        dict with path, size, sha256, page_count and encrypted
+
+    Raises:
+        Exception: if the page count cannot be determined at all (unreadable file)
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    memo = g.setdefault('pdf_inspections', {}) if has_request_context() else {}
+    if memo_key in memo:
+        return memo[memo_key]
+
+    sha256 = file_sha256(path)
+    size = stat.st_size
+    page_count, encrypted = _page_count_from_tree(path)
+    if page_count is None:
+        page_count, fallback_encrypted = _page_count_full_parse(path)
+        encrypted = encrypted or fallback_encrypted
+
+    info = {
+        "path": path,
+        "size": size,
+        "sha256": sha256,
+        "page_count": page_count,
+        "encrypted": encrypted,
+    }
+    memo[memo_key] = info
+    return info
@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class SharedProcessPool:
+    """
+    Process pool created on first use and shared by all requests.
+
+    The size is fixed when the pool is created and the pool is never shut
+    down while the app runs, so a request can't find it closed between
+    getting it and submitting to it. Callers that want a different size
+    (benchmarks comparing worker counts) build their own executor.
+    """
+
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        """
+        Args:
+            max_workers: Worker processes
+            initializer: Optional function run in each worker when it starts
+            initargs: Arguments for initializer, or a callable returning them,
+                evaluated when the pool is created (for settings made after import)
+        """
+        self.max_workers = max(1, max_workers)
+        self._initializer = initializer
+        self._initargs = initargs
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The shared executor, creating it on first use"""
+        with self._lock:
+            if self._pool is None:
+                initargs = self._initargs() if callable(self._initargs) else self._initargs
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=self._initializer, initargs=initargs
+                )
+            return self._pool
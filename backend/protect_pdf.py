@@ -1,4 +1,4 @@
-from restrictions import check_restrictions, get_user, check_protect_pdf_restrictions
+from restrictions import check_restrictions, check_protect_pdf_restrictions
 from flask import jsonify, send_file, request
 import pikepdf
 import traceback
@@ -0,0 +1,92 @@
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf2image import convert_from_path
+
+from pdf_inspect import inspect_pdf
+from utils import create_temp_dir
+
+# Pages rendered per pdftoppm call, and how many calls may run at once
+RASTER_WINDOW = int(os.environ.get('RASTER_WINDOW', '4'))
+RASTER_WORKERS = int(os.environ.get('RASTER_WORKERS', os.cpu_count() or 1))
+
+# pdftoppm encodes these formats itself, so pages never pass through PIL
+_EXTENSIONS = {"jpeg": ".jpg", "png": ".png"}
+
+
+def _render_window(pdf_path, first_page, last_page, fmt, dpi, output_dir):
+    """Render pages first_page..last_page straight to image files; returns their paths in order"""
+    return convert_from_path(
+        pdf_path, dpi=dpi, first_page=first_page, last_page=last_page, fmt=fmt,
+        output_folder=output_dir, output_file=f"p{first_page:06d}", paths_only=True
+    )
+
+
+def _windows(pages, window):
+    """Split sorted page numbers into (first, last) runs of consecutive pages, at most `window` long"""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1 and page - runs[-1][0] < window:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return deque((first, last) for first, last in runs)
+
+
+def iter_rendered_pages(pdf_path, fmt="jpeg", dpi=200, window=None, workers=None, page_count=None, pages=None):
+    """
+    Rasterize a PDF one small window of pages at a time.
+
+    Each window is rendered by pdftoppm directly into encoded image files, and at
+    most `workers` windows are in flight, so memory and scratch disk stay bounded
+    no matter how many pages the document has. Pages are yielded in order; each
+    file is deleted as soon as the caller asks for the next page, so copy or
+    consume it (e.g. ZipFile.write) before moving on.
+
+    Args:
+        pdf_path: Path to the PDF
+        fmt: "jpeg" or "png"
+        dpi: Render resolution
+        window: Pages per pdftoppm call (default RASTER_WINDOW)
+        workers: Windows rendered in parallel (default RASTER_WORKERS)
+        page_count: Known page count; read from the page tree when omitted
+        pages: Only render these 1-based page numbers (default: all)
+
+    Yields:
+        (page_number, image_path) with 1-based page numbers
+    """
+    if fmt not in _EXTENSIONS:
+        raise ValueError(f"Unsupported raster format: {fmt}")
+    window = max(1, window or RASTER_WINDOW)
+    workers = max(1, workers or RASTER_WORKERS)
+    if pages is None:
+        if page_count is None:
+            page_count = inspect_pdf(pdf_path)["page_count"]
+        pages = range(1, page_count + 1)
+
+    scratch = create_temp_dir()
+    windows = _windows(sorted(set(pages)), window)
+    in_flight = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # pdftoppm runs as a subprocess, so threads are enough to use several cores
+            while windows or in_flight:
+                while windows and len(in_flight) < workers:
+                    first, last = windows.popleft()
+                    in_flight.append((first, pool.submit(_render_window, pdf_path, first, last, fmt, dpi, scratch)))
+                first, future = in_flight.popleft()
+                for offset, path in enumerate(future.result()):
+                    try:
+                        yield first + offset, path
+                    finally:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        shutil.rmtree(scratch, ignore_errors=True)
+
@@ -4,8 +4,9 @@ import tempfile
 import zipfile
 from io import BytesIO
 import logging
-from PyPDF2 import PdfWriter, PdfReader
+from page_structure import remove_pages as remove_pages_structural
 from restrictions import check_restrictions
+from pdf_inspect import inspect_pdf
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -45,32 +46,23 @@ def parse_page_ranges(page_ranges_str, total_pages):
     return pages_to_remove
 
 def remove_pages_from_pdf(input_pdf_path, pages_to_remove):
-    """Remove specified pages from a PDF file."""
+    """Remove specified pages from a PDF file.
+
+    Pages are dropped from the page tree and the file is rewritten by qpdf,
+    which copies the remaining page content through without re-serializing it.
+    """
     try:
-        with open(input_pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            writer = PdfWriter()
-            
-            total_pages = len(reader.pages)
-            logger.info(f"PDF has {total_pages} pages, removing pages: {sorted(pages_to_remove)}")
-            
-            # Add pages that are NOT in the removal list
-            pages_added = 0
-            for page_num in range(1, total_pages + 1):
-                if page_num not in pages_to_remove:
-                    writer.add_page(reader.pages[page_num - 1])  # PyPDF2 uses 0-based indexing
-                    pages_added += 1
-            
-            if pages_added == 0:
-                raise ValueError("Cannot remove all pages from PDF")
-            
-            # Create output buffer
-            output_buffer = BytesIO()
-            writer.write(output_buffer)
-            output_buffer.seek(0)
-            
-            logger.info(f"Successfully removed {len(pages_to_remove)} pages, {pages_added} pages remaining")
-            return output_buffer
+        logger.info(f"Removing pages: {sorted(pages_to_remove)}")
+        
+        # Create output buffer
+        output_buffer = BytesIO()
+        pages_left = remove_pages_structural(
+            input_pdf_path, output_buffer, [page_num - 1 for page_num in pages_to_remove]
+        )
+        output_buffer.seek(0)
+        
+        logger.info(f"Successfully removed {len(pages_to_remove)} pages, {pages_left} pages remaining")
+        return output_buffer
             
     except Exception as e:
         logger.error(f"Error removing pages from PDF: {str(e)}")
@@ -124,10 +116,8 @@ def remove_pages():
                 file.save(temp_input_path)
                 
                 try:
-                    # Read PDF to get total pages
-                    with open(temp_input_path, 'rb') as f:
-                        reader = PdfReader(f)
-                        total_pages = len(reader.pages)
+                    # Page count from the page tree (no full parse before the real one)
+                    total_pages = inspect_pdf(temp_input_path)["page_count"]
                     
                     # Parse pages to remove
                     if removal_type == 'specific':
@@ -9,17 +9,26 @@ from werkzeug.utils import secure_filename
 import pikepdf
 import warnings
 import logging
+from upload_ingest import upload_mmap
+from utils import create_temp_dir
 
 # Suppress PyPDF2 warnings for cleaner output
 warnings.filterwarnings("ignore", category=PdfReadWarning)
 logging.getLogger("PyPDF2").setLevel(logging.ERROR)
 
+def _as_stream(file_content):
+    """Seekable stream over bytes or a memory-mapped upload (mmap is read in place)"""
+    if hasattr(file_content, 'seek'):
+        file_content.seek(0)
+        return file_content
+    return io.BytesIO(file_content)
+
 def repair_with_pypdf2(file_content, preserve_bookmarks=True, preserve_metadata=True):
     """
     Attempt to repair PDF using PyPDF2 (basic repair)
     """
     try:
-        input_pdf = PdfReader(io.BytesIO(file_content), strict=False)
+        input_pdf = PdfReader(_as_stream(file_content), strict=False)
         output_pdf = PdfWriter()
         
         # Copy pages
@@ -99,7 +108,7 @@ def repair_minimal(file_content):
     Minimal repair - just try to read and rewrite
     """
     try:
-        input_pdf = PdfReader(io.BytesIO(file_content), strict=False)
+        input_pdf = PdfReader(_as_stream(file_content), strict=False)
         output_pdf = PdfWriter()
         
         # Just copy pages without extra processing
@@ -205,7 +214,7 @@ def repair_pdf():
             return jsonify({"error": f"Invalid repair mode. Must be one of: {valid_modes}"}), 400
 
         # Create temporary directory for processing
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         processed_files = []
         repair_summary = []
 
@@ -222,19 +231,19 @@ def repair_pdf():
                 print(f"\n🔧 Processing: {filename}")
                 
                 try:
-                    # Read the PDF
-                    file_content = file.read()
-                    original_size = len(file_content)
-                    print(f"📊 Original size: {original_size:,} bytes")
-                    
-                    # Attempt repair
-                    repaired_content = repair_pdf_file(
-                        file_content, 
-                        filename, 
-                        repair_mode,
-                        preserve_bookmarks,
-                        preserve_metadata
-                    )
+                    # Map the spooled upload instead of reading a copy into memory
+                    with upload_mmap(file) as file_content:
+                        original_size = len(file_content)
+                        print(f"📊 Original size: {original_size:,} bytes")
+                        
+                        # Attempt repair
+                        repaired_content = repair_pdf_file(
+                            file_content, 
+                            filename, 
+                            repair_mode,
+                            preserve_bookmarks,
+                            preserve_metadata
+                        )
                     
                     repaired_size = len(repaired_content)
                     print(f"📊 Repaired size: {repaired_size:,} bytes")
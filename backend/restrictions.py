@@ -1,17 +1,89 @@
 import os
-from PyPDF2 import PdfReader
+from pdf_inspect import inspect_pdf
 import boto3 # Import boto3
-from flask import current_app # Import current_app to access app config
+from flask import current_app, g, has_request_context # Import current_app to access app config
 from datetime import datetime
+from cache_utils import TTLCache
 # In-memory user store (for demo only) - This will become less critical
 # users = {
 #     "free@example.com": {"is_premium_": False},
 #     "pro@example.com": {"is_premium_": True},
 # }
 
+# Process-wide premium status cache keyed by normalised email.
+# Every tool request looks the user up (often several times), and each lookup costs a DB
+# session plus a Cognito list_users scan. Entries are invalidated explicitly whenever the
+# premium flag changes (payment verification, set_premium_cognito, admin jobs).
+PREMIUM_CACHE_TTL = float(os.environ.get('PREMIUM_CACHE_TTL', '300'))
+PREMIUM_CACHE_SIZE = int(os.environ.get('PREMIUM_CACHE_SIZE', '4096'))
+_premium_cache = TTLCache(maxsize=PREMIUM_CACHE_SIZE, ttl=PREMIUM_CACHE_TTL)
+
+
+def _cache_key(email):
+    return (email or "").strip().lower()
+
+
+def invalidate_user(email):
+    """Forget the cached premium status for email so the next lookup hits DB/Cognito"""
+    return _premium_cache.invalidate(_cache_key(email))
+
+
+def premium_cache_stats():
+    """Hit/miss counters of the premium status cache"""
+    return _premium_cache.stats()
+
+
+def get_request_user(email):
+    """
+    Return the user/entitlement dict for email, resolved at most once per request.
+
+    The result is kept on flask.g so that chained restriction checks and the handler
+    itself share one lookup. Outside a request context this is plain get_user.
+    """
+    if not has_request_context():
+        return get_user(email)
+    users = g.setdefault("request_users", {})
+    key = _cache_key(email)
+    if key not in users:
+        users[key] = get_user(email)
+    return users[key]
+
+
+def identity_lookup_count():
+    """Number of DB/Cognito user resolutions performed by the current request"""
+    if not has_request_context():
+        return 0
+    return g.get("identity_lookups", 0)
+
+
 # Remove or comment out the 'users' dictionary if you fully transition to Cognito.
 # For now, let's keep it for backward compatibility with get_user if needed elsewhere.
 def get_user(email):
+    """
+    Return {"email", "is_premium_"} for email, served from the premium cache when fresh.
+    """
+    key = _cache_key(email)
+    cached = _premium_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    if has_request_context():
+        g.identity_lookups = g.get("identity_lookups", 0) + 1
+    user, ttl = _fetch_user(email)
+    if ttl is not None:
+        _premium_cache.set(key, user, ttl=ttl)
+    return dict(user)
+
+
+def _fetch_user(email):
+    """
+    Resolve the premium flag from the local DB and Cognito.
+
+    Returns:
+        (user dict, ttl) where ttl is the cache lifetime for the result, or None when the
+        result came from an error fallback and must not be cached.
+    """
+    ttl = PREMIUM_CACHE_TTL
         # First, enforce expiry in local DB and sync Cognito if needed
     try:
         from db_config import get_db
@@ -32,6 +104,10 @@ def get_user(email):
                     except Exception:
                         # Keep going even if Cognito update fails
                         pass
+                else:
+                    # Never serve a cached premium flag past the subscription expiry
+                    remaining = (db_user.subscription_expiry - datetime.utcnow()).total_seconds()
+                    ttl = min(ttl, remaining)
         finally:
             db.close()
     except Exception as e:
@@ -54,17 +130,17 @@ def get_user(email):
             print(f"[DEBUG] Cognito attributes for {email}: {user_attributes}")  # ADD THIS
             is_premium_ = user_attributes.get('custom:is_premium_') == 'true'
             print(f"[DEBUG] is_premium_ value: {is_premium_}")  # ADD THIS
-            return {"email": email, "is_premium_": is_premium_}
+            return {"email": email, "is_premium_": is_premium_}, ttl
         else:
             # No user found in Cognito; treat as non-premium by default
-            return {"email": email, "is_premium_": False}
+            return {"email": email, "is_premium_": False}, ttl
     except Exception as e:
         # Handle Cognito errors gracefully and default to non-premium
         print(f"Error fetching user from Cognito: {e}")
-        return {"email": email, "is_premium_": False}
+        return {"email": email, "is_premium_": False}, None
 
 def check_restrictions(email, file_paths):
-    user = get_user(email) # Now gets user from Cognito
+    user = get_request_user(email) # Resolved once per request (cached from Cognito)
     if user["is_premium_"]:
         return None  # Premium = no restrictions
 
@@ -82,8 +158,7 @@ def check_restrictions(email, file_paths):
             return f"File {os.path.basename(path)} exceeds 5MB free limit." # Use basename for better message
 
         try:
-            reader = PdfReader(path)
-            if len(reader.pages) > MAX_PAGES:
+            if inspect_pdf(path)["page_count"] > MAX_PAGES:
                 return f"File {os.path.basename(path)} exceeds 10-page free limit."
         except Exception as e:
             print(f"Error reading PDF pages for restriction check: {e}")
@@ -104,7 +179,7 @@ def check_edit_pdf_restrictions(email, file_paths, operations=None):
     Returns:
         Error message if restrictions are violated, None otherwise
     """
-    user = get_user(email)
+    user = get_request_user(email)
     
     # Premium users have no restrictions
     if user["is_premium_"]:
@@ -132,7 +207,7 @@ def check_compress_pdf_restrictions(email, file_paths, compression_level="medium
     Returns:
         Error message if restrictions are violated, None otherwise
     """
-    user = get_user(email)
+    user = get_request_user(email)
     
     # Premium users have no restrictions
     if user["is_premium_"]:
@@ -170,7 +245,7 @@ def check_merge_pdf_restrictions(email, file_paths):
     Returns:
         Error message if restrictions are violated, None otherwise
     """
-    user = get_user(email)
+    user = get_request_user(email)
     
     # Premium users have no restrictions
     if user["is_premium_"]:
@@ -193,8 +268,7 @@ def check_merge_pdf_restrictions(email, file_paths):
         
         # Check page count for PDF files
         try:
-            reader = PdfReader(path)
-            if len(reader.pages) > FREE_MAX_PAGES:
+            if inspect_pdf(path)["page_count"] > FREE_MAX_PAGES:
                 return {"error": f"File {os.path.basename(path)} exceeds the 10-page free limit. Upgrade to premium to merge larger PDFs.", "show_upgrade": True}
         except Exception as e:
             print(f"Error reading PDF pages for restriction check: {e}")
@@ -213,7 +287,7 @@ def check_convert_pdf_restrictions(email, file_paths):
     Returns:
         Error message if restrictions are violated, None otherwise
     """
-    user = get_user(email)
+    user = get_request_user(email)
     
     # Premium users have no restrictions
     if user["is_premium_"]:
@@ -237,8 +311,7 @@ def check_convert_pdf_restrictions(email, file_paths):
         # Check page count for PDF files
         if path.lower().endswith('.pdf'):
             try:
-                reader = PdfReader(path)
-                if len(reader.pages) > FREE_MAX_PAGES:
+                if inspect_pdf(path)["page_count"] > FREE_MAX_PAGES:
                     return {"error": f"File {os.path.basename(path)} exceeds the 3-page free limit. Upgrade to premium to convert more pages.", "show_upgrade": True}
             except Exception as e:
                 print(f"Error reading PDF pages for restriction check: {e}")
@@ -260,7 +333,7 @@ def check_split_pdf_restrictions(email, file_path, pages_to_split_count, total_p
     Returns:
         Dict with error and show_upgrade if restrictions are violated, None otherwise
     """
-    user = get_user(email)
+    user = get_request_user(email)
 
     # Premium users have no restrictions
     if user["is_premium_"]:
@@ -311,7 +384,7 @@ def check_premium_only_feature(email, file_paths):
     Returns:
         Dict with error and show_upgrade if user is not premium, None otherwise
     """
-    user = get_user(email)
+    user = get_request_user(email)
     
     # Premium users have no restrictions
     if user["is_premium_"]:
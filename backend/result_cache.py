@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from pdf_inspect import file_sha256
+
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pdfville_result_cache'))
+RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', '1024'))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', str(24 * 3600)))
+
+
+class DiskCache:
+    """
+    Size-bounded, TTL-limited file cache on local disk.
+
+    Each entry is a single file named after its key. The file's mtime records when
+    the entry was written (TTL) and its atime is bumped on every hit (LRU), so the
+    filesystem is the only index and several gunicorn workers can share a directory.
+    """
+
+    def __init__(self, directory, max_bytes, ttl):
+        """
+        Args:
+            directory: Cache root (created if missing)
+            max_bytes: Total size budget; least recently used entries are evicted beyond it
+            ttl: Maximum age of an entry in seconds
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._approx_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return the path of the cached file for key, or None on miss/expiry"""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        if now - stat.st_mtime > self.ttl:
+            self._remove(path, stat.st_size)
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key, src_path):
+        """Copy src_path into the cache under key and return the cached path"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as dst, open(src_path, 'rb') as src:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return self._commit(tmp_path, path)
+
+    def put_bytes(self, key, data):
+        """Store raw bytes under key and return the cached path"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as dst:
+            dst.write(data)
+        return self._commit(tmp_path, path)
+
+    def _commit(self, tmp_path, path):
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+        self._evict_if_needed()
+        return path
+
+    def _remove(self, path, size):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes -= size
+
+    def _scan(self):
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                full = os.path.join(root, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((st.st_atime, st.st_mtime, st.st_size, full))
+        return entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._approx_bytes is not None and self._approx_bytes <= self.max_bytes:
+                return
+        # Another worker may share the directory, so recount from disk before evicting
+        entries = self._scan()
+        now = time.time()
+        total = sum(e[2] for e in entries)
+        for atime, mtime, size, full in sorted(entries):
+            if total <= self.max_bytes and now - mtime <= self.ttl:
+                continue
+            self._remove(full, 0)
+            total -= size
+        with self._lock:
+            self._approx_bytes = total
+
+    def stats(self):
+        """Hit/miss counters and current footprint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "bytes": self._approx_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = DiskCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB * 1024 * 1024, RESULT_CACHE_TTL)
+
+
+def make_key(operation, inputs, params=None):
+    """
+    Content address for a tool result.
+
+    Args:
+        operation: Name of the tool, e.g. "compress_pdf"
+        inputs: Ordered list of input file paths or raw bytes
+        params: Options that affect the output; encoded as canonical JSON
+
+    Returns:
+        Hex SHA-256 key
+    """
+    sha = hashlib.sha256()
+    sha.update(operation.encode('utf-8'))
+    for item in inputs:
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            digest = hashlib.sha256(item).hexdigest()
+        else:
+            digest = file_sha256(item)
+        sha.update(b'\0' + digest.encode('ascii'))
+    canonical = json.dumps(params or {}, sort_keys=True, separators=(',', ':'), default=str)
+    sha.update(b'\0' + canonical.encode('utf-8'))
+    return sha.hexdigest()
+
+
+def get(key):
+    """Path of the cached result for key, or None"""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    return _cache.get(key)
+
+
+def put(key, src_path):
+    """Store the file at src_path as the result for key. Failures are logged, not raised."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    try:
+        return _cache.put(key, src_path)
+    except OSError as e:
+        print(f"Warning: could not store result in cache: {e}")
+        return None
+
+
+def put_bytes(key, data):
+    """Store raw bytes as the result for key. Failures are logged, not raised."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    try:
+        return _cache.put_bytes(key, data)
+    except OSError as e:
+        print(f"Warning: could not store result in cache: {e}")
+        return None
+
+
+def stats():
+    """Counters for the /metrics endpoint"""
+    data = _cache.stats()
+    data["enabled"] = RESULT_CACHE_ENABLED
+    return data
@@ -1,11 +1,13 @@
 import os
-import PyPDF2
 import tempfile
 import zipfile
 from io import BytesIO
 from flask import request, jsonify, send_file
 import re
-from restrictions import check_restrictions, get_user
+from restrictions import check_restrictions
+import result_cache
+from pdf_inspect import inspect_pdf
+from page_structure import rotate_pages
 
 def parse_page_ranges(page_ranges, total_pages):
     """
@@ -51,35 +53,26 @@ def parse_page_ranges(page_ranges, total_pages):
 def rotate_single_pdf(input_pdf_path, output_pdf_path, pages_to_rotate, rotation_angle):
     """
     Rotate specific pages in a single PDF file
+
+    Only /Rotate of the targeted pages changes; those page dictionaries are
+    appended to the original file as an incremental update instead of copying
+    every page through a new writer.
     """
     try:
-        with open(input_pdf_path, 'rb') as input_file:
-            reader = PyPDF2.PdfReader(input_file)
-            writer = PyPDF2.PdfWriter()
-            
-            total_pages = len(reader.pages)
-            
-            # Parse page ranges
-            if pages_to_rotate == "all":
-                pages_list = list(range(total_pages))
-            else:
-                pages_list = parse_page_ranges(pages_to_rotate, total_pages)
-            
-            # Process each page
-            for page_num in range(total_pages):
-                page = reader.pages[page_num]
-                
-                # Rotate page if it's in the list
-                if page_num in pages_list:
-                    page = page.rotate(int(rotation_angle))
-                
-                writer.add_page(page)
-            
-            # Write the output PDF
-            with open(output_pdf_path, 'wb') as output_file:
-                writer.write(output_file)
+        total_pages = inspect_pdf(input_pdf_path)["page_count"]
+        
+        # Parse page ranges
+        if pages_to_rotate == "all":
+            pages_list = list(range(total_pages))
+        else:
+            pages_list = parse_page_ranges(pages_to_rotate, total_pages)
+        
+        mode = rotate_pages(
+            input_pdf_path, output_pdf_path,
+            {page_num: int(rotation_angle) for page_num in pages_list}
+        )
                 
-        return True, "Successfully rotated pages in PDF"
+        return True, f"Successfully rotated pages in PDF ({mode})"
         
     except Exception as e:
         return False, f"Error rotating PDF: {str(e)}"
@@ -126,12 +119,14 @@ def rotate_pdf_pages():
         with tempfile.TemporaryDirectory() as temp_dir:
             # Save files temporarily for restriction checking
             temp_file_paths = []
+            saved_files = []
             for file_index, file in enumerate(files):
                 if not file.filename.lower().endswith('.pdf'):
                     continue
                 temp_path = os.path.join(temp_dir, f"temp_{file_index}_{file.filename}")
                 file.save(temp_path)
                 temp_file_paths.append(temp_path)
+                saved_files.append((file_index, file, temp_path))
             
             # Check restrictions
             restriction_error = check_restrictions(email, temp_file_paths)
@@ -143,15 +138,11 @@ def rotate_pdf_pages():
             
             processed_files = []
             
-            for file_index, file in enumerate(files):
-                if not file.filename.lower().endswith('.pdf'):
-                    continue
-                
+            for file_index, file, input_path in saved_files:
                 print(f"Processing file {file_index + 1}/{len(files)}: {file.filename}")
                 
-                # Save uploaded file
-                input_path = os.path.join(temp_dir, f"input_{file_index}_{file.filename}")
-                file.save(input_path)
+                # The upload stream was consumed when saving for the restriction check,
+                # so rotate the copy saved above
                 
                 # Create output path
                 base_name = os.path.splitext(file.filename)[0]
@@ -161,13 +152,23 @@ def rotate_pdf_pages():
                 # Determine pages to rotate
                 pages_param = pages_to_rotate if rotation_type == 'specific' else 'all'
                 
-                # Rotate pages
-                success, message = rotate_single_pdf(
-                    input_path, 
-                    output_path, 
-                    pages_param,
-                    rotation_angle
-                )
+                cache_key = result_cache.make_key("rotate_pdf_pages", [input_path], {
+                    "pages": pages_param, "angle": rotation_angle
+                })
+                cached_path = result_cache.get(cache_key)
+                if cached_path is not None:
+                    output_path = cached_path
+                    success, message = True, "Served from result cache"
+                else:
+                    # Rotate pages
+                    success, message = rotate_single_pdf(
+                        input_path, 
+                        output_path, 
+                        pages_param,
+                        rotation_angle
+                    )
+                    if success:
+                        result_cache.put(cache_key, output_path)
                 
                 if success and os.path.exists(output_path):
                     processed_files.append({
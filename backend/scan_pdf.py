@@ -1,16 +1,22 @@
 import os
 import io
-import tempfile
+import json
+import shutil
 import logging
 import traceback
-import zipfile
 from flask import request, jsonify, send_file
 from werkzeug.utils import secure_filename
-from PIL import Image
 from io import BytesIO
-import pytesseract
-from pdf2image import convert_from_bytes
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from restrictions import check_restrictions, check_scan_pdf_restrictions
+import result_cache
+from jobs import report_progress
+from ocr_engine import OCR_FILE_WORKERS, PAGE_OCR, make_searchable_pdf, page_method_headers
+import page_text_cache
+from upload_ingest import upload_path
+from utils import create_temp_dir
+from zip_stream import zip_response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,34 +25,92 @@ logger = logging.getLogger(__name__)
 # Configure pytesseract path if needed (uncomment and modify if necessary)
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-def scan_pdf_to_text(pdf_bytes, dpi=300, language='eng'):
+def scan_pdf_to_text(pdf_path, dpi=300, language='eng', force_ocr=False):
     """
-    Convert PDF to text using OCR
+    Convert PDF to text, using OCR only on pages without a usable text layer
+
+    Returns:
+        (full_text, page_methods, error): page_methods lists "text" or "ocr" per page
     """
     try:
-        # Convert PDF to images
-        logger.info("Converting PDF to images")
-        images = convert_from_bytes(pdf_bytes, dpi=dpi)
-        
-        # Process each page with OCR
-        logger.info(f"Processing {len(images)} pages with OCR")
-        text_results = []
-        
-        for i, image in enumerate(images):
-            logger.info(f"Processing page {i+1}")
-            # Use pytesseract to extract text
-            text = pytesseract.image_to_string(image, lang=language)
-            text_results.append(text)
+        # Scanned pages are rendered lazily and recognized in parallel by the OCR engine
+        logger.info(f"Extracting text from {pdf_path}")
+        # Cached by content, so a file already OCR'd here or by the summarize tools is not OCR'd again
+        text_results, methods = page_text_cache.ocr_pages(
+            pdf_path, dpi, language, force_ocr=force_ocr,
+            on_page=lambda done, total: report_progress(done, total, f"Page {done}/{total}"),
+        )
+        logger.info(f"{methods.count(PAGE_OCR)} of {len(methods)} pages needed OCR")
         
         # Combine all text
         full_text = "\n\n--- Page Break ---\n\n".join(text_results)
-        return full_text, None
+        return full_text, methods, None
     
+    except Exception as e:
+        logger.error(f"Error in OCR processing: {str(e)}")
+        traceback.print_exc()
+        return None, None, str(e)
+
+def scan_pdf_to_searchable_pdf(pdf_path, output_path, dpi=300, language='eng', force_ocr=False):
+    """
+    Add an invisible OCR text layer to the scanned pages of a PDF
+
+    Returns:
+        (page_methods, error)
+    """
+    try:
+        logger.info(f"Making searchable PDF from {pdf_path}")
+        methods = make_searchable_pdf(
+            pdf_path, output_path, dpi, language, force_ocr=force_ocr,
+            on_page=lambda done, total: report_progress(done, total, f"OCR page {done}/{total}"),
+        )
+        logger.info(f"{methods.count(PAGE_OCR)} of {len(methods)} pages needed OCR")
+        return methods, None
+
     except Exception as e:
         logger.error(f"Error in OCR processing: {str(e)}")
         traceback.print_exc()
         return None, str(e)
 
+def _scan_file(filename, pdf_path, dpi, language, force_ocr, output_format, temp_dir):
+    """
+    OCR one uploaded PDF into a text file or searchable PDF in temp_dir.
+
+    Returns:
+        (output_path, output_filename, page_methods)
+
+    Raises:
+        RuntimeError: If OCR failed
+    """
+    base_name = os.path.splitext(secure_filename(filename))[0]
+    output_filename = f"scanned_{base_name}.{output_format}"
+    output_path = os.path.join(temp_dir, output_filename)
+
+    # OCR output depends only on the document, DPI, language, OCR mode and format
+    params = {"dpi": dpi, "language": language, "force_ocr": force_ocr, "output_format": output_format}
+    cache_key = result_cache.make_key("scan_pdf", [pdf_path], params)
+    methods_key = result_cache.make_key("scan_pdf_methods", [pdf_path], params)
+    cached_path = result_cache.get(cache_key)
+    cached_methods = result_cache.get(methods_key)
+    if cached_path is not None and cached_methods is not None:
+        with open(cached_methods, 'r', encoding='utf-8') as cached:
+            methods = json.load(cached)
+        shutil.copyfile(cached_path, output_path)
+        return output_path, output_filename, methods
+
+    if output_format == 'pdf':
+        methods, error = scan_pdf_to_searchable_pdf(pdf_path, output_path, dpi, language, force_ocr)
+    else:
+        text_content, methods, error = scan_pdf_to_text(pdf_path, dpi, language, force_ocr)
+        if not error:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(text_content)
+    if error:
+        raise RuntimeError(error)
+    result_cache.put(cache_key, output_path)
+    result_cache.put_bytes(methods_key, json.dumps(methods).encode('utf-8'))
+    return output_path, output_filename, methods
+
 def scan_pdf():
     """
     Route handler for PDF scanning
@@ -64,116 +128,104 @@ def scan_pdf():
         logger.error("No files selected")
         return jsonify({"error": "No files selected"}), 400
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Save files to temporary directory for restriction checks
-        temp_file_paths = []
-        for file in files:
-            temp_path = os.path.join(temp_dir, file.filename)
-            file.save(temp_path)
-            temp_file_paths.append(temp_path)
-            file.seek(0)  # Reset file pointer for later use
+    # Uploads are already spooled to disk; restriction checks read them in place
+    temp_file_paths = [upload_path(file) for file in files]
+    
+    # Apply general restrictions check
+    restriction = check_restrictions(email, temp_file_paths)
+    if restriction:
+        logger.warning(f"Restriction failed: {restriction}")
+        return jsonify({"error": restriction}), 403
         
-        # Apply general restrictions check
-        restriction = check_restrictions(email, temp_file_paths)
-        if restriction:
-            logger.warning(f"Restriction failed: {restriction}")
-            return jsonify({"error": restriction}), 403
-            
-        # Apply premium-only feature check
-        premium_restriction = check_scan_pdf_restrictions(email, temp_file_paths)
-        if premium_restriction:
-            logger.warning(f"Premium restriction failed: {premium_restriction}")
-            return jsonify(premium_restriction), 403
-            temp_path = os.path.join(temp_dir, file.filename)
-            file.seek(0)
-            file.save(temp_path)
-            temp_file_paths.append(temp_path)
-
-        # Apply premium restrictions check
-        restriction_result = check_scan_pdf_restrictions(email, temp_file_paths)
-        if restriction_result:
-            return jsonify(restriction_result), 403
+    # Apply premium-only feature check
+    premium_restriction = check_scan_pdf_restrictions(email, temp_file_paths)
+    if premium_restriction:
+        logger.warning(f"Premium restriction failed: {premium_restriction}")
+        return jsonify(premium_restriction), 403
 
     # Get parameters
     language = request.form.get('language', 'eng')
     dpi = int(request.form.get('dpi', 300))
+    # txt: extracted text; pdf: the original PDF with an invisible OCR text layer
     output_format = request.form.get('output_format', 'txt')
+    if output_format not in ('txt', 'pdf'):
+        return jsonify({"error": "output_format must be 'txt' or 'pdf'"}), 400
+    # auto: OCR only pages without a usable text layer; force: OCR every page
+    force_ocr = request.form.get('ocr_mode', 'auto') == 'force'
     
-    logger.info(f"Processing with language: {language}, DPI: {dpi}, Output format: {output_format}")
+    logger.info(f"Processing with language: {language}, DPI: {dpi}, Output format: {output_format}, "
+                f"OCR mode: {'force' if force_ocr else 'auto'}")
     
-    # Create temporary directory for processing
-    with tempfile.TemporaryDirectory() as temp_dir:
-        processed_files = []
-        failed_files = []
-
-        # Process each PDF
-        for i, file in enumerate(files):
-            if not file.filename.lower().endswith('.pdf'):
-                logger.warning(f"Skipping non-PDF file: {file.filename}")
-                continue
+    # Outputs live in the request workspace until the response has been streamed
+    temp_dir = create_temp_dir()
+    processed_files = []
+    failed_files = []
 
-            logger.info(f"Processing file {i+1}/{len(files)}: {file.filename}")
+    pdfs = []
+    for file, pdf_path in zip(files, temp_file_paths):
+        if not file.filename.lower().endswith('.pdf'):
+            logger.warning(f"Skipping non-PDF file: {file.filename}")
+            continue
+        pdfs.append((file.filename, pdf_path))
 
+    # Files are OCR'd side by side; their pages share the OCR worker pool, so
+    # one file's rasterization overlaps another's recognition. A single file
+    # runs on this thread so its per-page progress reaches the job.
+    executor = None
+    if len(pdfs) > 1:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(OCR_FILE_WORKERS, len(pdfs))))
+        outcomes = [
+            (filename, executor.submit(
+                _scan_file, filename, pdf_path, dpi, language, force_ocr, output_format, temp_dir
+            ).result)
+            for filename, pdf_path in pdfs
+        ]
+    else:
+        outcomes = [
+            (filename, partial(_scan_file, filename, pdf_path, dpi, language, force_ocr, output_format, temp_dir))
+            for filename, pdf_path in pdfs
+        ]
+    try:
+        for i, (filename, outcome) in enumerate(outcomes):
+            logger.info(f"Processing file {i+1}/{len(outcomes)}: {filename}")
             try:
-                # Read the PDF file
-                file.seek(0)
-                pdf_bytes = file.read()
-
-                # Perform OCR
-                text_content, error = scan_pdf_to_text(pdf_bytes, dpi, language)
-                
-                if error:
-                    logger.error(f"OCR failed for {file.filename}: {error}")
-                    failed_files.append((file.filename, error))
-                    continue
-                
-                # Save the output
-                base_name = os.path.splitext(secure_filename(file.filename))[0]
-                output_filename = f"scanned_{base_name}.txt"
-                output_path = os.path.join(temp_dir, output_filename)
-                
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(text_content)
-                
-                processed_files.append((output_path, output_filename))
-                logger.info(f"Successfully processed: {file.filename}")
-                
+                processed_files.append(outcome())
+                logger.info(f"Successfully processed: {filename}")
             except Exception as e:
-                logger.error(f"Error processing {file.filename}: {str(e)}")
-                traceback.print_exc()
-                failed_files.append((file.filename, str(e)))
-        
-        # Handle results
-        if not processed_files:
-            if failed_files:
-                error_messages = "; ".join([f"{name}: {error}" for name, error in failed_files])
-                return jsonify({"error": f"Failed to process files: {error_messages}"}), 500
-            else:
-                return jsonify({"error": "No PDF files were processed"}), 400
-        
-        # Return single file or create zip
-        if len(processed_files) == 1:
-            # Read the file into memory before sending to avoid file lock issues
-            with open(processed_files[0][0], 'rb') as f:
-                file_data = BytesIO(f.read())
-            
-            return send_file(
-                file_data,
-                as_attachment=True,
-                download_name=processed_files[0][1],
-                mimetype='text/plain'
-            )
+                logger.error(f"Error processing {filename}: {str(e)}")
+                failed_files.append((filename, str(e)))
+            if executor is not None:
+                report_progress(i + 1, len(outcomes), f"Scanned file {i+1}/{len(outcomes)}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    # Handle results
+    if not processed_files:
+        if failed_files:
+            error_messages = "; ".join([f"{name}: {error}" for name, error in failed_files])
+            return jsonify({"error": f"Failed to process files: {error_messages}"}), 500
         else:
-            # Create zip file for multiple PDFs
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for file_path, file_name in processed_files:
-                    zip_file.write(file_path, file_name)
-            
-            zip_buffer.seek(0)
-            return send_file(
-                zip_buffer,
-                as_attachment=True,
-                download_name="scanned_pdfs.zip",
-                mimetype='application/zip'
-            )
\ No newline at end of file
+            return jsonify({"error": "No PDF files were processed"}), 400
+    
+    # Return single file or create zip
+    if len(processed_files) == 1:
+        # Read the file into memory before sending to avoid file lock issues
+        with open(processed_files[0][0], 'rb') as f:
+            file_data = BytesIO(f.read())
+        
+        response = send_file(
+            file_data,
+            as_attachment=True,
+            download_name=processed_files[0][1],
+            mimetype='application/pdf' if output_format == 'pdf' else 'text/plain'
+        )
+        response.headers.update(page_method_headers(processed_files[0][2]))
+        return response
+    else:
+        # Stream the zip of outputs instead of building it in memory
+        members = [(file_name, file_path) for file_path, file_name, _ in processed_files]
+        response = zip_response(members, "scanned_pdfs.zip")
+        all_methods = [method for _, _, methods in processed_files for method in methods]
+        response.headers['X-OCR-Pages'] = page_method_headers(all_methods)['X-OCR-Pages']
+        return response
\ No newline at end of file
@@ -3,7 +3,7 @@ import os
 import tempfile
 import logging
 import re
-import fitz  # PyMuPDF
+import page_text_cache
 from restrictions import check_restrictions
 
 logger = logging.getLogger(__name__)
@@ -13,16 +13,9 @@ def extract_text_per_page(pdf_path):
     """
     Extract plain text from each page of the PDF using PyMuPDF.
     Returns a list of strings where index is page number - 1.
+    Cached by file content (see page_text_cache), shared with the summarize tools.
     """
-    texts = []
-    with fitz.open(pdf_path) as doc:
-        for page in doc:
-            try:
-                texts.append(page.get_text("text") or "")
-            except Exception as e:
-                logger.error(f"Failed to extract text from page {page.number+1}: {e}")
-                texts.append("")
-    return texts
+    return page_text_cache.text_layer_pages(pdf_path)
 
 
 def find_matches(text, query, context_chars=120):
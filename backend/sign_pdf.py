@@ -1,10 +1,10 @@
 import os
-import tempfile
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.colors import black
 from io import BytesIO
+from utils import create_temp_dir
 
 def sign_pdf(input_file_path, signature_text, position_x, position_y, page_number):
     """
@@ -22,7 +22,7 @@ def sign_pdf(input_file_path, signature_text, position_x, position_y, page_numbe
     """
     try:
         # Create a temporary directory to store the output file
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = create_temp_dir()
         output_file_path = os.path.join(temp_dir, "signed_pdf.pdf")
         
         # Read the input PDF
@@ -0,0 +1,178 @@
+import os
+import re
+import shutil
+from collections import deque, namedtuple
+
+import fitz  # PyMuPDF, only used to read the outline
+import pikepdf
+from werkzeug.utils import secure_filename
+
+from process_pools import SharedProcessPool
+from utils import create_temp_dir
+
+# Worker processes used to write parts. 1 writes them in the request thread;
+# more only pays off for documents with many parts.
+SPLIT_WORKERS = int(os.environ.get("SPLIT_WORKERS", "1"))
+# Parts handed to a worker per task; each task opens the source once
+SPLIT_CHUNK = int(os.environ.get("SPLIT_CHUNK", "16"))
+
+# One output file: pages first..last (0-based, inclusive) saved as `name`
+SplitPart = namedtuple("SplitPart", "name first last")
+
+_split_pool = SharedProcessPool(SPLIT_WORKERS)
+
+
+def _range_name(first, last):
+    if first == last:
+        return f"page_{first + 1}.pdf"
+    return f"pages_{first + 1}-{last + 1}.pdf"
+
+
+def plan_pages(first, last):
+    """One part per page for pages first..last (0-based, inclusive)"""
+    return [SplitPart(_range_name(i, i), i, i) for i in range(first, last + 1)]
+
+
+def plan_ranges(spec, total_pages):
+    """
+    One part per range in a spec like "1-3, 5, 8-10" (1-based, inclusive).
+
+    Raises:
+        ValueError: If the spec is malformed, a range is out of bounds or a range is repeated
+    """
+    parts = []
+    for chunk in (c.strip() for c in (spec or "").split(",")):
+        if not chunk:
+            continue
+        match = re.fullmatch(r"(\d+)\s*(?:-\s*(\d+))?", chunk)
+        if not match:
+            raise ValueError(f"Invalid page range: {chunk}")
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        if start < 1 or end > total_pages:
+            raise ValueError(f"Page range out of bounds. PDF has {total_pages} pages.")
+        if start > end:
+            raise ValueError("Start page cannot be greater than end page.")
+        name = _range_name(start - 1, end - 1)
+        # Parts are named after their range, so a repeat would give two ZIP entries the same name
+        if any(part.name == name for part in parts):
+            raise ValueError(f"Page range {chunk} is listed more than once.")
+        parts.append(SplitPart(name, start - 1, end - 1))
+    if not parts:
+        raise ValueError("No page ranges provided.")
+    return parts
+
+
+def plan_every(n, total_pages):
+    """Consecutive parts of n pages each; the last one may be shorter"""
+    if n < 1:
+        raise ValueError("Pages per part must be at least 1.")
+    return [
+        SplitPart(_range_name(first, min(first + n, total_pages) - 1), first, min(first + n, total_pages) - 1)
+        for first in range(0, total_pages, n)
+    ]
+
+
+def plan_bookmarks(pdf_path, total_pages, level=1):
+    """
+    One part per bookmark at the given outline level.
+
+    Each part runs from the bookmark's page to the page before the next one.
+    Pages before the first bookmark are kept with the first part, and bookmarks
+    that point at the same page as the previous one are merged into it.
+
+    Raises:
+        ValueError: If the document has no bookmarks at that level
+    """
+    with fitz.open(pdf_path) as doc:
+        toc = doc.get_toc(simple=True)
+    starts = []
+    for entry_level, title, page in toc:
+        if entry_level != level or not 1 <= page <= total_pages:
+            continue
+        if starts and page - 1 <= starts[-1][1]:
+            continue
+        starts.append((title, page - 1))
+    if not starts:
+        raise ValueError(f"The PDF has no level {level} bookmarks to split by.")
+
+    parts = []
+    for index, (title, first) in enumerate(starts):
+        first = 0 if index == 0 else first
+        last = starts[index + 1][1] - 1 if index + 1 < len(starts) else total_pages - 1
+        stem = secure_filename(title) or "section"
+        parts.append(SplitPart(f"{index + 1:02d}_{stem}.pdf", first, last))
+    return parts
+
+
+def _write_parts(pdf_path, parts, output_dir):
+    """
+    Write parts from one opened source; returns their paths in order.
+
+    qpdf copies a page's object graph (fonts, images, forms) into the part the
+    first time something references it and reuses that copy for every later
+    page of the same part, so shared resources appear once per part. Resources
+    a part never draws are dropped before saving.
+    """
+    paths = []
+    with pikepdf.open(pdf_path) as src:
+        for part in parts:
+            with pikepdf.new() as out:
+                out.pages.extend(src.pages[part.first:part.last + 1])
+                out.remove_unreferenced_resources()
+                path = os.path.join(output_dir, f"part_{len(paths):06d}.pdf")
+                out.save(path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+            paths.append(path)
+    return paths
+
+
+def iter_split_parts(pdf_path, parts, workers=None, chunk=None, executor=None):
+    """
+    Write the planned parts and yield them in order.
+
+    With workers > 1, chunks of parts are written by a shared process pool, at
+    most 2 * workers chunks ahead of the consumer. Like rasterize, each file is
+    deleted as soon as the caller asks for the next part.
+
+    Args:
+        pdf_path: Source PDF
+        parts: List of SplitPart from one of the plan_* helpers
+        workers: Parallel writers (default SPLIT_WORKERS); 1 writes in the calling thread
+        chunk: Parts per task (default SPLIT_CHUNK)
+        executor: Process pool to use instead of the shared one
+
+    Yields:
+        (part_name, part_path)
+    """
+    workers = max(1, workers or SPLIT_WORKERS)
+    chunk = max(1, chunk or SPLIT_CHUNK)
+    output_dir = create_temp_dir()
+    pool = (executor or _split_pool.get()) if workers > 1 and len(parts) > chunk else None
+    pending = deque(enumerate(parts[i:i + chunk] for i in range(0, len(parts), chunk)))
+    in_flight = deque()
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < (workers * 2 if pool else 1):
+                index, batch = pending.popleft()
+                chunk_dir = os.path.join(output_dir, f"c{index:06d}")
+                os.mkdir(chunk_dir)
+                if pool:
+                    result = pool.submit(_write_parts, pdf_path, batch, chunk_dir)
+                else:
+                    result = lambda batch=batch, chunk_dir=chunk_dir: _write_parts(pdf_path, batch, chunk_dir)
+                in_flight.append((batch, result))
+            batch, result = in_flight.popleft()
+            paths = result.result() if pool else result()
+            for part, path in zip(batch, paths):
+                try:
+                    yield part.name, path
+                finally:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+    finally:
+        for _, result in in_flight:
+            if pool:
+                result.cancel()
+        shutil.rmtree(output_dir, ignore_errors=True)
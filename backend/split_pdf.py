@@ -1,14 +1,23 @@
-from restrictions import check_split_pdf_restrictions, get_user
+from restrictions import check_split_pdf_restrictions, get_request_user
 from flask import jsonify, send_file, request
-from PyPDF2 import PdfReader, PdfWriter
-import zipfile
 import os
 import traceback
 from utils import create_temp_file, create_temp_dir
+from pdf_inspect import inspect_pdf
+import result_cache
+from split_engine import iter_split_parts, plan_bookmarks, plan_every, plan_pages, plan_ranges
+from zip_stream import zip_response
+
+
+def _form_int(name, default=None):
+    try:
+        return int(request.form.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid page numbers. Please provide valid integers.")
 
 
 def split_pdf():
-    """Split PDF into individual pages or a range of pages"""
+    """Split PDF into single pages, page ranges, every N pages or by bookmark"""
     try:
         # Get the uploaded file
         uploaded_file = request.files.get("file") or (
@@ -22,38 +31,32 @@ def split_pdf():
         file_path = os.path.join(temp_dir, uploaded_file.filename)
         uploaded_file.save(file_path)
 
-        # Check restrictions specific to split_pdf
-        email = request.form.get("email")
-        restriction = check_split_pdf_restrictions(email, [file_path])
-        if restriction:
-            # Clean up temp files
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
-            # Handle new error format with upgrade button
-            if isinstance(restriction, dict):
-                return jsonify(restriction), 403
-            else:
-                # Backward compatibility for string errors
-                return jsonify({"error": restriction}), 403
-                
         # Get user status for premium features
-        user = get_user(email)
+        email = request.form.get("email")
+        user = get_request_user(email)
         is_premium = user["is_premium_"]
         
-        # Read PDF to determine pages and validate ranges
-        reader = PdfReader(file_path)
-        total_pages = len(reader.pages)
+        # Page count comes from the page tree; the restriction check below reuses it
+        total_pages = inspect_pdf(file_path)["page_count"]
 
-        # Get split range
+        # Work out the output parts
+        split_mode = request.form.get("split_mode", "pages")
         start_page = request.form.get("start_page")
         end_page = request.form.get("end_page")
-
-        if start_page and end_page:
-            try:
-                start_idx = int(start_page) - 1
-                end_idx = int(end_page) - 1
+        download_name = "split_pages.zip"
+
+        try:
+            if split_mode == "ranges":
+                parts = plan_ranges(request.form.get("ranges"), total_pages)
+            elif split_mode == "every":
+                parts = plan_every(_form_int("every_n", "1"), total_pages)
+            elif split_mode == "bookmarks":
+                parts = plan_bookmarks(file_path, total_pages, _form_int("bookmark_level", "1"))
+            elif split_mode != "pages":
+                return jsonify({"error": f"Unknown split mode: {split_mode}"}), 400
+            elif start_page and end_page:
+                start_idx = _form_int("start_page") - 1
+                end_idx = _form_int("end_page") - 1
 
                 if start_idx < 0 or end_idx >= total_pages:
                     return jsonify({
@@ -63,40 +66,34 @@ def split_pdf():
                 if start_idx > end_idx:
                     return jsonify({"error": "Start page cannot be greater than end page."}), 400
 
-                pages_to_split = range(start_idx, end_idx + 1)
-                split_type = "range"
-
-            except ValueError:
-                return jsonify({"error": "Invalid page numbers. Please provide valid integers."}), 400
-        else:
-            pages_to_split = range(total_pages)
-            split_type = "all"
+                parts = plan_pages(start_idx, end_idx)
+                download_name = f"split_pages_{start_page}-{end_page}.zip"
+            else:
+                parts = plan_pages(0, total_pages - 1)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         # Apply split-specific restrictions after determining requested output pages
         email = request.form.get("email", "free@example.com")  # default demo email
-        pages_to_split_count = len(list(pages_to_split))
+        pages_to_split_count = sum(part.last - part.first + 1 for part in parts)
         restriction = check_split_pdf_restrictions(email, file_path, pages_to_split_count, total_pages)
         if restriction:
             return jsonify(restriction), 403
 
-        pdf_paths = []
-        for i in pages_to_split:
-            writer = PdfWriter()
-            writer.add_page(reader.pages[i])
-            part_path = os.path.join(temp_dir, f"page_{i+1}.pdf")
-            with open(part_path, "wb") as out_f:
-                writer.write(out_f)
-            pdf_paths.append(part_path)
+        cache_key = result_cache.make_key("split_pdf", [file_path], {
+            "parts": [list(part) for part in parts]
+        })
 
-        # Create zip
-        zip_path = create_temp_file(".zip")
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for p in pdf_paths:
-                zipf.write(p, os.path.basename(p))
+        cached_zip = result_cache.get(cache_key)
+        if cached_zip is not None:
+            return send_file(cached_zip, as_attachment=True, download_name=download_name)
 
-        download_name = f"split_pages_{start_page}-{end_page}.zip" if split_type == "range" else "split_pages.zip"
-
-        return send_file(zip_path, as_attachment=True, download_name=download_name)
+        # Parts are written as the zip stream asks for them, keeping a copy for the result cache
+        zip_path = create_temp_file(".zip")
+        return zip_response(
+            iter_split_parts(file_path, parts), download_name, tee_path=zip_path,
+            on_complete=lambda: result_cache.put(cache_key, zip_path)
+        )
 
     except Exception as e:
         print(f"Error in split_pdf: {str(e)}")
@@ -1,4 +1,4 @@
-import os, io, tempfile, zipfile
+import io, tempfile, time, zipfile
 from flask import request, jsonify, send_file
 from werkzeug.utils import secure_filename
 from PyPDF2 import PdfReader, PdfWriter
@@ -7,28 +7,23 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.units import inch
-import fitz  # PyMuPDF
-from pdf2image import convert_from_bytes
-import pytesseract
+import page_text_cache
+import model_registry
+import model_server
+from jobs import report_progress
+from summary_engine import map_reduce_summarize
 from restrictions import check_summarize_pdf_restrictions, check_premium_only_feature
+from upload_ingest import upload_path
 
 # --- Core helpers ---
 
-def _extract_pages_text(pdf_bytes):
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    pages = []
-    for i in range(len(doc)):
-        t = doc.load_page(i).get_text("text")
-        pages.append(t or "")
-    doc.close()
-    return pages
+def _extract_pages_text(pdf_path):
+    # Cached by content, so preview and download of the same file read it once
+    return page_text_cache.text_layer_pages(pdf_path)
 
-def _ocr_pages_text(pdf_bytes, dpi=300, language='eng'):
-    images = convert_from_bytes(pdf_bytes, dpi=dpi)
-    pages = []
-    for img in images:
-        pages.append(pytesseract.image_to_string(img, lang=language))
-    return pages
+def _ocr_pages_text(pdf_path, dpi=300, language='eng'):
+    # Pages that do have a usable text layer keep it; only scanned pages are OCR'd (once per file)
+    return page_text_cache.ocr_pages(pdf_path, dpi, language)[0]
 
 def _summarize(text, max_sentences=8):
     # Simple frequency-based summarizer (no external models)
@@ -86,8 +81,8 @@ def _make_summary_page(summary_text, title="PDF Summary"):
     doc.build(story)
     return tmp
 
-def _append_summary(original_bytes, summary_pdf_path):
-    in_reader = PdfReader(io.BytesIO(original_bytes))
+def _append_summary(original_path, summary_pdf_path):
+    in_reader = PdfReader(original_path)
     sum_reader = PdfReader(summary_pdf_path)
     writer = PdfWriter()
     for p in in_reader.pages:
@@ -107,23 +102,18 @@ def setup_summarize_pdf_routes(app):
         if 'file' not in request.files:
             return jsonify({"error":"No file uploaded"}), 400
         f = request.files['file']
-        filename = secure_filename(f.filename or 'document.pdf')
         email = request.form.get('email','')
         query = request.form.get('query','')
         enable_ocr = request.form.get('enable_ocr','auto')  # auto|on|off
 
-        # temp save for restrictions
-        with tempfile.TemporaryDirectory() as td:
-            p = os.path.join(td, filename)
-            f.save(p)
-            f.seek(0)
-            r = check_summarize_pdf_restrictions(email, [p])
-            if r:
-                return jsonify({"error": r}), 403
-        pdf_bytes = f.read()
-        pages = _extract_pages_text(pdf_bytes)
+        # temp save for restrictions (the upload is already spooled to disk)
+        pdf_path = upload_path(f)
+        r = check_summarize_pdf_restrictions(email, [pdf_path])
+        if r:
+            return jsonify({"error": r}), 403
+        pages = _extract_pages_text(pdf_path)
         if sum(len(t) for t in pages) < 200 and enable_ocr in ('auto','on'):
-            pages = _ocr_pages_text(pdf_bytes)
+            pages = _ocr_pages_text(pdf_path)
         summary = _summarize("\n".join(pages))
         matches = _search_matches(pages, query)
         return jsonify({"summary": summary, "matches": matches, "pages": len(pages)})
@@ -138,18 +128,14 @@ def setup_summarize_pdf_routes(app):
         query = request.form.get('query','')
         enable_ocr = request.form.get('enable_ocr','auto')
 
-        # restrictions
-        with tempfile.TemporaryDirectory() as td:
-            p = os.path.join(td, filename)
-            f.save(p)
-            f.seek(0)
-            r = check_summarize_pdf_restrictions(email, [p])
-            if r:
-                return jsonify({"error": r}), 403
-        pdf_bytes = f.read()
-        pages = _extract_pages_text(pdf_bytes)
+        # restrictions (the upload is already spooled to disk)
+        pdf_path = upload_path(f)
+        r = check_summarize_pdf_restrictions(email, [pdf_path])
+        if r:
+            return jsonify({"error": r}), 403
+        pages = _extract_pages_text(pdf_path)
         if sum(len(t) for t in pages) < 200 and enable_ocr in ('auto','on'):
-            pages = _ocr_pages_text(pdf_bytes)
+            pages = _ocr_pages_text(pdf_path)
         # build summary text with optional search highlight count
         summary = _summarize("\n".join(pages))
         if query.strip():
@@ -158,7 +144,7 @@ def setup_summarize_pdf_routes(app):
             if total_hits:
                 summary = f"Search hits for '{query}': {total_hits}\n\n" + summary
         sum_pdf = _make_summary_page(summary)
-        out_buf = _append_summary(pdf_bytes, sum_pdf)
+        out_buf = _append_summary(pdf_path, sum_pdf)
         out_name = f"summarized_{filename}"
         return send_file(out_buf, as_attachment=True, download_name=out_name, mimetype='application/pdf')
 
@@ -168,26 +154,25 @@ def setup_summarize_pdf_routes(app):
         if 'file' not in request.files:
             return jsonify({"error":"No file uploaded"}), 400
         f = request.files['file']
-        filename = secure_filename(f.filename or 'document.pdf')
         email = request.form.get('email','')
         query = request.form.get('query','')
         enable_ocr = request.form.get('enable_ocr','auto')  # auto|on|off
 
-        # premium gating
-        with tempfile.TemporaryDirectory() as td:
-            p = os.path.join(td, filename)
-            f.save(p)
-            f.seek(0)
-            r = check_premium_only_feature(email, [p])
-            if r:
-                return jsonify(r), 403
-        pdf_bytes = f.read()
-        pages = _extract_pages_text(pdf_bytes)
+        # premium gating (the upload is already spooled to disk)
+        pdf_path = upload_path(f)
+        r = check_premium_only_feature(email, [pdf_path])
+        if r:
+            return jsonify(r), 403
+        try:
+            model_name = model_registry.registry.resolve(request.form.get('model'))
+        except model_registry.UnknownModelError as e:
+            return jsonify({"error": str(e)}), 400
+        pages = _extract_pages_text(pdf_path)
         if sum(len(t) for t in pages) < 200 and enable_ocr in ('auto','on'):
-            pages = _ocr_pages_text(pdf_bytes)
-        summary = _ai_summarize("\n".join(pages))
+            pages = _ocr_pages_text(pdf_path)
+        summary, timings = _ai_summarize("\n".join(pages), model_name)
         matches = _search_matches(pages, query)
-        return jsonify({"summary": summary, "matches": matches, "pages": len(pages), "ai": True})
+        return jsonify({"summary": summary, "matches": matches, "pages": len(pages), "ai": True, "timings": timings})
 
     @app.route('/api/pdf-summarize-ai', methods=['POST'])
     def pdf_summarize_ai_route():
@@ -199,69 +184,86 @@ def setup_summarize_pdf_routes(app):
         query = request.form.get('query','')
         enable_ocr = request.form.get('enable_ocr','auto')
 
-        # premium gating
-        with tempfile.TemporaryDirectory() as td:
-            p = os.path.join(td, filename)
-            f.save(p)
-            f.seek(0)
-            r = check_premium_only_feature(email, [p])
-            if r:
-                return jsonify(r), 403
-        pdf_bytes = f.read()
-        pages = _extract_pages_text(pdf_bytes)
+        # premium gating (the upload is already spooled to disk)
+        pdf_path = upload_path(f)
+        r = check_premium_only_feature(email, [pdf_path])
+        if r:
+            return jsonify(r), 403
+        try:
+            model_name = model_registry.registry.resolve(request.form.get('model'))
+        except model_registry.UnknownModelError as e:
+            return jsonify({"error": str(e)}), 400
+        pages = _extract_pages_text(pdf_path)
         if sum(len(t) for t in pages) < 200 and enable_ocr in ('auto','on'):
-            pages = _ocr_pages_text(pdf_bytes)
-        summary = _ai_summarize("\n".join(pages))
+            pages = _ocr_pages_text(pdf_path)
+        summary, timings = _ai_summarize("\n".join(pages), model_name)
         if query.strip():
             matches = _search_matches(pages, query)
             total_hits = sum(m['count'] for m in matches)
             if total_hits:
                 summary = f"Search hits for '{query}': {total_hits}\n\n" + summary
         sum_pdf = _make_summary_page(summary, title="PDF Summary (AI)")
-        out_buf = _append_summary(pdf_bytes, sum_pdf)
+        out_buf = _append_summary(pdf_path, sum_pdf)
         out_name = f"summarized_ai_{filename}"
-        return send_file(out_buf, as_attachment=True, download_name=out_name, mimetype='application/pdf')
+        response = send_file(out_buf, as_attachment=True, download_name=out_name, mimetype='application/pdf')
+        response.headers.update(_timing_headers(timings))
+        return response
 
 
 def _ai_summarize(text, model_name=None, min_length=64, max_length=256):
     """
     AI-based summarization using Hugging Face transformers.
-    Chunks long text to stay within model limits and concatenates summaries.
+    Covers the whole document with map-reduce summarization (see
+    summary_engine.map_reduce_summarize) and returns the final summaries as bullets.
+
+    With MODEL_SERVER enabled the work is sent to the shared model server,
+    which batches it with other workers' requests; if the server cannot be
+    reached the model is used in-process. In-process models come from the
+    per-process registry, so only the first request for one (or the warm-up
+    at boot) pays for loading.
+
+    Returns:
+        (summary, timings): timings has model, load_seconds (0 when the model
+        was already warm), inference_seconds, chunks, rounds and served_by
     """
+    timings = {"model": model_name, "load_seconds": 0.0, "inference_seconds": 0.0, "chunks": 0, "rounds": 0,
+               "served_by": "process"}
     try:
-        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
-        # Prefer a lighter model by default to reduce memory and load time
-        selected_model = model_name or "sshleifer/distilbart-cnn-12-6"
+        outputs = None
+        if model_server.MODEL_SERVER_ENABLED:
+            try:
+                reply = model_server.summarize(text, model_name, min_length=min_length, max_length=max_length)
+                outputs = reply["summaries"]
+                timings.update({key: reply[key] for key in ("model", "load_seconds", "inference_seconds",
+                                                            "chunks", "rounds")})
+                timings["served_by"] = "server"
+            except model_server.ModelServerUnavailable as e:
+                print(f"Model server unavailable, summarizing in-process: {str(e)}")
 
-        # Explicitly disable meta-device init and force CPU to avoid meta tensor errors
-        tokenizer = AutoTokenizer.from_pretrained(selected_model)
-        model = AutoModelForSeq2SeqLM.from_pretrained(
-            selected_model,
-            low_cpu_mem_usage=False  # avoid meta tensor init
-        )
-        summarizer = pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)  # CPU
+        if outputs is None:
+            loaded, timings["load_seconds"] = model_registry.registry.get(model_name)
+            timings["model"] = loaded.name
 
-        # Chunk text by approximate character count to avoid exceeding model limits
-        import re
-        sentences = [s.strip() for s in re.split(r'[\.!?]\s+', text) if s.strip()]
-        chunks = []
-        buf = []
-        cur_len = 0
-        for s in sentences:
-            buf.append(s)
-            cur_len += len(s)
-            if cur_len > 1500:  # heuristic chunk size
-                chunks.append(" ".join(buf))
-                buf = []
-                cur_len = 0
-        if buf:
-            chunks.append(" ".join(buf))
-        outputs = []
-        for ch in chunks[:8]:  # limit number of chunks for performance
-            out = summarizer(ch, min_length=min_length, max_length=max_length)
-            outputs.append(out[0]['summary_text'])
+            started = time.perf_counter()
+            outputs, stats = map_reduce_summarize(
+                text, loaded.summarizer, loaded.tokenizer, loaded.model,
+                min_length=min_length, max_length=max_length,
+                on_progress=lambda done, total: report_progress(done, total, f"Summarizing {done}/{total}"),
+            )
+            timings["inference_seconds"] = time.perf_counter() - started
+            timings.update(stats)
+        print(f"AI summary ({timings['model']}, {timings['served_by']}): load {timings['load_seconds']:.2f}s, "
+              f"inference {timings['inference_seconds']:.2f}s, {timings['chunks']} chunks, {timings['rounds']} rounds")
         if not outputs:
-            return "No textual content found."
-        return "\n".join("• " + o for o in outputs)
+            return "No textual content found.", timings
+        return "\n".join("• " + o for o in outputs), timings
     except Exception as e:
-        return f"AI summarization error: {str(e)}"
\ No newline at end of file
+        return f"AI summarization error: {str(e)}", timings
+
+
+def _timing_headers(timings):
+    return {
+        "X-Model-Load-Seconds": f"{timings['load_seconds']:.3f}",
+        "X-Inference-Seconds": f"{timings['inference_seconds']:.3f}",
+        "X-Summarized-By": timings["served_by"],
+    }
@@ -0,0 +1,139 @@
+import os
+import re
+
+# Chunks summarized per forward pass
+SUMMARY_BATCH_SIZE = int(os.environ.get('SUMMARY_BATCH_SIZE', '4'))
+# Upper bound on tokens per chunk; the model's own input limit applies if lower
+SUMMARY_CHUNK_TOKENS = int(os.environ.get('SUMMARY_CHUNK_TOKENS', '1024'))
+# Reduce rounds before giving up and returning what is left (each round shrinks the text several times)
+SUMMARY_MAX_ROUNDS = int(os.environ.get('SUMMARY_MAX_ROUNDS', '6'))
+
+_SENTENCE_END = re.compile(r'(?<=[\.!?])\s+')
+
+
+def model_input_limit(tokenizer, model=None):
+    """Tokens per chunk: SUMMARY_CHUNK_TOKENS capped by what the model accepts, minus room for special tokens"""
+    limits = [SUMMARY_CHUNK_TOKENS]
+    model_max = getattr(tokenizer, "model_max_length", None)
+    if isinstance(model_max, int) and 0 < model_max < 1_000_000:
+        limits.append(model_max)
+    positions = getattr(getattr(model, "config", None), "max_position_embeddings", None)
+    if isinstance(positions, int) and positions > 0:
+        limits.append(positions)
+    return max(16, min(limits) - 4)
+
+
+def pack_chunks(sentences, tokenizer, max_tokens):
+    """
+    Greedily pack sentences into chunks of at most max_tokens tokens.
+
+    Token counts come from the model's tokenizer, in one batched call, so
+    chunks fill the model's context instead of following a character-count
+    guess. A sentence longer than max_tokens is split into token windows.
+
+    Returns:
+        List of (chunk_text, token_count)
+    """
+    if not sentences:
+        return []
+    token_ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence, ids in zip(sentences, token_ids):
+        if len(ids) > max_tokens:
+            if current:
+                chunks.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            for start in range(0, len(ids), max_tokens):
+                window = ids[start:start + max_tokens]
+                chunks.append((tokenizer.decode(window, skip_special_tokens=True), len(window)))
+            continue
+        # +1 for the joining space, which may start a new token
+        if current and current_tokens + len(ids) + 1 > max_tokens:
+            chunks.append((" ".join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += len(ids) + (1 if current_tokens else 0)
+    if current:
+        chunks.append((" ".join(current), current_tokens))
+    return chunks
+
+
+def _summarize_chunks(summarizer, chunks, min_length, max_length, batch_size, on_batch=None):
+    """
+    Summarize chunks in batches of similar length; returns summaries in the original chunk order.
+
+    Sorting by length keeps padding within a batch small, and short chunks
+    (typically the tail of the document) get a lower min_length so the model
+    is not pushed to write more than the chunk holds.
+    """
+    order = sorted(range(len(chunks)), key=lambda i: chunks[i][1])
+    summaries = [None] * len(chunks)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        batch_min = max(1, min(min_length, chunks[batch[0]][1] // 2))
+        outputs = summarizer(
+            [chunks[i][0] for i in batch], batch_size=len(batch),
+            min_length=batch_min, max_length=max(max_length, batch_min + 1), truncation=True,
+        )
+        for i, output in zip(batch, outputs):
+            if isinstance(output, list):
+                output = output[0]
+            summaries[i] = output['summary_text'].strip()
+        if on_batch:
+            on_batch(len(batch))
+    return summaries
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def map_reduce_summarize(text, summarizer, tokenizer, model=None, min_length=64, max_length=256,
+                         batch_size=None, on_progress=None):
+    """
+    Summarize a document of any length.
+
+    Map: the whole text is packed into model-sized chunks by token count and
+    every chunk is summarized, in batches. Reduce: while the summaries do not
+    fit in a single model input, they are packed and summarized again.
+
+    Args:
+        text: Document text
+        summarizer: transformers summarization pipeline (or compatible callable)
+        tokenizer: The pipeline's tokenizer
+        model: The pipeline's model, for its input limit
+        batch_size: Chunks per forward pass (default SUMMARY_BATCH_SIZE)
+        on_progress: Optional callback(done, total) in chunks, per batch
+
+    Returns:
+        (summaries, stats): the final summaries in document order and
+        {"chunks": chunks in the map step, "rounds": passes over the model}
+    """
+    batch_size = max(1, batch_size or SUMMARY_BATCH_SIZE)
+    max_tokens = model_input_limit(tokenizer, model)
+    chunks = pack_chunks(split_sentences(text), tokenizer, max_tokens)
+    stats = {"chunks": len(chunks), "rounds": 0}
+    if not chunks:
+        return [], stats
+
+    # Progress total is an estimate: each reduce round works on a few times fewer chunks
+    total = len(chunks) + max(1, len(chunks) // 3)
+    done = 0
+
+    def on_batch(count):
+        nonlocal done
+        done += count
+        if on_progress:
+            on_progress(min(done, total - 1), total)
+
+    summaries = _summarize_chunks(summarizer, chunks, min_length, max_length, batch_size, on_batch)
+    stats["rounds"] = 1
+    while len(summaries) > 1 and stats["rounds"] < SUMMARY_MAX_ROUNDS:
+        packed = pack_chunks(summaries, tokenizer, max_tokens)
+        if len(packed) == 1 or len(packed) >= len(summaries):
+            # Everything fits in one input (or packing cannot shrink it any further)
+            break
+        summaries = _summarize_chunks(summarizer, packed, min_length, max_length, batch_size, on_batch)
+        stats["rounds"] += 1
+    return summaries, stats
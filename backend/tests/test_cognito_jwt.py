@@ -0,0 +1,100 @@
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from cognito_jwt import JWKSCache, TokenVerificationError, UnknownKeyError, verify_access_token
+
+REGION = "ap-southeast-2"
+POOL = "ap-southeast-2_TestPool"
+CLIENT_ID = "test-client"
+
+
+def make_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    public = {k: (v.decode() if isinstance(v, bytes) else v) for k, v in public.items()}
+    public.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return pem, public
+
+
+def make_token(pem, kid, **overrides):
+    now = int(time.time())
+    claims = {
+        "sub": "user-sub",
+        "username": "user@example.com",
+        "iss": f"https://cognito-idp.{REGION}.amazonaws.com/{POOL}",
+        "token_use": "access",
+        "client_id": CLIENT_ID,
+        "iat": now,
+        "exp": now + 600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+class Fetcher:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"keys": self.keys}
+
+
+def test_verifies_token_and_persists_jwks(tmp_path):
+    pem, public = make_key("k1")
+    fetcher = Fetcher(public)
+    cache_path = tmp_path / "jwks.json"
+    cache = JWKSCache(REGION, POOL, cache_path=str(cache_path), fetcher=fetcher)
+
+    claims = verify_access_token(make_token(pem, "k1"), cache, CLIENT_ID)
+    assert claims["username"] == "user@example.com"
+    assert fetcher.calls == 1
+
+    # A new process reads the key set from disk instead of the network
+    offline = Fetcher()
+    reloaded = JWKSCache(REGION, POOL, cache_path=str(cache_path), fetcher=offline)
+    verify_access_token(make_token(pem, "k1"), reloaded, CLIENT_ID)
+    assert offline.calls == 0
+    assert json.loads(cache_path.read_text())["keys"][0]["kid"] == "k1"
+
+
+def test_unknown_kid_triggers_one_refresh(tmp_path):
+    pem1, public1 = make_key("k1")
+    pem2, public2 = make_key("k2")
+    fetcher = Fetcher(public1)
+    cache = JWKSCache(REGION, POOL, cache_path=str(tmp_path / "jwks.json"), fetcher=fetcher, min_refresh_interval=0)
+    verify_access_token(make_token(pem1, "k1"), cache, CLIENT_ID)
+
+    # Pool rotated its keys
+    fetcher.keys.append(public2)
+    verify_access_token(make_token(pem2, "k2"), cache, CLIENT_ID)
+    assert fetcher.calls == 2
+
+    with pytest.raises(UnknownKeyError):
+        verify_access_token(make_token(pem2, "k3"), cache, CLIENT_ID)
+
+
+def test_rejects_bad_tokens(tmp_path):
+    pem, public = make_key("k1")
+    other_pem, _ = make_key("k1")
+    cache = JWKSCache(REGION, POOL, cache_path=str(tmp_path / "jwks.json"), fetcher=Fetcher(public))
+
+    with pytest.raises(TokenVerificationError):
+        verify_access_token(make_token(pem, "k1", exp=int(time.time()) - 10), cache, CLIENT_ID)
+    with pytest.raises(TokenVerificationError):
+        verify_access_token(make_token(other_pem, "k1"), cache, CLIENT_ID)
+    with pytest.raises(TokenVerificationError):
+        verify_access_token(make_token(pem, "k1", token_use="id"), cache, CLIENT_ID)
+    with pytest.raises(TokenVerificationError):
+        verify_access_token(make_token(pem, "k1", client_id="someone-else"), cache, CLIENT_ID)
+    with pytest.raises(TokenVerificationError):
+        verify_access_token("not-a-jwt", cache, CLIENT_ID)
@@ -0,0 +1,109 @@
+import io
+import time
+
+import pytest
+from flask import Flask, jsonify, request, send_file
+
+import jobs
+from jobs import InMemoryProgressStore, JobQueue, SQLiteProgressStore, report_progress
+
+
+def wait_for(store, task_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = store.get(task_id)
+        if record and record["status"] in ("done", "failed"):
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"job {task_id} did not finish")
+
+
+def make_app(store, tmp_path, **queue_kwargs):
+    app = Flask(__name__)
+    queue = JobQueue(store, results_dir=str(tmp_path / "jobs"), **queue_kwargs)
+
+    @app.route("/upper", methods=["POST"])
+    def upper():
+        data = request.files["file"].read()
+        for page in range(4):
+            report_progress(page + 1, 4)
+        return send_file(io.BytesIO(data.upper()), as_attachment=True, download_name="upper.txt",
+                         mimetype="text/plain")
+
+    @app.route("/fail", methods=["POST"])
+    def fail():
+        return jsonify({"error": "bad input"}), 400
+
+    jobs.init_app(app, queue, ["upper", "fail"],
+                  lambda task_id: (f"/progress/{task_id}", f"/jobs/{task_id}/download"))
+
+    @app.route("/jobs/<task_id>/download")
+    def download(task_id):
+        return jobs.download_response(store, task_id)
+
+    @app.route("/progress/<task_id>")
+    def progress(task_id):
+        return jobs.progress_response(store, task_id)
+
+    return app, queue
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_async_request_runs_in_background(tmp_path, kind):
+    store = InMemoryProgressStore() if kind == "memory" else SQLiteProgressStore(str(tmp_path / "jobs.db"))
+    app, queue = make_app(store, tmp_path)
+    client = app.test_client()
+
+    response = client.post("/upper", data={"file": (io.BytesIO(b"hello"), "a.txt"), "async": "true"})
+    assert response.status_code == 202
+    task_id = response.get_json()["task_id"]
+
+    record = wait_for(store, task_id)
+    assert record["status"] == "done"
+    assert record["progress"] == 100
+    assert "result_path" not in client.get(f"/progress/{task_id}").get_json()
+
+    download = client.get(f"/jobs/{task_id}/download")
+    assert download.data == b"HELLO"
+    assert "upper.txt" in download.headers["Content-Disposition"]
+    assert queue.pending() == 0
+
+
+def test_sync_requests_are_untouched(tmp_path):
+    app, _ = make_app(InMemoryProgressStore(), tmp_path)
+    response = app.test_client().post("/upper", data={"file": (io.BytesIO(b"abc"), "a.txt")})
+    assert response.status_code == 200
+    assert response.data == b"ABC"
+
+
+def test_failed_job_reports_error(tmp_path):
+    store = InMemoryProgressStore()
+    app, _ = make_app(store, tmp_path)
+    client = app.test_client()
+
+    task_id = client.post("/fail", headers={"Prefer": "respond-async"}).get_json()["task_id"]
+    record = wait_for(store, task_id)
+    assert record["status"] == "failed"
+    assert record["error"] == "bad input"
+    assert client.get(f"/jobs/{task_id}/download").status_code == 500
+
+
+def test_queue_is_bounded(tmp_path):
+    store = InMemoryProgressStore()
+    app, queue = make_app(store, tmp_path, max_pending=1)
+    queue._pending = 1  # a job is already in flight
+
+    response = app.test_client().post("/upper", data={"file": (io.BytesIO(b"x"), "a.txt"), "async": "1"})
+    assert response.status_code == 503
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    writer = SQLiteProgressStore(path)
+    reader = SQLiteProgressStore(path)
+
+    writer.create("t1")
+    writer.update("t1", status="running", progress=40)
+    assert reader.get("t1")["progress"] == 40
+    assert [r["task_id"] for r in reader.expired(time.time() + 1)] == ["t1"]
+    assert writer.get("t1") is None
@@ -0,0 +1,82 @@
+import io
+import os
+
+import fitz
+import pikepdf
+from PIL import Image
+
+from merge_engine import merge_pdf_files
+
+LOGO = io.BytesIO()
+Image.effect_noise((200, 100), 60).convert("RGB").save(LOGO, format="PNG")
+
+
+def make_branded_pdf(path, label, pages=2):
+    """A small document that embeds the same logo on every page"""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{label} page {i + 1}")
+        page.insert_image(fitz.Rect(72, 100, 272, 200), stream=LOGO.getvalue())
+    doc.set_toc([[1, label, 1], [2, "Details", pages]])
+    doc.save(path, garbage=4, deflate=True)
+    doc.close()
+    return path
+
+
+def image_count(path):
+    with pikepdf.open(path) as pdf:
+        return sum(1 for obj in pdf.objects
+                   if isinstance(obj, pikepdf.Stream) and obj.get("/Subtype") == "/Image")
+
+
+def test_merge_keeps_pages_and_outlines_in_order(tmp_path):
+    paths = [make_branded_pdf(str(tmp_path / f"{n}.pdf"), f"Doc {n}") for n in range(3)]
+    output = str(tmp_path / "merged.pdf")
+
+    stats = merge_pdf_files(paths, output)
+
+    assert stats["pages"] == 6
+    with fitz.open(output) as doc:
+        assert [doc[i].get_text().strip() for i in (0, 3, 5)] == ["Doc 0 page 1", "Doc 1 page 2", "Doc 2 page 2"]
+        assert doc.get_toc(simple=True) == [
+            [1, "Doc 0", 1], [2, "Details", 2],
+            [1, "Doc 1", 3], [2, "Details", 4],
+            [1, "Doc 2", 5], [2, "Details", 6],
+        ]
+
+
+def test_identical_streams_are_stored_once(tmp_path):
+    paths = [make_branded_pdf(str(tmp_path / f"{n}.pdf"), f"Invoice {n}") for n in range(5)]
+    deduped = str(tmp_path / "deduped.pdf")
+    plain = str(tmp_path / "plain.pdf")
+
+    stats = merge_pdf_files(paths, deduped)
+    merge_pdf_files(paths, plain, dedupe=False)
+
+    assert image_count(plain) == 5
+    assert image_count(deduped) == 1
+    assert stats["objects_deduplicated"] >= 4
+    assert os.path.getsize(deduped) * 3 < os.path.getsize(plain)
+
+
+def test_identical_annotations_without_type_stay_per_page(tmp_path):
+    paths = []
+    for n in range(2):
+        pdf = pikepdf.new()
+        pdf.add_blank_page()
+        # Same link on both pages, written without the optional /Type
+        link = pdf.make_indirect(pikepdf.Dictionary(
+            Subtype=pikepdf.Name.Link, Rect=[10, 10, 100, 30], Border=[0, 0, 0],
+            A=pikepdf.Dictionary(S=pikepdf.Name.URI, URI=pikepdf.String("https://example.com")),
+        ))
+        pdf.pages[0].Annots = pdf.make_indirect(pikepdf.Array([link]))
+        paths.append(str(tmp_path / f"{n}.pdf"))
+        pdf.save(paths[-1])
+    output = str(tmp_path / "merged.pdf")
+
+    merge_pdf_files(paths, output)
+
+    with pikepdf.open(output) as pdf:
+        first, second = (page.Annots[0] for page in pdf.pages)
+        assert first.objgen != second.objgen
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from model_registry import LoadedModel, ModelRegistry, UnknownModelError
+
+MB = 1024 * 1024
+
+
+def fake_loader(sizes, loads, delay=0.0):
+    def load(name):
+        loads.append(name)
+        time.sleep(delay)
+        return LoadedModel(name, lambda text, **kwargs: [{"summary_text": text[:10]}], None, None, sizes[name], 0.0)
+    return load
+
+
+def test_models_load_once_and_stay_warm():
+    loads = []
+    registry = ModelRegistry(["small"], budget_bytes=100 * MB, loader=fake_loader({"small": MB}, loads, delay=0.05))
+
+    first, load_seconds = registry.get()
+    second, warm_seconds = registry.get("small")
+
+    assert first is second
+    assert load_seconds >= 0.05 and warm_seconds == 0.0
+    assert loads == ["small"]
+    assert registry.stats()["hits"] == 1
+
+
+def test_concurrent_first_requests_share_one_load():
+    loads = []
+    registry = ModelRegistry(["small"], budget_bytes=100 * MB, loader=fake_loader({"small": MB}, loads, delay=0.2))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get()[0])) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["small"]
+    assert len({id(model) for model in results}) == 1
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    loads = []
+    sizes = {"a": 40 * MB, "b": 40 * MB, "c": 40 * MB}
+    registry = ModelRegistry(["a", "b", "c"], budget_bytes=100 * MB, loader=fake_loader(sizes, loads))
+
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    stats = registry.stats()
+    assert sorted(stats["loaded"]) == ["a", "c"]
+    assert stats["evictions"] == 1 and stats["bytes"] == 80 * MB
+    assert stats["precision"] == {"a": "fp32", "c": "fp32"}
+    registry.get("b")
+    assert loads == ["a", "b", "c", "b"]
+
+
+def test_unknown_models_are_rejected():
+    registry = ModelRegistry(["small"], loader=fake_loader({}, []))
+    with pytest.raises(UnknownModelError):
+        registry.get("someone/else")
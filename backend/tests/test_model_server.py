@@ -0,0 +1,105 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import model_server
+from model_registry import LoadedModel, ModelRegistry
+
+
+class WordTokenizer:
+    model_max_length = 64
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+class SlowSummarizer:
+    """First words of each input; each call takes a while, like a forward pass"""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts, batch_size, min_length, max_length, truncation):
+        time.sleep(0.05)
+        with self.lock:
+            self.batches.append(len(texts))
+        return [{"summary_text": " ".join(text.split()[:4]) + "."} for text in texts]
+
+
+def document(tag, sentences=10):
+    return " ".join(" ".join(f"{tag}s{n}w{i}" for i in range(9)) + "." for n in range(sentences))
+
+
+@pytest.fixture
+def server(tmp_path):
+    summarizer = SlowSummarizer()
+    registry = ModelRegistry(
+        ["fake"], loader=lambda name: LoadedModel(name, summarizer, WordTokenizer(), None, 1, 0.0)
+    )
+    srv = model_server.ModelServer(str(tmp_path / "models.sock"), registry, max_batch=8, batch_wait=0.1)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv, summarizer
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_concurrent_requests_share_batches(server):
+    srv, summarizer = server
+    path = srv.server_address
+    replies = {}
+
+    def client(tag):
+        replies[tag] = model_server.request(
+            {"op": "summarize", "text": document(tag), "min_length": 2, "max_length": 8}, socket_path=path
+        )
+
+    threads = [threading.Thread(target=client, args=(tag,)) for tag in "abcd"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for tag, reply in replies.items():
+        assert reply["model"] == "fake"
+        assert reply["chunks"] == 2
+        assert all(s.startswith(tag) for s in reply["summaries"])
+    # Each request has two chunks, so a bigger batch mixes requests from different clients
+    assert max(summarizer.batches) > 2
+    stats = model_server.request({"op": "stats"}, socket_path=path)
+    assert stats["requests"] == 4
+    assert stats["active"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["batchers"]["fake"]["batches"] == len(summarizer.batches)
+    assert stats["batchers"]["fake"]["largest_batch"] == max(summarizer.batches)
+
+
+def test_errors_are_reported_to_the_client(server, tmp_path):
+    srv, _ = server
+    with pytest.raises(model_server.ModelServerError, match="Unknown summarization model"):
+        model_server.request({"op": "summarize", "text": "x.", "model": "other"}, socket_path=srv.server_address)
+
+    with pytest.raises(model_server.ModelServerUnavailable):
+        model_server.request({"op": "ping"}, socket_path=str(tmp_path / "missing.sock"))
+    assert model_server.ping(srv.server_address)
+
+
+def test_timeout_after_sending_is_an_error_not_unavailable(tmp_path, monkeypatch):
+    # Accepts connections but never answers, like a server busy with other work
+    path = str(tmp_path / "busy.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(4)
+    monkeypatch.setattr(model_server, "MODEL_SERVER_SOCKET", path)
+    monkeypatch.setattr(model_server, "MODEL_SERVER_TIMEOUT", 0.2)
+    monkeypatch.setattr(model_server, "ensure_started", lambda wait=0.0: pytest.fail("must not resend"))
+    try:
+        with pytest.raises(model_server.ModelServerError, match="No reply"):
+            model_server.summarize("Some text.")
+    finally:
+        listener.close()
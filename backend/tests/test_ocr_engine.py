@@ -0,0 +1,147 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+import ocr_engine
+import rasterize
+from ocr_engine import iter_ocr_pages, ocr_pages
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    """pdftoppm and tesseract stand-ins; recognition runs on threads instead of processes"""
+    state = {"rendered": []}
+    lock = threading.Lock()
+
+    def render(pdf_path, first_page, last_page, fmt, dpi, output_dir):
+        paths = []
+        for page in range(first_page, last_page + 1):
+            path = os.path.join(output_dir, f"p{page:06d}.png")
+            with open(path, "wb") as f:
+                f.write(f"text of page {page}".encode())
+            paths.append(path)
+        with lock:
+            state["rendered"].extend(paths)
+        return paths
+
+    def image_to_string(image_path, lang):
+        with open(image_path, "rb") as f:
+            text = f.read().decode()
+        return f"{text} [{lang}]"
+
+    def image_to_pdf_or_hocr(image_path, lang, extension, config):
+        # What tesseract's textonly_pdf renderer produces: invisible text, no image
+        with open(image_path, "rb") as f:
+            text = f.read().decode()
+        layer = fitz.open()
+        layer.new_page(width=2550, height=3300).insert_text((200, 300), text, fontsize=40, render_mode=3)
+        data = layer.tobytes(garbage=1)
+        layer.close()
+        return data
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(rasterize, "_render_window", render)
+    monkeypatch.setattr(ocr_engine.pytesseract, "image_to_string", image_to_string)
+    monkeypatch.setattr(ocr_engine.pytesseract, "image_to_pdf_or_hocr", image_to_pdf_or_hocr)
+    monkeypatch.setattr(ocr_engine, "_get_ocr_pool", lambda: executor)
+    yield state
+    executor.shutdown()
+
+
+def test_pages_come_back_in_order_and_images_are_removed(fake_pipeline, tmp_path):
+    doc = fitz.open()
+    for _ in range(25):
+        doc.new_page()
+    doc.save(str(tmp_path / "doc.pdf"))
+    doc.close()
+
+    progress = []
+    texts = ocr_pages(str(tmp_path / "doc.pdf"), dpi=150, language="deu", workers=2,
+                      on_page=lambda done, total: progress.append((done, total)))
+
+    assert texts == [f"text of page {i} [deu]" for i in range(1, 26)]
+    assert progress[-1] == (25, 25)
+    assert not any(os.path.exists(path) for path in fake_pipeline["rendered"])
+
+
+def test_rendering_stays_bounded_ahead_of_recognition(fake_pipeline):
+    pages = iter_ocr_pages("doc.pdf", workers=2, page_count=200)
+    for _ in range(5):
+        next(pages)
+    pages.close()
+
+    # Rendering windows plus the recognition queue, never the whole document
+    assert len(fake_pipeline["rendered"]) < 40
+
+
+def test_only_pool_workers_get_the_tesseract_thread_limit(monkeypatch):
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    pool = ocr_engine._get_ocr_pool()
+
+    assert pool.submit(os.getenv, "OMP_THREAD_LIMIT").result() == ocr_engine.OCR_TESSERACT_THREADS
+    assert "OMP_THREAD_LIMIT" not in os.environ
+
+
+def make_mixed_pdf(path):
+    """Pages 1 and 4 are born-digital, 2 is a bare scan, 3 is a scan with an invisible OCR layer"""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 260), False)
+    pix.clear_with(230)
+    body = "\n".join(f"Line {n} of a perfectly ordinary paragraph" for n in range(20))
+    doc = fitz.open()
+    for kind in ("digital", "scan", "scan+layer", "digital"):
+        page = doc.new_page()
+        if kind.startswith("scan"):
+            page.insert_image(page.rect, pixmap=pix)
+            page.insert_text((40, 800), "Fax 1/1")
+        if kind == "scan+layer":
+            page.insert_text((72, 72), body, render_mode=3)
+        if kind == "digital":
+            page.insert_text((72, 72), body)
+            page.insert_image(fitz.Rect(72, 500, 200, 600), pixmap=pix)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_pages_are_classified_by_text_layer(tmp_path):
+    path = make_mixed_pdf(str(tmp_path / "mixed.pdf"))
+    with fitz.open(path) as doc:
+        methods = [ocr_engine.classify_page(page)[0] for page in doc]
+        assert "Line 3 of a perfectly" in ocr_engine.classify_page(doc[2])[1]
+    assert methods == ["text", "ocr", "text", "text"]
+
+
+def test_only_scanned_pages_are_rendered(fake_pipeline, tmp_path):
+    path = make_mixed_pdf(str(tmp_path / "mixed.pdf"))
+
+    texts, methods = ocr_engine.extract_pages_text(path, language="eng")
+    assert methods == ["text", "ocr", "text", "text"]
+    assert [os.path.basename(p) for p in fake_pipeline["rendered"]] == ["p000002.png"]
+    assert texts[1] == "text of page 2 [eng]"
+    assert "Line 19" in texts[3]
+
+    _, methods = ocr_engine.extract_pages_text(path, force_ocr=True)
+    assert methods == ["ocr"] * 4
+    assert ocr_engine.page_method_headers(methods)["X-OCR-Pages"] == "4/4"
+
+
+def test_searchable_pdf_keeps_original_pages(fake_pipeline, tmp_path):
+    path = make_mixed_pdf(str(tmp_path / "mixed.pdf"))
+    output = str(tmp_path / "searchable.pdf")
+
+    assert ocr_engine.make_searchable_pdf(path, output) == ["text", "ocr", "text", "text"]
+
+    with fitz.open(path) as original, fitz.open(output) as searchable:
+        assert "text of page 2" in searchable[1].get_text()
+        assert "text of page 2" not in original[1].get_text()
+        # Page images are carried over as-is, not re-rendered
+        for before, after in zip(original, searchable):
+            assert [i["digest"] for i in before.get_image_info(hashes=True)] == \
+                   [i["digest"] for i in after.get_image_info(hashes=True)]
+            assert before.get_text() in after.get_text()
+        # The layer is scaled onto the page, not drawn at the image's pixel size
+        word = next(w for w in searchable[1].get_text("words") if w[4] == "page")
+        assert word[2] < searchable[1].rect.width
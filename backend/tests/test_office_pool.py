@@ -0,0 +1,170 @@
+import importlib
+import os
+import threading
+import time
+from functools import partial
+
+import pytest
+from flask import Flask
+
+from office_pool import OfficeBusyError, OfficeConversionError, OfficePool, OfficeTimeoutError, OfficeWorker
+
+
+class FakeWorker:
+    """Stands in for a LibreOffice instance; `delay` is how long a conversion takes"""
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, index, delay=0.05, fail=False, start_delay=0):
+        self.index = index
+        self.delay = delay
+        self.fail = fail
+        self.start_delay = start_delay
+        self.persistent = True
+        self.killed = 0
+        self.started = 0
+        self._alive = True
+
+    def convert(self, input_path, output_path):
+        with FakeWorker.lock:
+            FakeWorker.running += 1
+            FakeWorker.peak = max(FakeWorker.peak, FakeWorker.running)
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                self._alive = False
+                raise RuntimeError("instance crashed")
+            with open(output_path, "wb") as f:
+                f.write(b"%PDF-1.4")
+        finally:
+            with FakeWorker.lock:
+                FakeWorker.running -= 1
+
+    def alive(self):
+        return self._alive
+
+    def start(self):
+        if not self._alive:
+            time.sleep(self.start_delay)
+            self.started += 1
+            self._alive = True
+
+    def kill(self):
+        self.killed += 1
+        self._alive = False
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    FakeWorker.running = FakeWorker.peak = 0
+
+
+def run_concurrently(pool, count, tmp_path):
+    errors = []
+
+    def job(i):
+        try:
+            pool.convert("in.docx", str(tmp_path / f"{i}.pdf"))
+        except OfficeConversionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=job, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_conversions_never_exceed_pool_size(tmp_path):
+    pool = OfficePool(size=2, timeout=10, max_pending=20, worker_factory=FakeWorker)
+
+    assert run_concurrently(pool, 8, tmp_path) == []
+    assert FakeWorker.peak == 2
+    stats = pool.stats()
+    assert stats["conversions"] == 8
+    assert stats["busy"] == 0 and stats["waiting"] == 0
+    pool.shutdown()
+
+
+def test_excess_waiters_are_rejected(tmp_path):
+    pool = OfficePool(size=1, timeout=10, max_pending=2,
+                      worker_factory=lambda i: FakeWorker(i, delay=0.3))
+
+    errors = run_concurrently(pool, 6, tmp_path)
+    assert errors and all(isinstance(e, OfficeBusyError) for e in errors)
+    assert pool.stats()["rejected"] == len(errors)
+    assert pool.stats()["conversions"] == 6 - len(errors)
+    pool.shutdown()
+
+
+def test_timed_out_worker_is_restarted_in_the_background_and_reused(tmp_path):
+    workers = []
+
+    def factory(i):
+        workers.append(FakeWorker(i, delay=2, start_delay=1.5))
+        return workers[-1]
+
+    pool = OfficePool(size=1, timeout=1, worker_factory=factory)
+    started = time.monotonic()
+    with pytest.raises(OfficeTimeoutError):
+        pool.convert("in.docx", str(tmp_path / "out.pdf"))
+    # The caller gets its error without waiting for the new instance to start
+    assert time.monotonic() - started < 1.4
+    assert workers[0].killed == 1
+
+    workers[0].delay = 0
+    pool.convert("in.docx", str(tmp_path / "out.pdf"), timeout=5)
+    assert workers[0].started == 1
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["restarts"] == 1 and stats["conversions"] == 1
+    pool.shutdown()
+
+
+def test_crashed_worker_is_restarted(tmp_path):
+    worker = FakeWorker(0, delay=0, fail=True)
+    pool = OfficePool(size=1, timeout=5, worker_factory=lambda i: worker)
+
+    with pytest.raises(OfficeConversionError):
+        pool.convert("in.docx", str(tmp_path / "out.pdf"))
+    worker.fail = False
+    pool.convert("in.docx", str(tmp_path / "out.pdf"))
+    assert worker.killed == 1 and worker.started == 1 and worker.alive()
+    assert pool.stats()["failures"] == 1 and pool.stats()["restarts"] == 1
+    pool.shutdown()
+
+
+def test_pools_in_different_processes_never_share_profiles_or_pipes(tmp_path):
+    first = OfficePool(size=2, pid=111, worker_factory=partial(OfficeWorker, profile_root=str(tmp_path)))
+    second = OfficePool(size=2, pid=222, worker_factory=partial(OfficeWorker, profile_root=str(tmp_path)))
+    workers = first.workers + second.workers
+
+    assert len({w.profile_dir for w in workers}) == 4
+    assert len({w.pipe_name for w in workers}) == 4
+    assert first.workers[0].profile_dir == str(tmp_path / "111" / "worker_0")
+    # Without an explicit pid the names follow whichever process uses the worker
+    assert str(os.getpid()) in OfficeWorker(0, profile_root=str(tmp_path)).pipe_name
+    first.shutdown()
+    second.shutdown()
+
+
+@pytest.mark.parametrize("module_name", ["convert_word_to_pdf", "convert_excel_to_pdf", "convert_pptx_to_pdf"])
+@pytest.mark.parametrize("error, status", [
+    (OfficeBusyError("busy"), 503),
+    (OfficeTimeoutError("slow"), 504),
+    (OfficeConversionError("broken"), 500),
+])
+def test_routes_map_pool_errors_to_status_codes(monkeypatch, module_name, error, status):
+    try:
+        module = importlib.import_module(module_name)
+    except Exception as e:  # e.g. fonts the Excel converter registers at import
+        pytest.skip(f"{module_name} not importable here: {e}")
+
+    def fail(input_path, output_path, timeout=None):
+        raise error
+
+    monkeypatch.setattr(module.office_pool, "convert_to_pdf", fail)
+    with Flask(__name__).test_request_context():
+        _, code = module._convert_with_libreoffice("in.docx", "out.pdf")
+    assert code == status
@@ -0,0 +1,93 @@
+import fitz
+import pikepdf
+
+from add_page_numbers import add_page_numbers_to_pdf
+import add_watermark
+from add_watermark import add_watermark_to_pdf, create_watermark_pdf
+from overlay_engine import stamp_form_xobjects
+
+
+def make_pdf(path, sizes):
+    doc = fitz.open()
+    for i, (width, height) in enumerate(sizes):
+        page = doc.new_page(width=width, height=height)
+        # Leave the graphics state dirty, as real-world content often does
+        page.insert_text((40, 40), f"body {i + 1}")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_watermark_is_built_once_per_page_size(tmp_path):
+    path = make_pdf(str(tmp_path / "in.pdf"), [(612, 792)] * 4 + [(842, 595)] * 2)
+    built = []
+
+    def overlay(width, height):
+        built.append((width, height))
+        return create_watermark_pdf("DRAFT", width, height).getvalue()
+
+    with pikepdf.open(path) as pdf:
+        assert stamp_form_xobjects(pdf, overlay) == 2
+        pdf.save(str(tmp_path / "out.pdf"))
+    assert sorted(built) == [(612, 792), (842, 595)]
+
+    with pikepdf.open(str(tmp_path / "out.pdf")) as pdf:
+        forms = [obj for obj in pdf.objects
+                 if isinstance(obj, pikepdf.Stream) and obj.get("/Subtype") == "/Form"]
+        assert len(forms) == 2
+
+
+def test_add_watermark_keeps_content_and_adds_text(tmp_path):
+    path = make_pdf(str(tmp_path / "in.pdf"), [(612, 792)] * 3)
+    output = add_watermark_to_pdf(path, "CONFIDENTIAL", opacity=0.5, rotation=0)
+
+    with fitz.open(stream=output.getvalue(), filetype="pdf") as doc:
+        for i, page in enumerate(doc):
+            text = page.get_text()
+            assert f"body {i + 1}" in text
+            assert "CONFIDENTIAL" in text
+
+
+def test_page_numbers_share_one_font(tmp_path):
+    path = make_pdf(str(tmp_path / "in.pdf"), [(612, 792)] * 5)
+    output = add_page_numbers_to_pdf(path, position="bottom-right", start_number=3)
+
+    with fitz.open(stream=output.getvalue(), filetype="pdf") as doc:
+        assert "Page 3 of 5" in doc[0].get_text()
+        assert "Page 7 of 5" in doc[4].get_text()
+        words = doc[0].get_text("words")
+        page_word = next(w for w in words if w[4] == "Page")
+        # bottom-right: baseline 36pt above the bottom edge, right-aligned to the margin
+        assert page_word[3] > 792 - 60
+        assert max(w[2] for w in words if w[3] > 700) < 612 - 30
+
+    with pikepdf.open(output) as pdf:
+        fonts = {
+            font.objgen
+            for page in pdf.pages
+            for name, font in page.Resources.Font.items() if name.startswith("/PgNo")
+        }
+        assert len(fonts) == 1
+
+
+def test_watermark_overlays_are_memoized_across_calls(monkeypatch):
+    add_watermark._overlay_cache.clear()
+    renders = []
+    real_render = add_watermark._render_watermark_pdf
+
+    def counting_render(*args):
+        renders.append(args)
+        return real_render(*args)
+
+    monkeypatch.setattr(add_watermark, "_render_watermark_pdf", counting_render)
+    before = add_watermark.watermark_cache_stats()["hits"]
+
+    first = create_watermark_pdf("CONFIDENTIAL", 612, 792).getvalue()
+    second = create_watermark_pdf("CONFIDENTIAL", 612.0, 792.0).getvalue()
+    create_watermark_pdf("CONFIDENTIAL", 842, 595)
+
+    assert first == second
+    assert len(renders) == 2
+    stats = add_watermark.watermark_cache_stats()
+    assert stats["hits"] - before == 1
+    assert 0 < stats["bytes"] <= stats["maxbytes"]
@@ -0,0 +1,84 @@
+import fitz
+import pikepdf
+import pytest
+from pikepdf import Array, Dictionary, Name
+
+from page_structure import apply_page_operations, remove_pages, rotate_pages
+
+
+def make_nested_pdf(path, object_streams=False, **save_kwargs):
+    """Six pages under two intermediate /Pages nodes; the first node carries /Rotate 90"""
+    pdf = pikepdf.new()
+    for i in range(6):
+        pdf.add_blank_page(page_size=(200, 300))
+        page = pdf.pages[i]
+        page.Contents = pdf.make_stream(b"BT /F1 12 Tf 20 20 Td (secret page %d) Tj ET" % (i + 1))
+    pages = [page.obj for page in pdf.pages]
+    root = pdf.Root.Pages
+    first = pdf.make_indirect(Dictionary(Type=Name.Pages, Kids=Array(pages[:3]), Count=3, Parent=root, Rotate=90))
+    second = pdf.make_indirect(Dictionary(Type=Name.Pages, Kids=Array(pages[3:]), Count=3, Parent=root))
+    for page in pages[:3]:
+        page.Parent = first
+    for page in pages[3:]:
+        page.Parent = second
+    root.Kids = Array([first, second])
+    mode = pikepdf.ObjectStreamMode.generate if object_streams else pikepdf.ObjectStreamMode.disable
+    pdf.save(path, object_stream_mode=mode, compress_streams=False, **save_kwargs)
+    return path
+
+
+def rotations(path):
+    with fitz.open(path) as doc:
+        return [page.rotation for page in doc]
+
+
+@pytest.mark.parametrize("object_streams", [False, True])
+def test_rotation_is_appended_as_incremental_update(tmp_path, object_streams):
+    source = make_nested_pdf(str(tmp_path / "in.pdf"), object_streams)
+    output = str(tmp_path / "out.pdf")
+
+    assert rotate_pages(source, output, {0: 90, 4: 180}) == "incremental"
+
+    original = open(source, "rb").read()
+    updated = open(output, "rb").read()
+    assert updated.startswith(original)
+    # Only the two rotated page dictionaries are rewritten
+    assert updated[len(original):].count(b"/Type /Page ") == 2
+    assert rotations(output) == [180, 90, 90, 0, 180, 0]
+    with pikepdf.open(output) as pdf:
+        assert pdf.get_warnings() == []
+        assert pdf.check_pdf_syntax() == []
+
+
+def test_encrypted_files_are_rewritten(tmp_path):
+    source = make_nested_pdf(str(tmp_path / "in.pdf"), encryption=pikepdf.Encryption(owner="o", user=""))
+    output = str(tmp_path / "out.pdf")
+
+    assert rotate_pages(source, output, {1: 270}, relative=False) == "rewrite"
+    assert rotations(output)[1] == 270
+
+
+def test_removed_pages_do_not_survive(tmp_path):
+    source = make_nested_pdf(str(tmp_path / "in.pdf"))
+    output = str(tmp_path / "out.pdf")
+
+    assert remove_pages(source, output, [1, 2]) == 4
+    with pikepdf.open(output) as pdf:
+        data = b"".join(obj.read_bytes() for obj in pdf.objects if isinstance(obj, pikepdf.Stream))
+    assert b"secret page 2" not in data and b"secret page 3" not in data
+    assert b"secret page 4" in data
+    with pytest.raises(ValueError):
+        remove_pages(source, output, range(6))
+
+
+def test_page_operations_apply_in_order(tmp_path):
+    source = make_nested_pdf(str(tmp_path / "in.pdf"))
+    rotated = str(tmp_path / "rotated.pdf")
+    edited = str(tmp_path / "edited.pdf")
+
+    assert apply_page_operations(source, rotated, [("rotate", 3, 90), ("rotate", 0, 0)]) == "incremental"
+    assert rotations(rotated) == [0, 90, 90, 90, 0, 0]
+
+    # After deleting page 1 the old page 4 is at index 2
+    assert apply_page_operations(source, edited, [("delete", 0), ("rotate", 2, 270)]) == "rewrite"
+    assert rotations(edited) == [90, 90, 270, 0, 0]
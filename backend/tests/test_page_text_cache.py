@@ -0,0 +1,100 @@
+import threading
+import time
+
+import fitz
+import pytest
+
+import page_text_cache
+from result_cache import DiskCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    disk = DiskCache(str(tmp_path / "cache"), 10 * 1024 * 1024, 3600)
+    monkeypatch.setattr(page_text_cache, "_cache", disk)
+    monkeypatch.setattr(page_text_cache, "PAGE_TEXT_CACHE_ENABLED", True)
+    return disk
+
+
+def make_pdf(path, texts):
+    doc = fitz.open()
+    for text in texts:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_pages_are_compressed_separately():
+    pages = ["first page " * 50, "", "naïve café – second"]
+    data = page_text_cache.encode(pages, ["text", "ocr", "text"])
+
+    assert len(data) < sum(len(p) for p in pages)
+    assert page_text_cache.decode(data) == (pages, ["text", "ocr", "text"])
+    assert page_text_cache.decode(data, pages=[2])[0] == [None, None, pages[2]]
+
+
+def test_text_layer_is_read_once_per_content(cache, tmp_path, monkeypatch):
+    calls = []
+    read = page_text_cache._read_text_layer
+    monkeypatch.setattr(page_text_cache, "_read_text_layer", lambda path: calls.append(path) or read(path))
+    first = make_pdf(tmp_path / "a.pdf", ["Alpha", "Beta"])
+    # Same bytes under another name (e.g. the download request's upload) hit the same entry
+    second = tmp_path / "b.pdf"
+    second.write_bytes(open(first, "rb").read())
+
+    assert [t.strip() for t in page_text_cache.text_layer_pages(first)] == ["Alpha", "Beta"]
+    assert [t.strip() for t in page_text_cache.text_layer_pages(str(second))] == ["Alpha", "Beta"]
+    assert calls == [first]
+    assert cache.stats()["hits"] == 1
+
+
+def test_ocr_results_are_keyed_by_mode_language_and_dpi(cache, tmp_path, monkeypatch):
+    calls = []
+
+    def fake_extract(pdf_path, dpi, language, force_ocr=False, on_page=None):
+        calls.append((dpi, language, force_ocr))
+        return [f"{language}@{dpi}"], ["ocr"]
+
+    monkeypatch.setattr(page_text_cache, "extract_pages_text", fake_extract)
+    path = make_pdf(tmp_path / "scan.pdf", [""])
+
+    # Preview, then download of the same file: OCR runs once
+    assert page_text_cache.ocr_pages(path) == (["eng@300"], ["ocr"])
+    assert page_text_cache.ocr_pages(path) == (["eng@300"], ["ocr"])
+    page_text_cache.ocr_pages(path, language="deu")
+    page_text_cache.ocr_pages(path, dpi=200)
+    page_text_cache.ocr_pages(path, force_ocr=True)
+    assert calls == [(300, "eng", False), (300, "deu", False), (200, "eng", False), (300, "eng", True)]
+
+
+def test_concurrent_misses_share_one_extraction(cache, tmp_path):
+    path = make_pdf(tmp_path / "a.pdf", ["Alpha"])
+    calls = []
+
+    def slow_extract():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["Alpha"], ["text"]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(page_text_cache.get_or_extract(path, "text", slow_extract)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [(["Alpha"], ["text"])] * 3
+
+
+def test_span_pages_round_trip_and_failures_are_not_cached(cache, tmp_path):
+    path = make_pdf(tmp_path / "a.pdf", ["Alpha"])
+    pages = [{"page_number": 0, "blocks": [{"text": "Alpha", "bbox": [1.0, 2.0, 3.0, 4.0]}]}]
+
+    assert page_text_cache.span_pages(path, lambda p: []) == []
+    assert page_text_cache.span_pages(path, lambda p: pages) == pages
+    assert page_text_cache.span_pages(path, lambda p: pytest.fail("should be cached")) == pages
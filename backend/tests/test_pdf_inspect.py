@@ -0,0 +1,78 @@
+import hashlib
+
+import pikepdf
+import pytest
+from flask import Flask
+
+import pdf_inspect
+from pdf_inspect import inspect_pdf
+
+
+def make_pdf(path, pages, **save_kwargs):
+    pdf = pikepdf.new()
+    for _ in range(pages):
+        pdf.add_blank_page(page_size=(200, 200))
+    pdf.save(path, **save_kwargs)
+    return path
+
+
+def test_inspect_reports_pages_size_and_hash(tmp_path):
+    path = make_pdf(str(tmp_path / "doc.pdf"), 7)
+    info = inspect_pdf(path)
+
+    data = open(path, "rb").read()
+    assert info["page_count"] == 7
+    assert info["size"] == len(data)
+    assert info["sha256"] == hashlib.sha256(data).hexdigest()
+    assert info["encrypted"] is False
+
+
+def test_inspect_detects_encryption(tmp_path):
+    owner_only = make_pdf(str(tmp_path / "owner.pdf"), 2, encryption=pikepdf.Encryption(owner="secret", user=""))
+    assert inspect_pdf(owner_only)["encrypted"] is True
+    assert inspect_pdf(owner_only)["page_count"] == 2
+
+    locked = make_pdf(str(tmp_path / "locked.pdf"), 2, encryption=pikepdf.Encryption(owner="secret", user="secret"))
+    with pytest.raises(Exception):
+        inspect_pdf(locked)
+
+
+def test_inspect_falls_back_when_count_is_missing(tmp_path):
+    path = str(tmp_path / "nocount.pdf")
+    pdf = pikepdf.new()
+    for _ in range(3):
+        pdf.add_blank_page()
+    del pdf.Root.Pages.Count
+    pdf.save(path)
+
+    assert inspect_pdf(path)["page_count"] == 3
+
+
+def test_inspect_is_memoized_per_request(tmp_path, monkeypatch):
+    path = make_pdf(str(tmp_path / "doc.pdf"), 1)
+    calls = []
+    original = pdf_inspect._file_digest
+    monkeypatch.setattr(pdf_inspect, "_file_digest", lambda p: calls.append(p) or original(p))
+
+    app = Flask(__name__)
+    with app.test_request_context("/"):
+        first = inspect_pdf(path)
+        assert inspect_pdf(path) is first
+    with app.test_request_context("/"):
+        inspect_pdf(path)
+    assert len(calls) == 2
+
+
+def test_inspect_ignores_a_forged_count(tmp_path):
+    path = str(tmp_path / "forged.pdf")
+    pdf = pikepdf.new()
+    for _ in range(5):
+        pdf.add_blank_page()
+    pdf.save(path, object_stream_mode=pikepdf.ObjectStreamMode.disable)
+    # qpdf rewrites /Count on save, so forge it in the bytes; same length keeps the xref valid.
+    # A small /Count would let a large document through the page limit
+    data = open(path, "rb").read()
+    assert data.count(b"/Count 5") == 1
+    open(path, "wb").write(data.replace(b"/Count 5", b"/Count 1"))
+
+    assert inspect_pdf(path)["page_count"] == 5
@@ -0,0 +1,112 @@
+import time
+
+import restrictions
+from cache_utils import TTLCache
+
+
+def test_ttl_cache_hit_miss_and_expiry():
+    cache = TTLCache(maxsize=4, ttl=0.05)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_evicts_by_byte_budget():
+    cache = TTLCache(maxsize=100, ttl=60, maxbytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"5678")
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", b"90ab")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.stats()["bytes"] == 8
+
+    # Replacing an entry accounts for the old size; oversized values are not stored
+    cache.set("a", b"12")
+    cache.set("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] == 6
+    assert cache.stats()["maxbytes"] == 10
+
+
+def test_get_user_is_cached_until_invalidated(monkeypatch):
+    calls = []
+
+    def fake_fetch(email):
+        calls.append(email)
+        return {"email": email, "is_premium_": len(calls) > 1}, 60
+
+    monkeypatch.setattr(restrictions, "_fetch_user", fake_fetch)
+    restrictions._premium_cache.clear()
+
+    assert restrictions.get_user("Pro@Example.com")["is_premium_"] is False
+    assert restrictions.get_user("pro@example.com ")["is_premium_"] is False
+    assert len(calls) == 1
+
+    assert restrictions.invalidate_user("pro@example.com") is True
+    assert restrictions.get_user("pro@example.com")["is_premium_"] is True
+    assert len(calls) == 2
+
+
+def test_get_user_does_not_cache_error_fallback(monkeypatch):
+    calls = []
+
+    def failing_fetch(email):
+        calls.append(email)
+        return {"email": email, "is_premium_": False}, None
+
+    monkeypatch.setattr(restrictions, "_fetch_user", failing_fetch)
+    restrictions._premium_cache.clear()
+
+    restrictions.get_user("flaky@example.com")
+    restrictions.get_user("flaky@example.com")
+    assert len(calls) == 2
+
+
+def test_restriction_checks_share_one_lookup_per_request(monkeypatch):
+    from flask import Flask
+
+    calls = []
+
+    def fake_fetch(email):
+        calls.append(email)
+        return {"email": email, "is_premium_": True}, 60
+
+    monkeypatch.setattr(restrictions, "_fetch_user", fake_fetch)
+    restrictions._premium_cache.clear()
+
+    app = Flask(__name__)
+    with app.test_request_context("/"):
+        assert restrictions.check_restrictions("chain@example.com", []) is None
+        assert restrictions.check_protect_pdf_restrictions("chain@example.com", []) is None
+        assert restrictions.get_request_user("chain@example.com")["is_premium_"] is True
+        assert restrictions.identity_lookup_count() == 1
+
+    # A new request is served from the process cache without another lookup
+    restrictions._premium_cache.clear()
+    restrictions._premium_cache.set("chain@example.com", {"email": "chain@example.com", "is_premium_": True})
+    with app.test_request_context("/"):
+        restrictions.check_merge_pdf_restrictions("chain@example.com", [])
+        assert restrictions.identity_lookup_count() == 0
+    assert len(calls) == 1
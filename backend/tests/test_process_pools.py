@@ -0,0 +1,20 @@
+import os
+
+from process_pools import SharedProcessPool
+
+
+def _set_env(name, value):
+    os.environ[name] = value
+
+
+def test_pool_is_created_once_with_initargs_read_at_first_use():
+    settings = {"value": "at-import"}
+    shared = SharedProcessPool(1, _set_env, lambda: ("PDFVILLE_POOL_TEST", settings["value"]))
+    settings["value"] = "configured-later"
+
+    pool = shared.get()
+    try:
+        assert shared.get() is pool
+        assert pool.submit(os.getenv, "PDFVILLE_POOL_TEST").result() == "configured-later"
+    finally:
+        pool.shutdown()
@@ -0,0 +1,54 @@
+import os
+import threading
+
+import rasterize
+from rasterize import iter_rendered_pages
+
+
+def fake_renderer(calls):
+    lock = threading.Lock()
+
+    def render(pdf_path, first_page, last_page, fmt, dpi, output_dir):
+        with lock:
+            calls.append((first_page, last_page))
+        paths = []
+        for page in range(first_page, last_page + 1):
+            path = os.path.join(output_dir, f"p{page:06d}.jpg")
+            with open(path, "wb") as f:
+                f.write(f"page {page}".encode())
+            paths.append(path)
+        return paths
+
+    return render
+
+
+def test_pages_are_yielded_in_order_and_deleted_after_use(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rasterize, "_render_window", fake_renderer(calls))
+
+    seen = []
+    previous = None
+    for page, path in iter_rendered_pages("doc.pdf", "jpeg", window=3, workers=2, page_count=10):
+        if previous:
+            assert not os.path.exists(previous)
+        with open(path, "rb") as f:
+            seen.append((page, f.read()))
+        previous = path
+
+    assert [p for p, _ in seen] == list(range(1, 11))
+    assert seen[4][1] == b"page 5"
+    assert sorted(calls) == [(1, 3), (4, 6), (7, 9), (10, 10)]
+    assert not os.path.exists(os.path.dirname(previous))
+
+
+def test_stopping_early_cleans_up(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rasterize, "_render_window", fake_renderer(calls))
+
+    pages = iter_rendered_pages("doc.pdf", "png", window=1, workers=2, page_count=50)
+    _, path = next(pages)
+    pages.close()
+
+    assert not os.path.exists(os.path.dirname(path))
+    # Rendering never runs far ahead of the consumer
+    assert len(calls) <= 3
@@ -0,0 +1,70 @@
+import os
+import time
+
+import result_cache
+from result_cache import DiskCache, make_key
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_hit_and_miss(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, ttl=60)
+    src = write(tmp_path / "out.pdf", b"result")
+
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, src)
+    with open(cache.get("ab" * 32), "rb") as f:
+        assert f.read() == b"result"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, ttl=60)
+    path = cache.put_bytes("cd" * 32, b"old")
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+
+    assert cache.get("cd" * 32) is None
+    assert not os.path.exists(path)
+
+
+def test_evicts_least_recently_used_beyond_budget(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=250, ttl=3600)
+    first = cache.put_bytes("01" * 32, b"a" * 100)
+    second = cache.put_bytes("02" * 32, b"b" * 100)
+    now = time.time()
+    os.utime(first, (now - 10, now - 10))
+    os.utime(second, (now - 20, now - 10))
+
+    # Touch the first entry so the second one is the LRU victim
+    assert cache.get("01" * 32) == first
+    cache.put_bytes("03" * 32, b"c" * 100)
+
+    assert cache.get("02" * 32) is None
+    assert cache.get("01" * 32) is not None
+    assert cache.get("03" * 32) is not None
+
+
+def test_key_depends_on_content_order_and_params(tmp_path):
+    a = write(tmp_path / "a.pdf", b"AAAA")
+    b = write(tmp_path / "b.pdf", b"BBBB")
+    a_copy = write(tmp_path / "copy.pdf", b"AAAA")
+
+    assert make_key("merge_pdfs", [a, b]) == make_key("merge_pdfs", [a_copy, b])
+    assert make_key("merge_pdfs", [a, b]) != make_key("merge_pdfs", [b, a])
+    assert make_key("rotate", [a], {"angle": "90", "pages": "all"}) == \
+        make_key("rotate", [b"AAAA"], {"pages": "all", "angle": "90"})
+    assert make_key("rotate", [a], {"angle": "90"}) != make_key("rotate", [a], {"angle": "180"})
+    assert make_key("rotate", [a]) != make_key("split_pdf", [a])
+
+
+def test_disabled_cache_is_a_no_op(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_ENABLED", False)
+    key = make_key("compress_pdf", [b"data"])
+    assert result_cache.put_bytes(key, b"out") is None
+    assert result_cache.get(key) is None
@@ -0,0 +1,65 @@
+import io
+import os
+
+import fitz
+import pikepdf
+import pytest
+from PIL import Image
+
+from split_engine import iter_split_parts, plan_bookmarks, plan_every, plan_pages, plan_ranges
+
+
+def make_shared_image_pdf(path, pages):
+    """Every page draws the same embedded image"""
+    buf = io.BytesIO()
+    Image.effect_noise((300, 300), 60).convert("RGB").save(buf, format="PNG")
+    doc = fitz.open()
+    xref = 0
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"page {i + 1}")
+        xref = page.insert_image(fitz.Rect(72, 100, 372, 400), stream=buf.getvalue(), xref=xref)
+    doc.set_toc([[1, "Intro", 1], [2, "Detail", 2], [1, "Part/Two", 4], [1, "Same page", 4], [1, "End", 6]])
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_plans():
+    assert plan_pages(2, 3) == [("page_3.pdf", 2, 2), ("page_4.pdf", 3, 3)]
+    assert plan_ranges("1-3, 5", 6) == [("pages_1-3.pdf", 0, 2), ("page_5.pdf", 4, 4)]
+    assert plan_every(4, 6) == [("pages_1-4.pdf", 0, 3), ("pages_5-6.pdf", 4, 5)]
+    with pytest.raises(ValueError):
+        plan_ranges("2-9", 6)
+    with pytest.raises(ValueError):
+        plan_ranges("3-x", 6)
+    with pytest.raises(ValueError, match="more than once"):
+        plan_ranges("1-3, 5, 1 - 3", 6)
+    with pytest.raises(ValueError, match="more than once"):
+        plan_ranges("2, 2-2", 6)
+    with pytest.raises(ValueError):
+        plan_every(0, 6)
+
+
+def test_bookmark_plan_covers_every_page(tmp_path):
+    path = make_shared_image_pdf(str(tmp_path / "doc.pdf"), 8)
+    assert plan_bookmarks(path, 8) == [
+        ("01_Intro.pdf", 0, 2), ("02_Part_Two.pdf", 3, 4), ("03_End.pdf", 5, 7)
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parts_hold_their_pages_and_share_resources(tmp_path, workers):
+    path = make_shared_image_pdf(str(tmp_path / "doc.pdf"), 6)
+    parts = plan_every(3, 6) + plan_pages(0, 0)
+
+    results = []
+    for name, part_path in iter_split_parts(path, parts, workers=workers, chunk=1):
+        with pikepdf.open(part_path) as part:
+            images = [obj for obj in part.objects
+                      if isinstance(obj, pikepdf.Stream) and obj.get("/Subtype") == "/Image"]
+            results.append((name, len(part.pages), len(images), os.path.getsize(part_path)))
+
+    assert [r[:3] for r in results] == [("pages_1-3.pdf", 3, 1), ("pages_4-6.pdf", 3, 1), ("page_1.pdf", 1, 1)]
+    # Three pages drawing one image cost little more than a single page
+    assert results[0][3] < results[2][3] * 1.5
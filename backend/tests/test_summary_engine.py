@@ -0,0 +1,71 @@
+from summary_engine import map_reduce_summarize, pack_chunks
+
+
+class WordTokenizer:
+    """One token per word, like a tokenizer with a very small vocabulary"""
+    model_max_length = 64
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+class FirstWordsSummarizer:
+    """Summary = the first few words of each input; records batch sizes"""
+
+    def __init__(self, words=6):
+        self.words = words
+        self.batches = []
+        self.inputs = []
+
+    def __call__(self, texts, batch_size, min_length, max_length, truncation):
+        assert min_length < max_length
+        self.batches.append(len(texts))
+        self.inputs.extend(texts)
+        return [{"summary_text": " ".join(text.split()[:self.words]) + "."} for text in texts]
+
+
+def sentence(n, words=9):
+    return " ".join(f"s{n}w{i}" for i in range(words)) + "."
+
+
+def test_chunks_are_packed_by_token_count():
+    tokenizer = WordTokenizer()
+    sentences = [sentence(n) for n in range(10)] + [" ".join(f"long{i}" for i in range(70))]
+
+    chunks = pack_chunks(sentences, tokenizer, max_tokens=30)
+
+    assert all(tokens <= 30 for _, tokens in chunks)
+    assert all(len(text.split()) <= 30 for text, _ in chunks)
+    # 9-word sentences: three per chunk (27 tokens + 2 joins), then the long one split into windows
+    assert [tokens for _, tokens in chunks] == [29, 29, 29, 9, 30, 30, 10]
+    assert " ".join(text for text, _ in chunks).split() == " ".join(sentences).split()
+
+
+def test_whole_document_is_summarized_in_batches():
+    text = " ".join(sentence(n) for n in range(200))
+    summarizer = FirstWordsSummarizer()
+
+    summaries, stats = map_reduce_summarize(text, summarizer, WordTokenizer(), min_length=4, max_length=12,
+                                            batch_size=8)
+
+    # Every sentence reached the model in the map step (nothing dropped after 8 chunks)
+    mapped = " ".join(summarizer.inputs[:stats["chunks"]])
+    assert all(f"s{n}w0" in mapped for n in range(200))
+    assert stats["chunks"] > 8
+    assert max(summarizer.batches) == 8
+    # Reduced until the summaries fit in one model input
+    assert stats["rounds"] >= 2
+    assert sum(len(s.split()) + 1 for s in summaries) <= 64
+    assert summaries[0].startswith("s0w0")
+
+
+def test_short_text_is_a_single_pass():
+    summarizer = FirstWordsSummarizer()
+    summaries, stats = map_reduce_summarize(sentence(1), summarizer, WordTokenizer(), min_length=64, max_length=128)
+
+    assert stats == {"chunks": 1, "rounds": 1}
+    assert len(summaries) == 1
+    assert map_reduce_summarize("", summarizer, WordTokenizer()) == ([], {"chunks": 0, "rounds": 0})
@@ -0,0 +1,91 @@
+import hashlib
+import io
+import os
+
+from flask import Flask, jsonify, request
+
+import pdf_inspect
+import workspace
+from upload_ingest import SpoolingRequest, save_upload, upload_digest, upload_mmap, upload_path
+
+
+def make_app():
+    app = Flask(__name__)
+    app.request_class = SpoolingRequest
+    return app
+
+
+def test_upload_is_spooled_and_hashed_once(tmp_path, monkeypatch):
+    app = make_app()
+    payload = os.urandom(700 * 1024)
+    seen = {}
+
+    calls = []
+    original = pdf_inspect._file_digest
+    monkeypatch.setattr(pdf_inspect, "_file_digest", lambda p: calls.append(p) or original(p))
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        storage = request.files["file"]
+        path = upload_path(storage)
+        seen["path"] = path
+        seen["digest"] = upload_digest(storage)
+        # Downstream hashing (result cache keys, inspect_pdf) reuses the digest
+        seen["file_sha256"] = pdf_inspect.file_sha256(path)
+        with upload_mmap(storage) as view:
+            seen["head"] = bytes(view[:16])
+        seen["link"] = save_upload(storage, str(tmp_path / "kept.bin"))
+        return jsonify(ok=True)
+
+    response = app.test_client().post("/upload", data={"file": (io.BytesIO(payload), "doc.PDF")})
+    assert response.status_code == 200
+
+    expected = hashlib.sha256(payload).hexdigest()
+    assert seen["digest"] == (expected, len(payload))
+    assert seen["file_sha256"] == expected
+    assert calls == []
+    assert seen["head"] == payload[:16]
+    assert seen["path"].endswith(".pdf")
+
+    # The spool file goes away with the request; the saved copy stays
+    assert not os.path.exists(seen["path"])
+    with open(seen["link"], "rb") as f:
+        assert f.read() == payload
+
+
+def test_stream_is_still_readable_by_legacy_code():
+    app = make_app()
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        storage = request.files["file"]
+        upload_path(storage)
+        return storage.read()
+
+    response = app.test_client().post("/upload", data={"file": (io.BytesIO(b"%PDF-1.4 body"), "a.pdf")})
+    assert response.data == b"%PDF-1.4 body"
+
+
+def test_unspooled_upload_is_copied_once_into_the_workspace(tmp_path, monkeypatch):
+    manager = workspace.WorkspaceManager(root=str(tmp_path / "work"), sweep_interval=3600)
+    monkeypatch.setattr(workspace, "manager", manager)
+    app = Flask(__name__)  # default request class: nothing is spooled
+    workspace.init_app(app)
+    seen = {}
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        storage = request.files["file"]
+        seen["path"] = upload_path(storage)
+        assert upload_path(storage) == seen["path"]
+        upload_digest(storage)
+        save_upload(storage, str(tmp_path / "kept.pdf"))
+        seen["files"] = os.listdir(os.path.dirname(seen["path"]))
+        return "ok"
+
+    response = app.test_client().post("/upload", data={"file": (io.BytesIO(b"%PDF-1.4 body"), "a.pdf")})
+    response.close()
+    assert seen["path"].startswith(manager.root)
+    assert len(seen["files"]) == 1
+    assert not os.path.exists(seen["path"])
+    assert (tmp_path / "kept.pdf").read_bytes() == b"%PDF-1.4 body"
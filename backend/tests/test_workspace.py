@@ -0,0 +1,105 @@
+import os
+import time
+
+import pytest
+from flask import Flask, send_file
+
+import utils
+import workspace
+from workspace import QuotaExceededError, WorkspaceManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    mgr = WorkspaceManager(root=str(tmp_path / "work"), request_quota_mb=1, global_quota_mb=4,
+                           orphan_age=60, sweep_interval=3600)
+    monkeypatch.setattr(workspace, "manager", mgr)
+    return mgr
+
+
+def make_app():
+    app = Flask(__name__)
+    workspace.init_app(app)
+    return app
+
+
+def test_temp_files_are_removed_after_the_response_is_sent(manager):
+    app = make_app()
+    created = {}
+
+    @app.route("/tool")
+    def tool():
+        path = utils.create_temp_file(".txt")
+        with open(path, "w") as f:
+            f.write("result")
+        created["dir"] = utils.create_temp_dir()
+        created["file"] = path
+        return send_file(path)
+
+    response = app.test_client().get("/tool")
+    # Still there while the body is being streamed
+    assert os.path.exists(created["file"])
+    assert response.get_data() == b"result"
+    response.close()
+
+    assert not os.path.exists(created["file"])
+    assert not os.path.exists(created["dir"])
+    assert manager.stats()["active_workspaces"] == 0
+
+
+def test_workspace_is_removed_when_the_view_raises(manager):
+    app = make_app()
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    created = {}
+
+    @app.route("/boom")
+    def boom():
+        created["file"] = utils.create_temp_file()
+        raise RuntimeError("boom")
+
+    response = app.test_client().get("/boom")
+    assert response.status_code == 500
+    response.close()
+    assert not os.path.exists(created["file"])
+
+
+def test_request_quota_is_enforced(manager):
+    app = make_app()
+
+    @app.route("/big")
+    def big():
+        path = utils.create_temp_file(".bin")
+        with open(path, "wb") as f:
+            f.write(b"\0" * (2 * 1024 * 1024))
+        utils.create_temp_file(".bin")
+        return "unreachable"
+
+    response = app.test_client().get("/big")
+    assert response.status_code == 507
+
+
+def test_global_quota_and_sweeper(manager):
+    orphan = os.path.join(manager.root, "orphan.pdf")
+    with open(orphan, "wb") as f:
+        f.write(b"\0" * (5 * 1024 * 1024))
+
+    with pytest.raises(QuotaExceededError):
+        manager.usage(max_age=0)
+        manager.open()
+    assert manager.stats()["quota_rejections"] == 1
+    manager.global_quota_bytes = 64 * 1024 * 1024
+
+    stale = time.time() - 120
+    os.utime(orphan, (stale, stale))
+    live = manager.open()
+    os.utime(live.path, (stale, stale))
+
+    assert manager.sweep() == 1
+    assert not os.path.exists(orphan)
+    assert os.path.exists(live.path)
+    live.cleanup()
+
+
+def test_outside_a_request_files_land_under_the_root(manager):
+    path = utils.create_temp_file(".pdf")
+    assert os.path.dirname(path) == manager.root
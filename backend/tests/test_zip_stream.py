@@ -0,0 +1,63 @@
+import io
+import zipfile
+
+from flask import Flask
+
+from zip_stream import stream_zip, zip_response
+
+
+def test_archive_is_valid_and_compression_depends_on_type(tmp_path):
+    image = tmp_path / "page.jpg"
+    image.write_bytes(b"\xff\xd8" + b"x" * 5000)
+    members = [
+        ("page.jpg", str(image)),
+        ("doc.pdf", b"%PDF-1.4 " + b"0" * 5000),
+        ("notes.txt", (b"line\n" for _ in range(1000))),
+    ]
+
+    data = b"".join(stream_zip(members))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+        assert infos["page.jpg"].compress_type == zipfile.ZIP_STORED
+        assert infos["doc.pdf"].compress_type == zipfile.ZIP_STORED
+        assert infos["notes.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("page.jpg") == image.read_bytes()
+        assert zf.read("notes.txt") == b"line\n" * 1000
+
+
+def test_members_are_produced_lazily_and_tee_matches(tmp_path):
+    produced = []
+
+    def members():
+        for i in range(3):
+            produced.append(i)
+            yield f"part_{i}.pdf", b"%PDF" + bytes([i]) * 100
+
+    tee = tmp_path / "copy.zip"
+    stream = stream_zip(members(), tee_path=str(tee))
+    first = next(stream)
+    assert first
+    assert produced == [0]
+
+    data = first + b"".join(stream)
+    assert produced == [0, 1, 2]
+    assert tee.read_bytes() == data
+
+
+def test_zip_response_streams_through_flask():
+    app = Flask(__name__)
+    completed = []
+
+    @app.route("/zip")
+    def download():
+        return zip_response([("a.txt", b"hello")], "out.zip", on_complete=lambda: completed.append(True))
+
+    response = app.test_client().get("/zip")
+    assert response.is_streamed
+    assert response.mimetype == "application/zip"
+    assert 'filename="out.zip"' in response.headers["Content-Disposition"]
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as zf:
+        assert zf.read("a.txt") == b"hello"
+    assert completed == [True]
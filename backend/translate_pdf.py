@@ -1,6 +1,5 @@
 import os
 import io
-import zipfile
 import tempfile
 from flask import request, jsonify, send_file
 import PyPDF2
@@ -18,6 +17,9 @@ import json
 from typing import List, Dict, Optional
 import logging
 
+from zip_stream import zip_response
+import page_text_cache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -291,8 +293,8 @@ class PDFTranslator:
         try:
             logger.info(f"Starting translation of {pdf_path} to {target_language}")
             
-            # Extract text with positions
-            pages_content = self.extract_text_with_positions(pdf_path)
+            # Extract text with positions (cached by file content)
+            pages_content = page_text_cache.span_pages(pdf_path, self.extract_text_with_positions)
             
             if not pages_content:
                 raise Exception("Could not extract text from PDF")
@@ -383,19 +385,9 @@ def translate_pdf_route(request):
                     download_name=translated_files[0]['filename']
                 )
             else:
-                # Create zip file for multiple files
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for file_info in translated_files:
-                        zip_file.writestr(file_info['filename'], file_info['data'])
-                
-                zip_buffer.seek(0)
-                return send_file(
-                    zip_buffer,
-                    mimetype='application/zip',
-                    as_attachment=True,
-                    download_name='translated_pdfs.zip'
-                )
+                # Stream the zip; translated PDFs are stored, not re-deflated
+                members = [(file_info['filename'], file_info['data']) for file_info in translated_files]
+                return zip_response(members, 'translated_pdfs.zip')
         
         except Exception as e:
             # Clean up temporary files on error
@@ -0,0 +1,133 @@
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from flask import Request
+
+from pdf_inspect import file_sha256, remember_digest
+from utils import create_temp_file
+
+# Where multipart parts are spooled while the request body is parsed
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR') or None
+
+
+class SpoolFile:
+    """
+    Upload part written straight to a temp file, hashed and measured as it arrives.
+
+    Werkzeug writes every chunk of the part and then rewinds the stream; the
+    first seek freezes the digest. The file is unlinked when Werkzeug closes the
+    request's files at the end of the request.
+    """
+
+    def __init__(self, suffix='', directory=None):
+        fd, self.name = tempfile.mkstemp(prefix='upload_', suffix=suffix, dir=directory or UPLOAD_SPOOL_DIR)
+        self._file = os.fdopen(fd, 'w+b')
+        self._sha = hashlib.sha256()
+        self.size = 0
+        self.sha256 = None
+
+    def write(self, data):
+        if self.sha256 is None:
+            self._sha.update(data)
+            self.size += len(data)
+        return self._file.write(data)
+
+    def seek(self, offset, whence=0):
+        if self.sha256 is None:
+            self._finish()
+        return self._file.seek(offset, whence)
+
+    def _finish(self):
+        self._file.flush()
+        self.sha256 = self._sha.hexdigest()
+        remember_digest(self.name, self.sha256, self.size)
+
+    def close(self):
+        self._file.close()
+        try:
+            os.remove(self.name)
+        except OSError:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class SpoolingRequest(Request):
+    """Request class that spools every uploaded file to disk exactly once"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpoolFile(suffix=os.path.splitext(filename or '')[1].lower())
+
+
+def _spool(storage):
+    stream = storage.stream
+    if isinstance(stream, SpoolFile):
+        if stream.sha256 is None:
+            stream._finish()
+        return stream
+    return None
+
+
+def upload_path(storage):
+    """
+    Path of the uploaded file on disk, without copying it.
+
+    The path is only valid for the current request; tools that must keep the
+    file (background jobs, caches) should use save_upload instead. Uploads that
+    were not spooled (e.g. a different request class) are copied once into the
+    request's workspace, and later calls reuse that copy.
+    """
+    spool = _spool(storage)
+    if spool is not None:
+        return spool.name
+    path = getattr(storage, '_upload_copy', None)
+    if path is None:
+        path = create_temp_file(os.path.splitext(storage.filename or '')[1].lower())
+        storage.stream.seek(0)
+        storage.save(path)
+        storage.stream.seek(0)
+        storage._upload_copy = path
+    return path
+
+
+def upload_digest(storage):
+    """(sha256 hex, size in bytes) of an upload, computed while it was received"""
+    spool = _spool(storage)
+    if spool is not None:
+        return spool.sha256, spool.size
+    path = upload_path(storage)
+    return file_sha256(path), os.path.getsize(path)
+
+
+def save_upload(storage, destination):
+    """Give the upload a second name: a hard link when possible, a copy otherwise"""
+    source = upload_path(storage)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+    sha256, size = upload_digest(storage)
+    remember_digest(destination, sha256, size)
+    return destination
+
+
+@contextmanager
+def upload_mmap(storage):
+    """Read-only memory-mapped view of the upload, for APIs that want a buffer"""
+    with open(upload_path(storage), 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield view
+        finally:
+            view.close()
@@ -1,6 +1,8 @@
 import os
 import tempfile
 
+import workspace
+
 
 def cleanup_file(file_path):
     """Helper function to safely delete temporary files"""
@@ -12,13 +14,24 @@ def cleanup_file(file_path):
 
 
 def create_temp_file(suffix=".pdf"):
-    """Create a temporary file with the specified suffix"""
-    return tempfile.NamedTemporaryFile(delete=False, suffix=suffix).name
+    """
+    Create a temporary file with the specified suffix.
+
+    Inside a request the file belongs to the request's workspace and is removed
+    once the response has been sent; otherwise it is left for the orphan sweeper.
+    """
+    ws = workspace.current_workspace()
+    if ws is not None:
+        return ws.temp_file(suffix)
+    return tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=workspace.manager.root).name
 
 
 def create_temp_dir():
-    """Create a temporary directory"""
-    return tempfile.mkdtemp()
+    """Create a temporary directory (owned by the request's workspace, see create_temp_file)"""
+    ws = workspace.current_workspace()
+    if ws is not None:
+        return ws.temp_dir()
+    return tempfile.mkdtemp(dir=workspace.manager.root)
 
 
 def get_upload_folder():
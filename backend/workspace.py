@@ -0,0 +1,219 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from flask import g, has_request_context, jsonify
+from werkzeug.wsgi import ClosingIterator
+
+# Every temp file/dir handed out by utils.create_temp_* lives under this root
+WORKSPACE_ROOT = os.environ.get('WORKSPACE_ROOT', os.path.join(tempfile.gettempdir(), 'pdfville_work'))
+WORKSPACE_REQUEST_QUOTA_MB = int(os.environ.get('WORKSPACE_REQUEST_QUOTA_MB', '2048'))
+WORKSPACE_GLOBAL_QUOTA_MB = int(os.environ.get('WORKSPACE_GLOBAL_QUOTA_MB', '16384'))
+# Anything under the root older than this that no live request owns is an orphan
+WORKSPACE_ORPHAN_AGE = float(os.environ.get('WORKSPACE_ORPHAN_AGE', '3600'))
+WORKSPACE_SWEEP_INTERVAL = float(os.environ.get('WORKSPACE_SWEEP_INTERVAL', '300'))
+
+
+class QuotaExceededError(Exception):
+    """A request (or the whole process) is using more temp disk than allowed"""
+
+
+def _tree_size(path):
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class Workspace:
+    """
+    Private temp directory for one request.
+
+    All temp paths the request creates live in it, so a single rmtree after the
+    response has been streamed removes them all, whatever the handler did.
+    """
+
+    def __init__(self, manager, quota_bytes):
+        self.manager = manager
+        self.quota_bytes = quota_bytes
+        self.path = tempfile.mkdtemp(prefix='req_', dir=manager.root)
+        self.closed = False
+
+    def usage(self):
+        return _tree_size(self.path)
+
+    def check_quota(self):
+        """Raise QuotaExceededError if this request or the process is over its budget"""
+        used = self.usage()
+        if used > self.quota_bytes:
+            raise QuotaExceededError(
+                f"Request exceeded its temporary storage quota ({self.quota_bytes // (1024 * 1024)} MB)"
+            )
+        self.manager.check_global_quota()
+        return used
+
+    def temp_file(self, suffix=".pdf"):
+        self.check_quota()
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.path)
+        os.close(fd)
+        return path
+
+    def temp_dir(self):
+        self.check_quota()
+        return tempfile.mkdtemp(dir=self.path)
+
+    def cleanup(self):
+        if self.closed:
+            return
+        self.closed = True
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.manager._forget(self)
+
+
+class WorkspaceManager:
+    """Owns the workspace root: global quota, live workspaces and the orphan sweeper"""
+
+    def __init__(self, root=None, request_quota_mb=None, global_quota_mb=None,
+                 orphan_age=None, sweep_interval=None):
+        self.root = root or WORKSPACE_ROOT
+        self.request_quota_bytes = (request_quota_mb or WORKSPACE_REQUEST_QUOTA_MB) * 1024 * 1024
+        self.global_quota_bytes = (global_quota_mb or WORKSPACE_GLOBAL_QUOTA_MB) * 1024 * 1024
+        self.orphan_age = WORKSPACE_ORPHAN_AGE if orphan_age is None else orphan_age
+        self.sweep_interval = sweep_interval or WORKSPACE_SWEEP_INTERVAL
+        self._active = set()
+        self._lock = threading.Lock()
+        self._usage = 0
+        self._usage_at = 0.0
+        self._sweeper = None
+        self.sweeps = 0
+        self.orphans_removed = 0
+        self.quota_rejections = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def open(self):
+        self.check_global_quota()
+        workspace = Workspace(self, self.request_quota_bytes)
+        with self._lock:
+            self._active.add(workspace.path)
+        return workspace
+
+    def _forget(self, workspace):
+        with self._lock:
+            self._active.discard(workspace.path)
+
+    def usage(self, max_age=5.0):
+        """Bytes under the root; rescanned at most every max_age seconds"""
+        now = time.time()
+        if now - self._usage_at > max_age:
+            self._usage = _tree_size(self.root)
+            self._usage_at = now
+        return self._usage
+
+    def check_global_quota(self):
+        if self.usage() > self.global_quota_bytes:
+            with self._lock:
+                self.quota_rejections += 1
+            raise QuotaExceededError("Server temporary storage is full, please retry shortly")
+
+    def sweep(self):
+        """Remove entries under the root that are old and not owned by a live request"""
+        cutoff = time.time() - self.orphan_age
+        removed = 0
+        with self._lock:
+            active = set(self._active)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if path in active:
+                continue
+            try:
+                if os.lstat(path).st_mtime > cutoff:
+                    continue
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+        with self._lock:
+            self.sweeps += 1
+            self.orphans_removed += removed
+        self._usage_at = 0.0
+        return removed
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping temp workspace: {str(e)}")
+
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, name='workspace-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stats(self):
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            active = len(self._active)
+        return {
+            "root": self.root,
+            "bytes": self.usage(max_age=0),
+            "global_quota_bytes": self.global_quota_bytes,
+            "request_quota_bytes": self.request_quota_bytes,
+            "active_workspaces": active,
+            "sweeps": self.sweeps,
+            "orphans_removed": self.orphans_removed,
+            "quota_rejections": self.quota_rejections,
+        }
+
+
+manager = WorkspaceManager()
+
+
+def current_workspace():
+    """The request's workspace (created on first use), or None outside a request"""
+    if not has_request_context():
+        return None
+    workspace = g.get('workspace')
+    if workspace is None:
+        workspace = manager.open()
+        g.workspace = workspace
+    return workspace
+
+
+def init_app(app):
+    """Remove each request's workspace once its response has been fully sent"""
+
+    @app.after_request
+    def cleanup_workspace_on_close(response):
+        workspace = g.get('workspace')
+        if workspace is not None:
+            # call_on_close runs after the WSGI server has streamed the body
+            response.call_on_close(workspace.cleanup)
+            if response.direct_passthrough:
+                # send_file bodies go to the server as-is and skip the response's
+                # close hooks, so chain the cleanup onto the body iterator itself
+                response.response = ClosingIterator(response.response, workspace.cleanup)
+            g.workspace_handed_off = True
+        return response
+
+    @app.teardown_request
+    def cleanup_workspace_on_error(exc):
+        workspace = g.get('workspace')
+        if workspace is not None and not g.get('workspace_handed_off'):
+            workspace.cleanup()
+
+    @app.errorhandler(QuotaExceededError)
+    def handle_quota_exceeded(e):
+        return jsonify({"error": str(e)}), 507
+
+    manager.start_sweeper()
@@ -0,0 +1,122 @@
+import os
+import time
+import zipfile
+
+from flask import Response, stream_with_context
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+# Members that are already compressed gain nothing from DEFLATE; store them as-is
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf', '.zip', '.docx', '.xlsx', '.pptx', '.gz'}
+
+
+class _Sink:
+    """Write-only, unseekable buffer that ZipFile writes into and the generator drains"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compress_type_for(name):
+    """STORED for formats that are already compressed, DEFLATED for everything else"""
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _iter_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(ZIP_CHUNK_SIZE), b''):
+                yield chunk
+    else:
+        yield from source
+
+
+def stream_zip(members, tee_path=None):
+    """
+    Build a ZIP archive incrementally.
+
+    Members are pulled lazily, so each one can be produced (rendered, split, ...)
+    just before it is written and the archive is never held whole in memory or on
+    disk. ZipFile writes a data descriptor after each member because the output
+    cannot seek back to patch the local header.
+
+    Args:
+        members: Iterable of (arcname, source) where source is a file path, bytes
+            or an iterable of byte chunks
+        tee_path: Optional path that receives a copy of the archive (e.g. for
+            the result cache); it is complete once the generator is exhausted
+
+    Yields:
+        Archive bytes
+    """
+    sink = _Sink()
+    tee = open(tee_path, 'wb') if tee_path else None
+    try:
+        with zipfile.ZipFile(sink, 'w', allowZip64=True) as zf:
+            for arcname, source in members:
+                if isinstance(source, (str, os.PathLike)):
+                    info = zipfile.ZipInfo.from_file(source, arcname)
+                else:
+                    info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+                    info.external_attr = 0o644 << 16
+                info.compress_type = compress_type_for(arcname)
+                with zf.open(info, 'w', force_zip64=True) as dest:
+                    for chunk in _iter_source(source):
+                        dest.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            if tee:
+                                tee.write(data)
+                            yield data
+        data = sink.drain()
+        if tee:
+            tee.write(data)
+        yield data
+    finally:
+        if tee:
+            tee.close()
+
+
+def zip_response(members, download_name, tee_path=None, on_complete=None):
+    """
+    Flask response that streams a ZIP of members as they are produced.
+
+    Validation (restrictions, parameters) must happen before this is returned:
+    once the first byte is sent the status code can no longer change, so a
+    failure mid-stream only truncates the archive.
+
+    Args:
+        members: See stream_zip
+        download_name: Attachment file name
+        tee_path: See stream_zip
+        on_complete: Called with no arguments after the last byte was produced
+    """
+    def generate():
+        yield from stream_zip(members, tee_path=tee_path)
+        if on_complete:
+            on_complete()
+
+    response = Response(stream_with_context(generate()), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    return response
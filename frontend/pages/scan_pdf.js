@@ -506,8 +506,9 @@ export default function ScanPDFPage() {
                     style={styles.select}
                   >
                     <option value="txt">Plain Text (.txt)</option>
+                    <option value="pdf">Searchable PDF (.pdf)</option>
                   </select>
-                  <p style={styles.noteText}>Format of the extracted text</p>
+                  <p style={styles.noteText}>Extracted text, or the original PDF with selectable, searchable text</p>
                 </div>
               </div>
             </div>